@@ -0,0 +1,40 @@
+"""
+Конфигурация gunicorn для production-запуска.
+
+Режим задаётся переменной ``WEB_SERVER_MODE``:
+    :asgi: (по умолчанию) воркеры uvicorn, приложение ``config.asgi`` — async-представления
+        чтения (карточка звена, продукты, список продуктов) не занимают поток на время запросов к БД;
+    :wsgi: потоковые воркеры gunicorn (``gthread``), приложение ``config.wsgi``.
+
+Запуск: ``gunicorn -c config/gunicorn.conf.py``.
+"""
+
+import multiprocessing
+
+from config.utils import get_env
+
+WORKER_CLASSES = {"asgi": "uvicorn_worker.UvicornWorker", "wsgi": "gthread"}
+APPLICATIONS = {"asgi": "config.asgi:application", "wsgi": "config.wsgi:application"}
+
+mode = get_env("WEB_SERVER_MODE", "asgi").lower()
+if mode not in WORKER_CLASSES:
+    raise ValueError(f"WEB_SERVER_MODE должен быть одним из: {', '.join(WORKER_CLASSES)}.")
+
+wsgi_app = APPLICATIONS[mode]
+worker_class = WORKER_CLASSES[mode]
+bind = get_env("WEB_BIND", "0.0.0.0:8000")
+# По умолчанию — классическая формула 2 * CPU + 1
+workers = int(get_env("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# Потоки на воркер учитываются только в режиме wsgi (gthread)
+threads = int(get_env("WEB_THREADS", 4))
+
+timeout = int(get_env("WEB_TIMEOUT", 30))
+graceful_timeout = int(get_env("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = int(get_env("WEB_KEEPALIVE", 5))
+# Перезапуск воркера после N запросов ограничивает рост памяти; jitter разносит перезапуски во времени
+max_requests = int(get_env("WEB_MAX_REQUESTS", 1000))
+max_requests_jitter = int(get_env("WEB_MAX_REQUESTS_JITTER", 100))
+
+accesslog = get_env("WEB_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = get_env("WEB_LOG_LEVEL", "info")
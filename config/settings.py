@@ -7,6 +7,8 @@ import sys
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 from config.utils import get_env
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,6 +27,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",  # -- Триграммные lookup-ы поиска (supply.search)
 ]  # -- Стоковые приложения
 INSTALLED_APPS += [
     "rest_framework",
@@ -35,6 +38,8 @@ INSTALLED_APPS += [
 INSTALLED_APPS += ["supply", "user"]  # -- Пользовательские приложения
 
 MIDDLEWARE = [
+    "supply.profiling.RequestProfilingMiddleware",  # -- Первым: измеряет всю обработку запроса
+    "supply.routers.ReplicaPinningMiddleware",  # -- До любых чтений: выбирает основную базу или реплики
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -67,19 +72,92 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# -- Соединения с БД: постоянные (переиспользуются DB_CONN_MAX_AGE секунд, перед повторным
+# использованием проверяются при DB_CONN_HEALTH_CHECKS) или пул psycopg 3 (DB_POOL=True).
+# Пул заменяет постоянные соединения, поэтому при нём CONN_MAX_AGE всегда 0.
+DB_POOL = get_env("DB_POOL", default="False") == "True"
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "django.db.backends.postgresql",
         "NAME": get_env("DB_NAME", required=True),
         "USER": get_env("DB_USER", required=True),
         "PASSWORD": get_env("DB_PASSWORD", required=True),
         "HOST": get_env("DB_HOST", required=True),
         "PORT": get_env("DB_PORT", required=True),
+        "CONN_MAX_AGE": 0 if DB_POOL else int(get_env("DB_CONN_MAX_AGE", default=60)),
+        "CONN_HEALTH_CHECKS": get_env("DB_CONN_HEALTH_CHECKS", default="True") == "True",
+        "OPTIONS": {},
     }
 }
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(get_env("DB_POOL_MIN_SIZE", default=2)),
+        "max_size": int(get_env("DB_POOL_MAX_SIZE", default=10)),
+        "timeout": float(get_env("DB_POOL_TIMEOUT", default=10)),  # -- ожидание свободного соединения, сек
+        "max_idle": float(get_env("DB_POOL_MAX_IDLE", default=300)),
+        "max_lifetime": float(get_env("DB_POOL_MAX_LIFETIME", default=3600)),
+    }
+# -- Реплики чтения: адреса host[:port] через запятую, учётные данные и настройки — как у основной базы.
+# Чтение supply/user идёт на реплики, запись и чтение после записи — в основную базу (supply.routers).
+SUPPLY_DB_REPLICAS = []
+for number, address in enumerate(filter(None, get_env("DB_REPLICA_HOSTS", default="").split(",")), start=1):
+    host, _, port = address.strip().partition(":")
+    alias = f"replica_{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    SUPPLY_DB_REPLICAS.append(alias)
+DATABASE_ROUTERS = ["supply.routers.PrimaryReplicaRouter"]
+# -- Сколько секунд после записи клиент читает из основной базы (видит свои изменения несмотря на отставание реплик)
+SUPPLY_REPLICA_PIN_SECONDS = int(get_env("SUPPLY_REPLICA_PIN_SECONDS", default=5))
+
 # -- Настройка лёгкой БД для тестов
 if "pytest" in sys.argv[0]:
-    DATABASES["default"] = {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+    DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}}
+    SUPPLY_DB_REPLICAS = []
+
+# -- Кэш: общий Redis для всех воркеров (CACHE_BACKEND=django.core.cache.backends.redis.RedisCache).
+# locmem допустим только для одного процесса с DEBUG (runserver): проверка supply.E005
+CACHES = {
+    "default": {
+        "BACKEND": get_env("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": get_env("CACHE_LOCATION", default="supply-node"),
+    }
+}
+if "pytest" in sys.argv[0]:
+    CACHES["default"] = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "supply-tests"}
+
+# Количество процессов приложения (как в config/gunicorn.conf.py; runserver — один процесс)
+if get_env("WEB_SERVER", default="gunicorn") == "runserver":
+    WEB_WORKERS = 1
+else:
+    WEB_WORKERS = int(get_env("WEB_WORKERS", default=(os.cpu_count() or 1) * 2 + 1))
+
+# -- Хэширование паролей (user.hashers): основной алгоритм (argon2 или pbkdf2) и его параметры;
+# хэши остальных алгоритмов проверяются и пересчитываются основным при входе
+USER_PASSWORD_HASHER = get_env("USER_PASSWORD_HASHER", default="pbkdf2")
+_PASSWORD_HASHER_PATHS = {
+    "argon2": "user.hashers.Argon2PasswordHasher",
+    "pbkdf2": "user.hashers.PBKDF2PasswordHasher",
+}
+if USER_PASSWORD_HASHER not in _PASSWORD_HASHER_PATHS:
+    raise ImproperlyConfigured(f"USER_PASSWORD_HASHER должен быть одним из: {', '.join(_PASSWORD_HASHER_PATHS)}.")
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHER_PATHS[USER_PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHER_PATHS.items() if name != USER_PASSWORD_HASHER),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+USER_ARGON2_TIME_COST = int(get_env("USER_ARGON2_TIME_COST", default=2))
+USER_ARGON2_MEMORY_COST = int(get_env("USER_ARGON2_MEMORY_COST", default=102400))  # КиБ
+USER_ARGON2_PARALLELISM = int(get_env("USER_ARGON2_PARALLELISM", default=8))
+USER_PBKDF2_ITERATIONS = int(get_env("USER_PBKDF2_ITERATIONS", default=1_000_000))
+# Одновременных вычислений хэша на процесс (по умолчанию половина ядер) и ожидание слота, секунды
+USER_HASHING_CONCURRENCY = int(get_env("USER_HASHING_CONCURRENCY", default=max(1, (os.cpu_count() or 2) // 2)))
+USER_HASHING_TIMEOUT = float(get_env("USER_HASHING_TIMEOUT", default=5))
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -105,20 +183,45 @@ CORS_ALLOWED_ORIGINS = ["http://localhost:8000", "http://127.0.0.1:8000"]
 CSRF_TRUSTED_ORIGINS = ["http://localhost:8000", "http://127.0.0.1:8000"]
 
 # -- Настройка Django Rest Framework
+# JWT без запроса пользователя к БД: роль и активность берутся из подписанных claims,
+# отзыв токенов — по штампу безопасности в кэше (user.authentication)
+USER_JWT_STATELESS = get_env("USER_JWT_STATELESS", default="False") == "True"
+USER_AUTH_CACHE_ALIAS = get_env("USER_AUTH_CACHE_ALIAS", default="default")
+USER_AUTH_STAMP_TTL = int(get_env("USER_AUTH_STAMP_TTL", default=60))
+
+# Ограничение частоты запросов (supply.throttling): скользящее окно по группам read/write/auth,
+# счётчики в общем кэше (default — Redis), чтобы лимит действовал на все воркеры; LocMemCache отклоняется
+# проверкой supply.E005. Пустое значение лимита — без лимита
+API_THROTTLE_CACHE_ALIAS = get_env("API_THROTTLE_CACHE_ALIAS", default="default")
+API_THROTTLE_RATES = {
+    "read": get_env("API_THROTTLE_READ", default="1200/min") or None,
+    "write": get_env("API_THROTTLE_WRITE", default="300/min") or None,
+    "auth": get_env("API_THROTTLE_AUTH", default="60/min") or None,
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        (
+            "user.authentication.ClaimsJWTAuthentication"
+            if USER_JWT_STATELESS
+            else "rest_framework_simplejwt.authentication.JWTAuthentication"
+        ),
         "rest_framework.authentication.SessionAuthentication",
     ],
     # Настройка прав доступа для всех контроллеров
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",  # -- Обязательная аутентификация
     ],
+    "DEFAULT_THROTTLE_CLASSES": ["supply.throttling.SlidingWindowThrottle"],
+    "DEFAULT_THROTTLE_RATES": API_THROTTLE_RATES,
     # Настройка сериализаторов DRF browsable API
     "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
         "rest_framework.renderers.BrowsableAPIRenderer",
     ],
+    # Keyset-пагинация списков: стоимость любой страницы не зависит от её глубины
+    "DEFAULT_PAGINATION_CLASS": "supply.pagination.KeysetCursorPagination",
+    "PAGE_SIZE": int(get_env("API_PAGE_SIZE", default=50)),
     # Настройка фильтрации данных
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
@@ -127,6 +230,60 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Размер пакета серверного курсора при потоковой выгрузке сети поставок
+SUPPLY_EXPORT_CHUNK_SIZE = int(get_env("SUPPLY_EXPORT_CHUNK_SIZE", default=2000))
+
+# Максимальное количество записей в одном пакетном запросе (nodes/bulk/, products/bulk/)
+SUPPLY_BULK_MAX_ITEMS = int(get_env("SUPPLY_BULK_MAX_ITEMS", default=1000))
+
+# Размер пакета (одна транзакция) при массовой очистке задолженности
+SUPPLY_DEBT_CLEAR_CHUNK_SIZE = int(get_env("SUPPLY_DEBT_CLEAR_CHUNK_SIZE", default=1000))
+
+# Кэш ответов списков и карточек сети поставок: алиас из CACHES и время жизни записи в секундах (0 — отключён)
+SUPPLY_CACHE_ALIAS = get_env("SUPPLY_CACHE_ALIAS", default="default")
+SUPPLY_RESPONSE_CACHE_TIMEOUT = int(get_env("SUPPLY_RESPONSE_CACHE_TIMEOUT", default=300))
+
+# Администратор: с какого размера таблицы список показывает оценку количества строк вместо COUNT(*) (PostgreSQL)
+# и время жизни кэша значений фильтров (страна, город), секунды
+SUPPLY_ADMIN_ESTIMATED_COUNT_THRESHOLD = int(get_env("SUPPLY_ADMIN_ESTIMATED_COUNT_THRESHOLD", default=100_000))
+SUPPLY_ADMIN_FILTER_CACHE_TIMEOUT = int(get_env("SUPPLY_ADMIN_FILTER_CACHE_TIMEOUT", default=600))
+
+# Быстрая сериализация списков звеньев и продуктов: строки .values() и orjson вместо полей DRF
+SUPPLY_VALUES_SERIALIZATION = get_env("SUPPLY_VALUES_SERIALIZATION", default="True") == "True"
+
+# Доля занятых соединений пула БД, начиная с которой он считается насыщенным (supply.db.pool_stats)
+SUPPLY_DB_POOL_SATURATION_WARNING = float(get_env("SUPPLY_DB_POOL_SATURATION_WARNING", default=0.8))
+
+# Профилирование запросов: метрики в логе supply.profiling и (по умолчанию в DEBUG) в заголовке Server-Timing
+SUPPLY_PROFILING = get_env("SUPPLY_PROFILING", default="True") == "True"
+# Уровень лога supply.profiling (файл profiling.log): INFO — строка на каждый запрос, WARNING — только
+# превышения бюджета запросов и насыщение пула. По умолчанию построчный лог включён только в DEBUG
+SUPPLY_PROFILING_LOG_LEVEL = get_env("SUPPLY_PROFILING_LOG_LEVEL", default="INFO" if DEBUG else "WARNING")
+SUPPLY_SERVER_TIMING = get_env("SUPPLY_SERVER_TIMING", default=str(DEBUG)) == "True"
+
+# Бюджеты SQL-запросов на один HTTP-запрос по имени маршрута (превышение — предупреждение в логе, в тестах — ошибка)
+SUPPLY_QUERY_BUDGETS = {
+    "supply:node-list": 3,
+    "supply:node-detail": 3,
+    "supply:node-descendants": 4,
+    "supply:node-ancestors": 3,
+    "supply:node-create": 15,
+    "supply:node-update": 20,
+    "supply:node-delete": 15,
+    "supply:node-bulk": 25,
+    "supply:product-list": 3,
+    "supply:product-detail": 3,
+    "supply:product-create": 10,
+    "supply:product-bulk": 12,
+    "supply:node-product-list": 4,
+    "supply:node-product-detail": 4,
+    "supply:search": 3,
+}
+
+# Поиск /supply/search/: количество результатов по умолчанию и наибольшее значение ?limit=
+SUPPLY_SEARCH_LIMIT = int(get_env("SUPPLY_SEARCH_LIMIT", default=20))
+SUPPLY_SEARCH_MAX_LIMIT = int(get_env("SUPPLY_SEARCH_MAX_LIMIT", default=100))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -155,14 +312,38 @@ LOGGING = {
     "disable_existing_loggers": False,
     "formatters": {
         "verbose": {"format": "%(asctime)s - %(name)s - %(levelname)s: %(message)s"},
+        "json": {"()": "supply.log_handlers.JSONFormatter"},
     },
     "handlers": {
+        # Журнал supply пишет фоновый поток: запрос только кладёт запись в ограниченную очередь.
+        # Файл общий для воркеров: ротация под flock, остальные воркеры переоткрывают файл по inode
+        # (SUPPLY_LOG_MAX_BYTES=0 и SUPPLY_LOG_ROTATE_INTERVAL=0 — ротацию выполняет logrotate)
         "supply_file": {
             "level": "DEBUG",
-            "class": "logging.FileHandler",
+            "class": "supply.log_handlers.QueuedFileHandler",
             "filename": os.path.join(BASE_DIR, "supply/logs/reports.log"),
             "encoding": "utf-8",
-            "formatter": "verbose",
+            "formatter": "json",
+            "max_queue_size": int(get_env("SUPPLY_LOG_QUEUE_SIZE", default=10000)),
+            "overflow": get_env("SUPPLY_LOG_OVERFLOW", default="drop_newest"),
+            "batch_size": int(get_env("SUPPLY_LOG_BATCH_SIZE", default=500)),
+            "flush_interval": float(get_env("SUPPLY_LOG_FLUSH_INTERVAL", default=1.0)),
+            "max_bytes": int(get_env("SUPPLY_LOG_MAX_BYTES", default=50 * 1024 * 1024)),
+            "rotate_interval": int(get_env("SUPPLY_LOG_ROTATE_INTERVAL", default=24 * 60 * 60)),
+            "backup_count": int(get_env("SUPPLY_LOG_BACKUP_COUNT", default=7)),
+        },
+        # Метрики запросов (supply.profiling) — отдельный файл, чтобы не смешивать их с журналом действий
+        "supply_profiling_file": {
+            "level": "DEBUG",
+            "class": "supply.log_handlers.QueuedFileHandler",
+            "filename": os.path.join(BASE_DIR, "supply/logs/profiling.log"),
+            "encoding": "utf-8",
+            "formatter": "json",
+            "max_queue_size": int(get_env("SUPPLY_LOG_QUEUE_SIZE", default=10000)),
+            "overflow": "drop_newest",
+            "max_bytes": int(get_env("SUPPLY_LOG_MAX_BYTES", default=50 * 1024 * 1024)),
+            "rotate_interval": int(get_env("SUPPLY_LOG_ROTATE_INTERVAL", default=24 * 60 * 60)),
+            "backup_count": int(get_env("SUPPLY_LOG_BACKUP_COUNT", default=7)),
         },
         "console": {  # fallback-обработчик ошибок логирования (логер самого логера :-))
             "level": "DEBUG",
@@ -176,6 +357,11 @@ LOGGING = {
             "level": "DEBUG",
             "propagate": False,
         },
+        "supply.profiling": {
+            "handlers": ["supply_profiling_file"],
+            "level": SUPPLY_PROFILING_LOG_LEVEL,
+            "propagate": False,
+        },
         "root": {
             "handlers": ["console"],
             "level": "WARNING",
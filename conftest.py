@@ -0,0 +1,38 @@
+"""
+Общие pytest-фикстуры проекта.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+
+import pytest
+
+from supply.profiling import query_budget_exceeded
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets():
+    """
+    Проваливает тест, если хотя бы один HTTP-запрос превысил бюджет SQL-запросов
+    из ``settings.SUPPLY_QUERY_BUDGETS`` (см. :mod:`supply.profiling`).
+
+    Возвращает список нарушений: тест, проверяющий превышение намеренно, очищает его сам.
+    """
+    exceeded = []
+
+    def collect(sender, profile, budget, **kwargs):
+        exceeded.append(f"{profile['method']} {profile['path']} ({profile['view']}): {profile['queries']} > {budget}")
+
+    query_budget_exceeded.connect(collect)
+    yield exceeded
+    query_budget_exceeded.disconnect(collect)
+    if exceeded:
+        pytest.fail("Превышен бюджет запросов к БД:\n" + "\n".join(exceeded))
+
+
+@pytest.fixture(autouse=True)
+def clear_throttle_counters():
+    """
+    Сбрасывает счётчики ограничения частоты запросов (:mod:`supply.throttling`) перед каждым тестом.
+    """
+    caches[settings.API_THROTTLE_CACHE_ALIAS].clear()
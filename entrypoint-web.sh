@@ -10,6 +10,9 @@ done
 
 echo "PostgreSQL started"
 
+# Проверяем настройки соединений (пул/постоянные соединения) и доступность БД
+python manage.py check --database default || exit 1
+
 # Создаём директорию staticfiles с нужными правами
 mkdir -p /app/staticfiles
 chmod -R 777 /app/staticfiles
@@ -29,5 +32,8 @@ echo "Fixtures loaded"
 # Собираем статику
 python manage.py collectstatic --noinput
 
-# Запускаем приложение
-python manage.py runserver 0.0.0.0:8000
+# Запускаем приложение: WEB_SERVER=gunicorn (по умолчанию, режим ASGI/WSGI — WEB_SERVER_MODE) или runserver
+if [ "${WEB_SERVER:-gunicorn}" = "runserver" ]; then
+  exec python manage.py runserver 0.0.0.0:8000
+fi
+exec gunicorn -c config/gunicorn.conf.py
@@ -1,33 +1,93 @@
+"""
+Администрирование сети поставок.
+
+Списки звеньев и продуктов рассчитаны на таблицы в миллионы строк:
+
+- связанные поставщик и владелец выбираются одним JOIN (``list_select_related``);
+- количество строк без фильтров на PostgreSQL берётся из статистики планировщика
+  (:class:`EstimatedCountPaginator`), полный ``COUNT(*)`` всей таблицы не выполняется;
+- значения фильтров звеньев (страна, город) кэшируются (:class:`CachedValuesListFilter`)
+  до изменения звеньев, подсчёт фасетов отключён; у продуктов фильтра по названию нет —
+  список различных названий не ограничен, названия ищутся поиском (``search_fields``);
+- поставщик и владелец выбираются поиском (``autocomplete_fields``), а не списком всех звеньев.
+"""
+
 import logging
-from decimal import Decimal
 
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
 from django.urls import reverse
-from django.utils.safestring import mark_safe
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
-from supply.models import Node, Product
+from supply.cache import NODES, get_cache, get_versions
+from supply.db import estimated_count
+from supply.debt import clear_debt as clear_debt_service
+from supply.models import DebtClearingAudit, Node, Product
 
 logger = logging.getLogger(__name__)
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, который для списка без фильтров берёт оценку количества строк (:func:`supply.db.estimated_count`).
+    """
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list, settings.SUPPLY_ADMIN_ESTIMATED_COUNT_THRESHOLD)
+
+
+class CachedValuesListFilter(admin.AllValuesFieldListFilter):
+    """
+    Фильтр по всем значениям поля, который кэширует результат ``SELECT DISTINCT``.
+
+    Ключ кэша включает версию области ``cache_scope`` раздела (см. :mod:`supply.cache`),
+    поэтому новые значения появляются сразу после изменения данных, а не только по истечении
+    ``SUPPLY_ADMIN_FILTER_CACHE_TIMEOUT``.
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        (version,) = get_versions([model_admin.cache_scope])
+        key = f"supply:admin-filter:{model._meta.label_lower}:{field_path}:{version}"
+        self.lookup_choices = get_cache().get_or_set(
+            key, lambda: list(self.lookup_choices), settings.SUPPLY_ADMIN_FILTER_CACHE_TIMEOUT
+        )
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Базовый раздел для больших таблиц: оценка количества строк, без полного подсчёта и фасетов.
+
+    :cvar cache_scope: Область кэша (:mod:`supply.cache`), при смене версии которой сбрасываются значения фильтров.
+    """
+
+    cache_scope = NODES
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
 @admin.action(description="Очистить задолженность перед поставщиком")
 def clear_debt(modeladmin, request, queryset):
-    updated = queryset.update(debt_to_supplier=Decimal("0.00"))
+    result = clear_debt_service(queryset, user=request.user)
 
     logger.info(
         f"Админ-действие: Администратор сети {request.user} очистил задолженность "
-        f"у {updated} объектов Node. ID: {[obj.id for obj in queryset]}"
+        f"у {len(result.node_ids)} объектов Node. Запуск: {result.batch}"
     )
 
 
 @admin.register(Node)
-class NodeAdmin(admin.ModelAdmin):
+class NodeAdmin(LargeTableAdmin):
 
     @admin.display(description="Поставщик")
     def supplier_link(self, obj):
-        if obj.supplier:
-            url = reverse("admin:supply_change", args=[obj.supplier.id])
-            return mark_safe(f'<a href="{url}">{obj.supplier.name}</a>')
+        if obj.supplier_id:
+            url = reverse("admin:supply_node_change", args=[obj.supplier_id])
+            return format_html('<a href="{}">{}</a>', url, obj.supplier.name)
         return "-"
 
     list_display = (
@@ -38,20 +98,38 @@ class NodeAdmin(admin.ModelAdmin):
         "city",
         "street",
         "building_number",
-        "supplier",
+        "supplier_link",
         "debt_to_supplier",
         "created_at",
     )
+    list_select_related = ("supplier",)
     list_filter = (
-        "country",
-        "city",
+        ("country", CachedValuesListFilter),
+        ("city", CachedValuesListFilter),
     )
     search_fields = ("name", "email", "phone")
+    autocomplete_fields = ("supplier",)
     actions = [clear_debt]
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(LargeTableAdmin):
     list_display = ("name", "model", "release_date", "owner")
-    list_filter = ("name",)
+    list_select_related = ("owner",)
     search_fields = ("name", "model")
+    autocomplete_fields = ("owner",)
+
+
+@admin.register(DebtClearingAudit)
+class DebtClearingAuditAdmin(admin.ModelAdmin):
+    list_display = ("cleared_at", "node", "old_debt", "cleared_by", "batch")
+    list_filter = ("cleared_at",)
+    search_fields = ("=batch", "node__name")
+    list_select_related = ("node", "cleared_by")
+    raw_id_fields = ("node", "cleared_by")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SupplyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "supply"
+
+    def ready(self):
+        # Подключаем обработчики сигналов (импорт ради побочного эффекта регистрации)
+        from supply import checks, signals  # noqa: F401
@@ -0,0 +1,276 @@
+"""
+Нагрузочный прогон API сети поставок.
+
+Сценарии обращаются к основным маршрутам (список, карточка, продукты звена,
+создание звена) заданное число раз с заданной параллельностью и считают
+перцентили задержки p50/p95/p99, RPS и количество SQL-запросов на запрос.
+Количество запросов берётся из заголовка ``Server-Timing`` (см. :mod:`supply.profiling`),
+поэтому одинаково работает и внутри процесса, и против запущенного сервера.
+
+Результаты сохраняются в JSON, чтобы прогоны можно было сравнивать между собой.
+
+:func:`measure_serialization` отдельно сравнивает процессорное время на одну строку
+списка при обычной сериализации объектов модели и при быстром пути через ``.values()``.
+"""
+
+import json
+import math
+import platform
+import random
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from supply.renderers import FastJSONRenderer
+
+SCENARIOS = ("list", "detail", "products", "create")
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values: list[float], percent: float) -> float | None:
+    """
+    Перцентиль методом ближайшего ранга.
+
+    :param values: Значения (не обязательно отсортированные).
+    :param percent: Перцентиль от 0 до 100.
+    :rtype: float or None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class InProcessTarget:
+    """
+    Выполняет запросы через тестовый клиент DRF внутри текущего процесса (без сети).
+
+    :param user: Пользователь, от имени которого выполняются запросы.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.local = threading.local()
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != "*" and not host.startswith(".")]
+        self.host = hosts[0] if hosts else "testserver"
+
+    def _client(self) -> APIClient:
+        if not hasattr(self.local, "client"):
+            self.local.client = APIClient(SERVER_NAME=self.host)
+            self.local.client.force_authenticate(user=self.user)
+        return self.local.client
+
+    def request(self, method: str, path: str, data=None) -> tuple[int, str, bytes]:
+        client = self._client()
+        if method == "POST":
+            response = client.post(path, data, format="json")
+        else:
+            response = client.get(path)
+        return response.status_code, response.get("Server-Timing", ""), response.content
+
+
+class HttpTarget:
+    """
+    Выполняет запросы к запущенному серверу по HTTP.
+
+    :param base_url: Адрес сервера, например ``http://localhost:8000``.
+    :param token: JWT access-токен.
+    """
+
+    def __init__(self, base_url: str, token: str):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+
+    def request(self, method: str, path: str, data=None) -> tuple[int, str, bytes]:
+        body = json.dumps(data).encode("utf-8") if data is not None else None
+        request = Request(self.base_url + path, data=body, method=method)
+        request.add_header("Authorization", f"Bearer {self.token}")
+        request.add_header("Accept", "application/json")
+        if body is not None:
+            request.add_header("Content-Type", "application/json")
+        try:
+            with urlopen(request, timeout=60) as response:
+                return response.status, response.headers.get("Server-Timing", ""), response.read()
+        except HTTPError as error:
+            return error.code, error.headers.get("Server-Timing", ""), error.read()
+
+
+def _plan(scenario: str, node_ids: list[int], rng: random.Random):
+    """
+    Возвращает метод, путь и тело одного запроса сценария.
+    """
+    if scenario == "list":
+        return (
+            "GET",
+            reverse("supply:node-list") + f"?page_size=50&ordering={rng.choice(['name', '-created_at'])}",
+            None,
+        )
+    node_id = rng.choice(node_ids)
+    if scenario == "detail":
+        return "GET", reverse("supply:node-detail", args=[node_id]), None
+    if scenario == "products":
+        return "GET", reverse("supply:node-product-list", args=[node_id]), None
+    tag = uuid.uuid4().hex
+    data = {
+        "name": f"bench-{tag}",
+        "email": f"bench-{tag}@bench.example",
+        "phone": f"+998{int(tag[:12], 16) % 10**13:013d}",
+        "country": "KZ",
+        "city": "Алматы",
+        "street": "Нагрузочная",
+        "building_number": "1",
+        "supplier": node_id,
+    }
+    return "POST", reverse("supply:node-create"), data
+
+
+def run_scenario(target, scenario: str, requests: int, concurrency: int, node_ids: list[int], seed=None) -> dict:
+    """
+    Выполняет сценарий и возвращает сводку по задержкам, RPS и SQL-запросам.
+
+    :param target: :class:`InProcessTarget` или :class:`HttpTarget`.
+    :param scenario: Название сценария из :data:`SCENARIOS`.
+    :param requests: Количество запросов.
+    :param concurrency: Количество параллельных потоков.
+    :param node_ids: Идентификаторы звеньев для карточек, продуктов и поставщиков новых звеньев.
+    :param seed: Зерно генератора случайных чисел.
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    plans = [_plan(scenario, node_ids, rng) for _ in range(requests)]
+
+    def call(plan):
+        started = time.perf_counter()
+        status, timing, _ = target.request(*plan)
+        elapsed = (time.perf_counter() - started) * 1000
+        match = QUERIES_RE.search(timing)
+        return elapsed, status, int(match.group(1)) if match else None
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(call, plans))
+    else:
+        results = [call(plan) for plan in plans]
+    wall = time.perf_counter() - started
+
+    latencies = [elapsed for elapsed, _, _ in results]
+    queries = [count for _, _, count in results if count is not None]
+    return {
+        "requests": requests,
+        "errors": sum(1 for _, status, _ in results if status >= 400),
+        "rps": round(requests / wall, 2) if wall else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "p50_ms": _round(percentile(latencies, 50)),
+        "p95_ms": _round(percentile(latencies, 95)),
+        "p99_ms": _round(percentile(latencies, 99)),
+        "queries_mean": round(sum(queries) / len(queries), 2) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+
+def run_benchmark(target, scenarios=SCENARIOS, requests: int = 200, concurrency: int = 1, seed=None) -> dict:
+    """
+    Выполняет сценарии по очереди и собирает результаты прогона.
+
+    Идентификаторы звеньев берутся из первой страницы списка звеньев (до 500 штук).
+
+    :param target: :class:`InProcessTarget` или :class:`HttpTarget`.
+    :param scenarios: Сценарии из :data:`SCENARIOS`.
+    :param requests: Количество запросов на сценарий.
+    :param concurrency: Количество параллельных потоков.
+    :param seed: Зерно генератора случайных чисел.
+    :raises ValueError: Если в сети нет звеньев.
+    :return: Конфигурация, окружение и сводка по каждому сценарию.
+    :rtype: dict
+    """
+    status, _, content = target.request("GET", reverse("supply:node-list") + "?page_size=500")
+    node_ids = [item["id"] for item in json.loads(content)["results"]] if status == 200 else []
+    if not node_ids:
+        raise ValueError("В сети нет звеньев: сначала выполните generate_supply_network.")
+    return {
+        "started_at": timezone.now().isoformat(),
+        "config": {"scenarios": list(scenarios), "requests": requests, "concurrency": concurrency, "seed": seed},
+        "environment": {
+            "target": type(target).__name__,
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        },
+        "scenarios": {
+            scenario: run_scenario(target, scenario, requests, concurrency, node_ids, seed) for scenario in scenarios
+        },
+    }
+
+
+def measure_serialization(serializer_class, queryset, repeat: int = 5) -> dict:
+    """
+    Сравнивает процессорное время на одну строку: выборка объектов модели, поля DRF и :class:`JSONRenderer`
+    против выборки ``.values()``, :class:`supply.serializers.ValuesListSerializer` и :class:`FastJSONRenderer`.
+
+    :param serializer_class: Сериализатор списка (``NodeSerializer`` или ``ProductSerializer``).
+    :param queryset: Набор запросов строк (например, первая страница списка).
+    :param repeat: Количество повторов; берётся лучшее время.
+    :return: Количество строк, микросекунды на строку для каждого пути и ускорение.
+    :rtype: dict
+    """
+    sources = [field.source for field in serializer_class().fields.values()]
+    paths = {
+        "model": lambda: JSONRenderer().render(serializer_class(list(queryset.all()), many=True).data),
+        "values": lambda: FastJSONRenderer().render(serializer_class(list(queryset.values(*sources)), many=True).data),
+    }
+    rows = queryset.count()
+    timings = {}
+    for name, path in paths.items():
+        best = None
+        for _ in range(repeat):
+            started = time.process_time()
+            path()
+            elapsed = time.process_time() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    return {
+        "rows": rows,
+        "model_us_per_row": round(timings["model"] / rows * 1e6, 2) if rows else None,
+        "values_us_per_row": round(timings["values"] / rows * 1e6, 2) if rows else None,
+        "speedup": round(timings["model"] / timings["values"], 1) if timings["values"] else None,
+    }
+
+
+def compare(current: dict, previous: dict) -> dict:
+    """
+    Сравнивает p95 и RPS двух прогонов.
+
+    :return: Изменения по сценариям: ``{"list": {"p95_ms": +1.2, "rps": -30.0}, ...}``.
+    :rtype: dict
+    """
+    diff = {}
+    for scenario, stats in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(scenario)
+        if not before:
+            continue
+        diff[scenario] = {
+            metric: round(stats[metric] - before[metric], 2)
+            for metric in ("p95_ms", "rps")
+            if stats.get(metric) is not None and before.get(metric) is not None
+        }
+    return diff
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
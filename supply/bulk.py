@@ -0,0 +1,420 @@
+"""
+Пакетное создание и обновление (upsert) звеньев сети и продуктов.
+
+Вместо сотен отдельных POST-запросов клиент передаёт массив записей.
+Поля каждой записи проверяются сериализатором без обращений к БД, а
+уникальность и ссылки на поставщиков/владельцев — несколькими
+запросами на весь пакет (``WHERE ... IN (...)``). Корректные записи
+пишутся через ``bulk_create``/``bulk_update`` в одной транзакции,
+для каждой записи возвращается собственный результат.
+
+Проверки выполняются до транзакции записи, поэтому параллельный запрос может
+успеть создать звено с тем же названием (контактами) или удалить обновляемую
+запись. Тогда нарушение ограничения уникальности или внешнего ключа либо
+несовпадение числа обновлённых строк откатывает весь пакет и даёт ``409 Conflict``
+(:class:`BulkConflict`); клиент повторяет загрузку, и повтор увидит новые данные.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from supply.cache import invalidate_nodes, invalidate_products
+from supply.models import Node, NodeClosure, Product, path_ids
+
+CREATED, UPDATED, ERROR = "created", "updated", "error"
+
+
+class BulkConflict(APIException):
+    """
+    Пакет конфликтует с изменениями, записанными параллельным запросом после проверки пакета.
+    """
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Данные изменены параллельным запросом, повторите загрузку пакета."
+    default_code = "bulk_conflict"
+
+
+class NodeBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Проверка полей одной записи пакета звеньев.
+
+    Проверки уникальности и существования поставщика отключены: они выполняются
+    для всего пакета сразу в :func:`bulk_upsert_nodes`.
+    """
+
+    supplier = serializers.IntegerField(allow_null=True, required=False, min_value=1)
+
+    class Meta:
+        model = Node
+        fields = ["name", "email", "phone", "country", "city", "street", "building_number", "supplier"]
+        extra_kwargs = {field: {"validators": []} for field in ("name", "email", "phone")}
+
+
+class ProductBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Проверка полей одной записи пакета продуктов.
+
+    Запись с ``id`` обновляет существующий продукт, без ``id`` — создаёт новый.
+    Существование владельца проверяется для всего пакета сразу в :func:`bulk_upsert_products`.
+    """
+
+    id = serializers.IntegerField(required=False, min_value=1)
+    owner = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = Product
+        fields = ["id", "name", "model", "release_date", "owner"]
+
+
+def validate_items(items, serializer_class):
+    """
+    Проверяет формат пакета и поля каждой записи.
+
+    :param items: Данные запроса.
+    :param serializer_class: Сериализатор одной записи.
+    :raises serializers.ValidationError: Если пакет не является непустым массивом допустимого размера.
+    :return: Пары ``(проверенные данные или None, ошибки или None)`` в порядке записей.
+    :rtype: list[tuple]
+    """
+    if not isinstance(items, list) or not items:
+        raise serializers.ValidationError("Ожидается непустой массив записей.")
+    if len(items) > settings.SUPPLY_BULK_MAX_ITEMS:
+        raise serializers.ValidationError(f"Не более {settings.SUPPLY_BULK_MAX_ITEMS} записей за один запрос.")
+    checked = []
+    for item in items:
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            checked.append((dict(serializer.validated_data), None))
+        else:
+            checked.append((None, serializer.errors))
+    return checked
+
+
+def _reject_duplicates(checked, field):
+    """
+    Помечает ошибкой повторы значения ``field`` внутри пакета (кроме первого вхождения).
+    """
+    seen = set()
+    for index, (data, _) in enumerate(checked):
+        if data is None or data.get(field) is None:
+            continue
+        if data[field] in seen:
+            checked[index] = (None, {field: ["Значение повторяется в пакете."]})
+        seen.add(data[field])
+
+
+def _results(checked, created, updated) -> list[dict]:
+    """
+    Собирает результаты записей пакета в исходном порядке.
+
+    :param checked: Пары ``(данные, ошибки)``; у ошибочных записей данные — ``None``.
+    :param created: Пары ``(индекс, объект)`` созданных записей.
+    :param updated: Пары ``(индекс, объект)`` обновлённых записей.
+    :rtype: list[dict]
+    """
+    results = {index: {"index": index, "status": CREATED, "id": obj.pk} for index, obj in created}
+    results.update({index: {"index": index, "status": UPDATED, "id": obj.pk} for index, obj in updated})
+    return [
+        results.get(index) or {"index": index, "status": ERROR, "errors": errors}
+        for index, (_, errors) in enumerate(checked)
+    ]
+
+
+def _apply_errors(checked, errors: dict) -> None:
+    """
+    Помечает записи ошибками вида ``{индекс: {поле: [сообщения]}}``.
+    """
+    for index, item_errors in errors.items():
+        checked[index] = (None, item_errors)
+
+
+def bulk_upsert_nodes(items) -> list[dict]:
+    """
+    Создаёт или обновляет звенья сети пакетом. Ключ upsert — уникальное поле ``name``.
+
+    Уникальность ``email``/``phone`` и существование поставщиков проверяются
+    тремя-четырьмя запросами на весь пакет, циклы в иерархии — по поставщикам,
+    которые получатся после применения всего пакета. Новые звенья вставляются одним
+    ``bulk_create`` с уже вычисленными ``level``/``path`` и связями в
+    :class:`~supply.models.NodeClosure`; существующие обновляются ``bulk_update``.
+    Звенья, у которых меняется поставщик, сохраняются через :meth:`Node.save`
+    (до вставки новых звеньев), чтобы перенести их поддерево. ``debt_to_supplier``
+    через пакет не меняется, поэтому сводные показатели пересчитываются одним
+    ``UPDATE`` только у поставщиков новых звеньев и их предков.
+
+    :param items: Массив записей.
+    :raises BulkConflict: Если параллельный запрос изменил звенья после проверки пакета.
+    :return: Результат для каждой записи: ``index``, ``status``, ``id`` или ``errors``.
+    :rtype: list[dict]
+    """
+    checked = validate_items(items, NodeBulkItemSerializer)
+    for field in ("name", "email", "phone"):
+        _reject_duplicates(checked, field)
+
+    valid = [data for data, _ in checked if data is not None]
+    existing = Node.objects.in_bulk([data["name"] for data in valid], field_name="name")
+    supplier_ids = {data["supplier"] for data in valid if data.get("supplier")}
+    suppliers = Node.objects.only("id", "level", "path").in_bulk(supplier_ids)
+
+    errors = _node_contact_errors(checked)
+    _node_supplier_errors(checked, existing, suppliers, errors)
+    _apply_errors(checked, errors)
+
+    to_create, to_update, to_move = _partition_nodes(checked, existing, suppliers)
+    _write_nodes(to_create, to_update, to_move, suppliers)
+    return _results(checked, to_create, to_update + to_move)
+
+
+def _node_contact_errors(checked) -> dict:
+    """
+    Находит записи, чьи ``email``/``phone`` уже заняты другими звеньями (по запросу на поле).
+
+    :return: Ошибки вида ``{индекс: {поле: [сообщения]}}``.
+    :rtype: dict
+    """
+    errors = defaultdict(dict)
+    valid = [(index, data) for index, (data, _) in enumerate(checked) if data is not None]
+    for field in ("email", "phone"):
+        owners = dict(
+            Node.objects.filter(**{f"{field}__in": [data[field] for _, data in valid]}).values_list(field, "name")
+        )
+        for index, data in valid:
+            owner_name = owners.get(data[field])
+            if owner_name is not None and owner_name != data["name"]:
+                errors[index][field] = ["Звено с таким значением уже существует."]
+    return errors
+
+
+def _node_supplier_errors(checked, existing: dict, suppliers: dict, errors: dict) -> None:
+    """
+    Дополняет ``errors`` ссылками на несуществующих поставщиков и переносами, создающими цикл.
+
+    :param existing: Существующие звенья пакета по названию.
+    :param suppliers: Поставщики пакета по ``id``.
+    """
+    moves = {}
+    for index, (data, _) in enumerate(checked):
+        if data is None or index in errors:
+            continue
+        supplier_id = data.get("supplier") or None
+        if supplier_id is not None and supplier_id not in suppliers:
+            errors[index]["supplier"] = [f"Звено с id={supplier_id} не найдено."]
+            continue
+        current = existing.get(data["name"])
+        if current is not None and current.supplier_id != supplier_id:
+            moves[index] = (current.pk, supplier_id)
+    for index in _cyclic_moves(moves, suppliers):
+        errors[index]["supplier"] = ["Нельзя назначить поставщиком само звено или его клиента."]
+
+
+def _cyclic_moves(moves: dict, suppliers: dict) -> set:
+    """
+    Находит переносы, которые замкнули бы цикл в иерархии после применения всего пакета.
+
+    Предки звена берутся из его ``path`` до пакета, но у переносимых звеньев вместо прежнего
+    поставщика берётся новый: так ловится и взаимный обмен поставщиками (A под B, B под A),
+    которого по отдельности не видно. Отклонённые переносы убираются, и проверка повторяется
+    для оставшихся, пока циклы не исчезнут.
+
+    :param moves: Переносы вида ``{индекс: (id звена, id нового поставщика или None)}``.
+    :param suppliers: Поставщики пакета по ``id`` (с ``path``).
+    :return: Индексы отклонённых записей.
+    :rtype: set
+    """
+    moves = dict(moves)
+    rejected = set()
+    while True:
+        targets = dict(moves.values())
+        cyclic = {index for index, (pk, supplier_id) in moves.items() if _reaches(supplier_id, pk, targets, suppliers)}
+        if not cyclic:
+            return rejected
+        rejected |= cyclic
+        for index in cyclic:
+            del moves[index]
+
+
+def _reaches(start_id, node_id, targets: dict, suppliers: dict) -> bool:
+    """
+    Проверяет, встречается ли ``node_id`` среди ``start_id`` и его предков с учётом переносов ``targets``.
+    """
+    if start_id is None:
+        return False
+    current, ancestors, seen = start_id, path_ids(suppliers[start_id].path), set()
+    while current not in seen:
+        if current == node_id:
+            return True
+        seen.add(current)
+        if current in targets:
+            current = targets[current]
+            if current is None:
+                return False
+            ancestors = path_ids(suppliers[current].path)
+        elif ancestors:
+            current = ancestors.pop()
+        else:
+            return False
+    # Цикл без node_id: его найдёт проверка одного из звеньев цикла
+    return False
+
+
+def _partition_nodes(checked, existing: dict, suppliers: dict) -> tuple[list, list, list]:
+    """
+    Делит корректные записи на новые, обновляемые на месте и переносимые к другому поставщику.
+
+    :return: Три списка пар ``(индекс, звено)``.
+    :rtype: tuple[list, list, list]
+    """
+    to_create, to_update, to_move = [], [], []
+    for index, (data, _) in enumerate(checked):
+        if data is None:
+            continue
+        supplier = suppliers.get(data.pop("supplier", None))
+        node = existing.get(data["name"])
+        if node is None:
+            to_create.append((index, Node(supplier=supplier, **data)))
+            continue
+        for field, value in data.items():
+            setattr(node, field, value)
+        if node.supplier_id != (supplier.pk if supplier else None):
+            node.supplier = supplier
+            to_move.append((index, node))
+        else:
+            to_update.append((index, node))
+    return to_create, to_update, to_move
+
+
+def _write_nodes(to_create, to_update, to_move, suppliers: dict) -> None:
+    """
+    Записывает звенья пакета в одной транзакции и сбрасывает их закэшированные ответы.
+
+    :param suppliers: Поставщики пакета по ``id``; перечитываются после переносов.
+    :raises BulkConflict: Если запись нарушила ограничение или не нашла обновляемые строки.
+    """
+    update_fields = [field for field in NodeBulkItemSerializer.Meta.fields if field not in ("name", "supplier")]
+    now = timezone.now()
+    for _, node in to_update:
+        node.updated_at = now  # bulk_update не заполняет auto_now
+    # Прежние предки переносимых звеньев: после переноса их нет в таблице замыканий
+    old_ancestor_ids = {pk for _, node in to_move for pk in path_ids(node.path)}
+    try:
+        with transaction.atomic():
+            for _, node in to_move:
+                node.save()
+            if to_move:
+                # Переносы могли изменить пути поставщиков новых звеньев
+                suppliers = Node.objects.only("id", "level", "path").in_bulk(list(suppliers))
+            for _, node in to_create:
+                supplier = suppliers.get(node.supplier_id)
+                node.level, node.path = (supplier.level + 1, supplier.subtree_path) if supplier else (0, "/")
+            created = Node.objects.bulk_create([node for _, node in to_create], batch_size=1000)
+            NodeClosure.objects.attach(*created)
+            Node.objects.above({node.supplier_id for node in created if node.supplier_id}).refresh_rollups()
+            updated = Node.objects.bulk_update(
+                [node for _, node in to_update], [*update_fields, "updated_at"], batch_size=1000
+            )
+            if updated != len(to_update):
+                raise BulkConflict()
+            invalidate_nodes([node.pk for _, node in to_create + to_update])
+            invalidate_nodes([node.pk for _, node in to_move], old_ancestor_ids, with_subtrees=True)
+    except (IntegrityError, ValueError) as error:
+        # ValueError — цикл из-за переноса, записанного параллельным запросом после проверки пакета
+        raise BulkConflict() from error
+
+
+def bulk_upsert_products(items) -> list[dict]:
+    """
+    Создаёт или обновляет продукты пакетом.
+
+    Запись с ``id`` обновляет продукт, без ``id`` — создаёт новый. Владельцы и
+    обновляемые продукты проверяются двумя запросами на весь пакет, запись —
+    одним ``bulk_create`` и одним ``bulk_update``. Счётчики продуктов в поддереве
+    пересчитываются одним ``UPDATE`` у затронутых владельцев и их предков.
+
+    :param items: Массив записей.
+    :raises BulkConflict: Если параллельный запрос изменил продукты или владельцев после проверки пакета.
+    :return: Результат для каждой записи: ``index``, ``status``, ``id`` или ``errors``.
+    :rtype: list[dict]
+    """
+    checked = validate_items(items, ProductBulkItemSerializer)
+    _reject_duplicates(checked, "id")
+
+    valid = [data for data, _ in checked if data is not None]
+    owner_ids = set(Node.objects.filter(pk__in={data["owner"] for data in valid}).values_list("id", flat=True))
+    existing = Product.objects.in_bulk([data["id"] for data in valid if "id" in data])
+    _apply_errors(checked, _product_errors(checked, owner_ids, existing))
+
+    to_create, to_update, touched_owner_ids = _partition_products(checked, existing)
+    _write_products(to_create, to_update, touched_owner_ids)
+    return _results(checked, to_create, to_update)
+
+
+def _product_errors(checked, owner_ids: set, existing: dict) -> dict:
+    """
+    Находит записи с несуществующим владельцем или обновляемым продуктом.
+
+    :return: Ошибки вида ``{индекс: {поле: [сообщения]}}``.
+    :rtype: dict
+    """
+    errors = defaultdict(dict)
+    for index, (data, _) in enumerate(checked):
+        if data is None:
+            continue
+        if data["owner"] not in owner_ids:
+            errors[index]["owner"] = [f"Звено с id={data['owner']} не найдено."]
+        if "id" in data and data["id"] not in existing:
+            errors[index]["id"] = [f"Продукт с id={data['id']} не найден."]
+    return errors
+
+
+def _partition_products(checked, existing: dict) -> tuple[list, list, set]:
+    """
+    Делит корректные записи на новые и обновляемые продукты.
+
+    :return: Пары ``(индекс, продукт)`` для создания и обновления и ``id`` владельцев,
+        у которых изменилось число продуктов.
+    :rtype: tuple[list, list, set]
+    """
+    to_create, to_update = [], []
+    touched_owner_ids = set()
+    now = timezone.now()
+    for index, (data, _) in enumerate(checked):
+        if data is None:
+            continue
+        owner_id = data.pop("owner")
+        product = existing.get(data.pop("id", None)) or Product()
+        for field, value in data.items():
+            setattr(product, field, value)
+        if product.owner_id != owner_id:
+            touched_owner_ids.update(pk for pk in (product.owner_id, owner_id) if pk)
+        product.owner_id = owner_id
+        product.updated_at = now  # bulk_update не заполняет auto_now
+        (to_update if product.pk else to_create).append((index, product))
+    return to_create, to_update, touched_owner_ids
+
+
+def _write_products(to_create, to_update, touched_owner_ids: set) -> None:
+    """
+    Записывает продукты пакета в одной транзакции и сбрасывает зависящие от них ответы.
+
+    :raises BulkConflict: Если запись нарушила ограничение или не нашла обновляемые строки.
+    """
+    try:
+        with transaction.atomic():
+            Product.objects.bulk_create([product for _, product in to_create], batch_size=1000)
+            updated = Product.objects.bulk_update(
+                [product for _, product in to_update],
+                ["name", "model", "release_date", "owner", "updated_at"],
+                batch_size=1000,
+            )
+            if updated != len(to_update):
+                raise BulkConflict()
+            Node.objects.above(touched_owner_ids).refresh_rollups()
+            invalidate_products(touched_owner_ids | {product.owner_id for _, product in to_create + to_update})
+    except IntegrityError as error:
+        raise BulkConflict() from error
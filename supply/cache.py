@@ -0,0 +1,322 @@
+"""
+Кэш ответов API сети поставок.
+
+Ответ кэшируется по абсолютному URL запроса (с отсортированными параметрами
+фильтрации, сортировки и курсора) и набору «областей» (scopes), от которых он
+зависит: коллекция звеньев, коллекция продуктов, конкретное звено, продукты
+конкретного звена. У каждой области в кэше хранится версия; ключ ответа
+включает версии всех его областей, поэтому инвалидация — это смена версий
+нужных областей одним ``set_many``, без поиска и удаления ключей по шаблону.
+Так схема одинаково работает с locmem, filebased и Redis.
+
+Версии меняются обработчиками ``post_save``/``post_delete`` (:mod:`supply.signals`)
+и явно — в массовых операциях, которые идут в обход сигналов.
+
+Тот же хэш URL и версий служит сильным ``ETag``: запрос с совпадающим
+``If-None-Match`` получает ``304 Not Modified`` без обращения к БД и сериализации.
+Версия хранит и время своей смены, поэтому ``Last-Modified`` ответа — наибольшее
+время смены его областей: удаление объекта или его уход со страницы списка меняют
+версию коллекции и, значит, ``Last-Modified``, чего не дал бы ``updated_at`` строк ответа.
+"""
+
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+from rest_framework.response import Response
+
+from supply.models import NodeClosure
+
+# Области, от которых зависит каждый ответ
+ALL, NODES, PRODUCTS = "all", "nodes", "products"
+
+
+def node_scope(node_id) -> str:
+    return f"node:{node_id}"
+
+
+def node_products_scope(node_id) -> str:
+    return f"node-products:{node_id}"
+
+
+def get_cache():
+    return caches[settings.SUPPLY_CACHE_ALIAS]
+
+
+def _version_key(scope: str) -> str:
+    return f"supply:version:{scope}"
+
+
+def new_version() -> str:
+    """
+    Создаёт версию области: случайная часть и время смены (секунды Unix).
+
+    :rtype: str
+    """
+    return f"{uuid.uuid4().hex}:{time.time():.6f}"
+
+
+def versions_modified(versions) -> float | None:
+    """
+    Возвращает наибольшее время смены версий.
+
+    :param versions: Версии областей.
+    :return: Секунды Unix или ``None``, если у какой-либо версии нет времени смены (созданной до его появления).
+    :rtype: float or None
+    """
+    stamps = []
+    for version in versions:
+        _, _, stamp = version.partition(":")
+        try:
+            stamps.append(float(stamp))
+        except ValueError:
+            return None
+    return max(stamps, default=None)
+
+
+def get_versions(scopes) -> list[str]:
+    """
+    Возвращает текущие версии областей, создавая отсутствующие.
+
+    :param scopes: Названия областей.
+    :return: Версии в порядке областей.
+    :rtype: list[str]
+    """
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(scopes) -> list[str]:
+    """
+    Асинхронный вариант :func:`get_versions` для async-представлений.
+
+    :param scopes: Названия областей.
+    :rtype: list[str]
+    """
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = await cache.aget_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump(scopes) -> None:
+    """
+    Меняет версии областей сразу и ещё раз после фиксации текущей транзакции.
+
+    Повторная смена после ``COMMIT`` не даёт закрепиться ответу, который
+    параллельный запрос успел закэшировать по ещё не зафиксированным данным.
+
+    :param scopes: Названия областей.
+    """
+    scopes = set(scopes)
+    if not scopes:
+        return
+
+    def renew():
+        get_cache().set_many({_version_key(scope): new_version() for scope in scopes}, timeout=None)
+
+    renew()
+    transaction.on_commit(renew)
+
+
+def invalidate_all() -> None:
+    """
+    Сбрасывает все закэшированные ответы (например, после пересчёта всей иерархии).
+    """
+    bump([ALL])
+
+
+def invalidate_nodes(node_ids, extra_ancestor_ids=(), with_subtrees: bool = False) -> None:
+    """
+    Сбрасывает ответы, зависящие от звеньев: их карточки, карточки их предков
+    (сводные показатели поддерева) и списки звеньев.
+
+    Предки берутся из таблицы замыканий; предки, которых в ней ещё (новое звено)
+    или уже (перенесённое звено) нет, передаются явно.
+
+    :param node_ids: Идентификаторы изменённых звеньев.
+    :param extra_ancestor_ids: Предки, отсутствующие в таблице замыканий на момент вызова.
+    :param with_subtrees: Сбросить также карточки всех потомков (изменились их уровень и путь).
+    :type with_subtrees: bool
+    """
+    node_ids = {pk for pk in node_ids if pk is not None}
+    if not node_ids:
+        return
+    affected = set(node_ids) | set(extra_ancestor_ids)
+    affected.update(NodeClosure.objects.filter(descendant_id__in=node_ids).values_list("ancestor_id", flat=True))
+    if with_subtrees:
+        affected.update(NodeClosure.objects.filter(ancestor_id__in=node_ids).values_list("descendant_id", flat=True))
+    bump([NODES, *(node_scope(pk) for pk in affected)])
+
+
+def invalidate_products(owner_ids) -> None:
+    """
+    Сбрасывает ответы, зависящие от продуктов владельцев: список продуктов,
+    продукты каждого владельца и карточки звеньев (счётчики продуктов поддерева).
+
+    :param owner_ids: Идентификаторы владельцев изменённых продуктов.
+    """
+    owner_ids = {pk for pk in owner_ids if pk is not None}
+    if not owner_ids:
+        return
+    bump([PRODUCTS, *(node_products_scope(pk) for pk in owner_ids)])
+    invalidate_nodes(owner_ids)
+
+
+class ResponseCacheMixin:
+    """
+    Кэширует успешные ответы ``GET`` представления и поддерживает условные запросы.
+
+    Проверки аутентификации и прав выполняются до обращения к кэшу. Области,
+    от которых зависит ответ, задаёт атрибут :attr:`cache_scopes` или, если они
+    зависят от запроса, метод :meth:`get_cache_scopes`. Представление без областей
+    не кэшируется: его ответ нечем было бы сбросить.
+
+    Каждый ответ получает сильный ``ETag`` (хэш URL, формата ответа и версий областей)
+    и ``Last-Modified`` (последняя смена версий тех же областей). Запрос с
+    совпадающим ``If-None-Match`` (или, без него, с ``If-Modified-Since`` не раньше
+    ``Last-Modified``) получает ``304 Not Modified``. Заголовок ``X-Cache`` сообщает,
+    был ли ответ взят из кэша (``HIT``) или построен (``MISS``).
+    """
+
+    # Области, от которых зависит ответ (кроме общей области ``all``)
+    cache_scopes: tuple = ()
+
+    def get_cache_scopes(self) -> list[str]:
+        """
+        Возвращает области, от которых зависит ответ (кроме общей области ``all``).
+
+        :rtype: list[str]
+        """
+        return list(self.cache_scopes)
+
+    def get_cache_token(self, request, versions: list[str]) -> str:
+        """
+        Хэширует URL без учёта порядка параметров, формат ответа и версии областей.
+
+        Значение одновременно служит ключом кэша и ``ETag`` ответа.
+
+        :param versions: Текущие версии областей :meth:`get_all_cache_scopes`.
+        :rtype: str
+        """
+        params = sorted((name, value) for name, values in request.query_params.lists() for value in values)
+        base = request.build_absolute_uri(request.path)
+        raw = repr((base, params, request.accepted_media_type, self.get_all_cache_scopes(), versions))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_all_cache_scopes(self) -> list[str]:
+        return [ALL, *self.get_cache_scopes()]
+
+    def get(self, request, *args, **kwargs):
+        if not self.get_cache_scopes():
+            return super().get(request, *args, **kwargs)
+        versions = get_versions(self.get_all_cache_scopes())
+        token = self.get_cache_token(request, versions)
+        headers, not_modified = self._check_etag(request, token, versions)
+        if not_modified is not None:
+            return not_modified
+
+        timeout = settings.SUPPLY_RESPONSE_CACHE_TIMEOUT
+        cached = get_cache().get(_response_key(token)) if timeout else None
+        response = None
+        if cached is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cached = response.data
+            if timeout:
+                get_cache().set(_response_key(token), cached, timeout)
+        return self._finish(request, response, cached, headers)
+
+    @staticmethod
+    def _check_etag(request, token: str, versions: list[str]):
+        """
+        Возвращает заголовки ответа и готовый ответ ``304``, если ``If-None-Match`` совпал с ``ETag``
+        или, без ``If-None-Match``, ``If-Modified-Since`` не раньше последней смены версий.
+        """
+        etag = f'"{token[:40]}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        last_modified = versions_modified(versions)
+        # Last-Modified точен до секунды: пока идёт секунда последней смены, в неё может попасть
+        # ещё одна, и клиент с тем же If-Modified-Since получил бы 304 на устаревшие данные
+        if last_modified is not None and time.time() - last_modified >= 1:
+            last_modified = int(last_modified)
+            headers["Last-Modified"] = http_date(last_modified)
+        else:
+            last_modified = None
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            if _etag_matches(etag, if_none_match):
+                return headers, Response(status=304, headers=headers)
+            return headers, None
+        since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        if last_modified is not None and since is not None and last_modified <= since:
+            return headers, Response(status=304, headers=headers)
+        return headers, None
+
+    @staticmethod
+    def _finish(request, response, data, headers: dict):
+        """
+        Дополняет ответ заголовками кэша.
+        """
+        headers["X-Cache"] = "HIT" if response is None else "MISS"
+        response = response or Response(data)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+
+class AsyncResponseCacheMixin(ResponseCacheMixin):
+    """
+    Вариант :class:`ResponseCacheMixin` для async-представлений: версии областей
+    и ответы читаются и пишутся асинхронным API кэша.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        if not self.get_cache_scopes():
+            return await super(ResponseCacheMixin, self).get(request, *args, **kwargs)
+        versions = await aget_versions(self.get_all_cache_scopes())
+        token = self.get_cache_token(request, versions)
+        headers, not_modified = self._check_etag(request, token, versions)
+        if not_modified is not None:
+            return not_modified
+
+        timeout = settings.SUPPLY_RESPONSE_CACHE_TIMEOUT
+        cached = await get_cache().aget(_response_key(token)) if timeout else None
+        response = None
+        if cached is None:
+            # Минуя синхронный ResponseCacheMixin.get — сразу к обработчику представления
+            response = await super(ResponseCacheMixin, self).get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cached = response.data
+            if timeout:
+                await get_cache().aset(_response_key(token), cached, timeout)
+        return self._finish(request, response, cached, headers)
+
+
+def _response_key(token: str) -> str:
+    return f"supply:response-data:{token}"
+
+
+def _etag_matches(etag: str, header: str) -> bool:
+    """
+    Проверяет ``If-None-Match`` слабым сравнением (RFC 9110, 13.1.2).
+    """
+    tags = parse_etags(header)
+    return "*" in tags or etag in {tag.removeprefix("W/") for tag in tags}
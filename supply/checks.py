@@ -0,0 +1,130 @@
+"""
+Системные проверки (``manage.py check``) настроек соединений с БД и кэша.
+
+Проверка настроек выполняется при каждом запуске ``manage.py``; проверка
+доступности БД — только с ``--database`` (``manage.py check --database default``),
+её вызывает ``entrypoint-web.sh`` перед миграциями.
+"""
+
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from supply.db import ping
+
+LOCMEM_CACHE_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+
+# Настройки с алиасами кэшей, которые должны быть общими для всех процессов приложения
+SHARED_CACHE_SETTINGS = ("SUPPLY_CACHE_ALIAS", "USER_AUTH_CACHE_ALIAS", "API_THROTTLE_CACHE_ALIAS")
+
+
+def validate_database_settings(alias: str, config: dict) -> list:
+    """
+    Проверяет стратегию соединений одной БД.
+
+    :param alias: Алиас БД.
+    :param config: Настройки БД из ``settings.DATABASES``.
+    :return: Ошибки и предупреждения.
+    :rtype: list[django.core.checks.CheckMessage]
+    """
+    messages = []
+    conn_max_age = config.get("CONN_MAX_AGE", 0)
+    pool = (config.get("OPTIONS") or {}).get("pool")
+    postgresql = config.get("ENGINE", "").startswith("django.db.backends.postgresql")
+
+    if pool:
+        if not (find_spec("psycopg") and find_spec("psycopg_pool")):
+            messages.append(
+                Error(
+                    f"Для пула соединений БД '{alias}' нужен psycopg 3 с пулом.",
+                    hint="Установите psycopg[binary,pool] или отключите DB_POOL.",
+                    id="supply.E001",
+                )
+            )
+        if conn_max_age != 0:
+            messages.append(
+                Error(
+                    f"Пул соединений БД '{alias}' несовместим с постоянными соединениями.",
+                    hint="При DB_POOL=True CONN_MAX_AGE должен быть 0.",
+                    id="supply.E002",
+                )
+            )
+        if isinstance(pool, dict) and pool.get("min_size", 0) > pool.get("max_size", pool.get("min_size", 0)):
+            messages.append(Error(f"DB_POOL_MIN_SIZE больше DB_POOL_MAX_SIZE для БД '{alias}'.", id="supply.E003"))
+    elif postgresql and conn_max_age == 0:
+        messages.append(
+            Warning(
+                f"БД '{alias}': каждый запрос открывает новое соединение с PostgreSQL.",
+                hint="Задайте DB_CONN_MAX_AGE > 0 или включите DB_POOL.",
+                id="supply.W001",
+            )
+        )
+    if conn_max_age != 0 and not config.get("CONN_HEALTH_CHECKS"):
+        messages.append(
+            Warning(
+                f"БД '{alias}': постоянные соединения без проверки перед повторным использованием.",
+                hint="Включите DB_CONN_HEALTH_CHECKS, чтобы оборванное соединение не приводило к ошибке запроса.",
+                id="supply.W002",
+            )
+        )
+    return messages
+
+
+@register()
+def check_database_settings(app_configs, **kwargs):
+    messages = []
+    for alias, config in settings.DATABASES.items():
+        messages += validate_database_settings(alias, config)
+    return messages
+
+
+def validate_cache_settings(caches: dict, aliases: dict, debug: bool, workers: int) -> list:
+    """
+    Проверяет, что кэши, от которых зависит согласованность ответов, общие для всех процессов.
+
+    LocMemCache хранится в памяти процесса: смена версии области кэша (запись) видна только
+    воркеру, который её выполнил, остальные отдают устаревшие ответы до истечения времени жизни.
+
+    :param caches: ``settings.CACHES``.
+    :param aliases: Имя настройки -> алиас кэша.
+    :param debug: ``settings.DEBUG``.
+    :param workers: Количество процессов приложения.
+    :rtype: list[django.core.checks.CheckMessage]
+    """
+    if debug and workers <= 1:
+        return []
+    messages = []
+    for setting, alias in aliases.items():
+        if (caches.get(alias) or {}).get("BACKEND") == LOCMEM_CACHE_BACKEND:
+            messages.append(
+                Error(
+                    f"{setting}: кэш '{alias}' (LocMemCache) не общий для {workers} процессов приложения.",
+                    hint=(
+                        "Задайте CACHE_BACKEND=django.core.cache.backends.redis.RedisCache и "
+                        "CACHE_LOCATION=redis://redis:6379/1; LocMemCache — только для runserver с DJANGO_DEBUG=True."
+                    ),
+                    id="supply.E005",
+                )
+            )
+    return messages
+
+
+@register()
+def check_cache_settings(app_configs, **kwargs):
+    aliases = {setting: getattr(settings, setting) for setting in SHARED_CACHE_SETTINGS}
+    return validate_cache_settings(settings.CACHES, aliases, settings.DEBUG, settings.WEB_WORKERS)
+
+
+@register(Tags.database)
+def check_database_connections(app_configs, databases=None, **kwargs):
+    """
+    Проверяет доступность БД, переданных через ``--database``.
+    """
+    errors = []
+    for alias in databases or ():
+        try:
+            ping(alias)
+        except Exception as exc:
+            errors.append(Error(f"Нет соединения с БД '{alias}': {exc}", id="supply.E004"))
+    return errors
@@ -0,0 +1,115 @@
+"""
+Состояние соединений с БД: проверка доступности и метрики пула соединений.
+Оценка количества строк таблицы по статистике планировщика (:func:`estimated_count`).
+
+При ``DB_POOL=True`` Django держит в каждом процессе (воркере gunicorn) пул
+psycopg 3 (``psycopg_pool.ConnectionPool``); метрики пула относятся к процессу,
+который обработал запрос. Без пула соединения переиспользуются в пределах
+``CONN_MAX_AGE`` и метрик пула нет.
+"""
+
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def ping(alias: str = DEFAULT_DB_ALIAS) -> float:
+    """
+    Выполняет ``SELECT 1`` и возвращает время ответа БД.
+
+    :param alias: Алиас БД из ``settings.DATABASES``.
+    :return: Время в миллисекундах.
+    :rtype: float
+    """
+    started = time.perf_counter()
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def pool_stats(alias: str = DEFAULT_DB_ALIAS) -> dict | None:
+    """
+    Возвращает метрики пула соединений текущего процесса.
+
+    Пул насыщен, если занята доля ``SUPPLY_DB_POOL_SATURATION_WARNING`` его
+    максимального размера или есть запросы, ожидающие свободного соединения.
+
+    :param alias: Алиас БД из ``settings.DATABASES``.
+    :return: Размеры пула, занятые и ожидающие соединения, счётчики запросов к пулу;
+        ``None``, если пул не настроен.
+    :rtype: dict or None
+    """
+    pool = getattr(connections[alias], "pool", None)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    max_size = stats.get("pool_max") or pool.max_size
+    in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+    waiting = stats.get("requests_waiting", 0)
+    saturation = round(in_use / max_size, 3) if max_size else 0.0
+    return {
+        "min_size": stats.get("pool_min", pool.min_size),
+        "max_size": max_size,
+        "size": stats.get("pool_size", 0),
+        "in_use": in_use,
+        "available": stats.get("pool_available", 0),
+        "waiting": waiting,
+        "requests": stats.get("requests_num", 0),
+        "queued": stats.get("requests_queued", 0),
+        "wait_ms": stats.get("requests_wait_ms", 0),
+        "errors": stats.get("requests_errors", 0),
+        "saturation": saturation,
+        "saturated": waiting > 0 or saturation >= settings.SUPPLY_DB_POOL_SATURATION_WARNING,
+    }
+
+
+def database_status(alias: str = DEFAULT_DB_ALIAS) -> dict:
+    """
+    Сводка по соединению с БД: стратегия соединений, время ответа и метрики пула.
+
+    :param alias: Алиас БД из ``settings.DATABASES``.
+    :rtype: dict
+    """
+    connection = connections[alias]
+    return {
+        "alias": alias,
+        "vendor": connection.vendor,
+        "conn_max_age": connection.settings_dict.get("CONN_MAX_AGE"),
+        "conn_health_checks": connection.settings_dict.get("CONN_HEALTH_CHECKS"),
+        "ping_ms": ping(alias),
+        "pool": pool_stats(alias),
+    }
+
+
+def estimated_count(queryset, threshold: int) -> int:
+    """
+    Количество строк выборки: для выборки всей таблицы на PostgreSQL — оценка
+    ``pg_class.reltuples`` (обновляется ``ANALYZE``/autovacuum) без ``COUNT(*)``.
+
+    Точный ``COUNT(*)`` выполняется для выборок с фильтрами, для других СУБД, для таблиц
+    без статистики и для таблиц меньше ``threshold`` строк (оценка там заметно врёт, а подсчёт дешёв).
+
+    :param queryset: Выборка (например, список раздела администратора).
+    :param threshold: Наименьшая оценка, с которой ей доверяют.
+    :rtype: int
+    """
+    connection = connections[queryset.db]
+    query = queryset.query
+    if (
+        connection.vendor == "postgresql"
+        and not query.where
+        and not query.distinct
+        and not query.combinator
+        and not query.is_sliced
+    ):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= threshold:
+            return row[0]
+    return queryset.count()
@@ -0,0 +1,140 @@
+"""
+Массовая очистка задолженности перед поставщиком с журналированием.
+
+Очистка идёт пакетами по возрастанию ``id``, каждый пакет — в отдельной
+транзакции и фиксированным числом запросов, независимо от размера пакета:
+
+1. выбор идентификаторов пакета (на PostgreSQL — с блокировкой строк);
+2. ``INSERT INTO журнал ... SELECT`` прежних значений задолженности;
+3. ``UPDATE ... RETURNING id`` — обнуление с возвратом затронутых звеньев;
+4. вычитание очищенного долга из ``subtree_debt`` затронутых звеньев и их предков
+   одним ``UPDATE ... SET subtree_debt = subtree_debt - (подзапрос по журналу пакета)``
+   и сброс их закэшированных ответов.
+
+Вычитание затрагивает только предков пакета, а не пересчитывает их поддеревья целиком,
+поэтому стоимость пакета не растёт с размером дерева.
+
+Поэтому очистку «всех долгов в KZ» можно запускать на десятках тысяч звеньев
+как из админ-панели, так и командой ``manage.py clear_supply_debt``. Все запросы
+очистки, включая чтение, идут в основную базу, а не на реплики.
+"""
+
+import uuid
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from supply.cache import invalidate_nodes
+from supply.models import DebtClearingAudit, Node
+from supply.routers import use_primary
+
+# СУБД, поддерживающие ``UPDATE ... RETURNING``
+UPDATE_RETURNING_VENDORS = frozenset({"postgresql", "sqlite"})
+
+DebtClearing = namedtuple("DebtClearing", ["batch", "node_ids"])
+
+
+def clear_debt(queryset, user=None, chunk_size: int | None = None) -> DebtClearing:
+    """
+    Обнуляет задолженность у звеньев набора, записывая прежние значения в журнал.
+
+    Звенья без задолженности пропускаются и в журнал не попадают.
+
+    :param queryset: Набор звеньев (например, ``Node.objects.filter(country="KZ")``).
+    :param user: Пользователь, запустивший очистку.
+    :type user: user.models.User or None
+    :param chunk_size: Размер пакета; по умолчанию ``settings.SUPPLY_DEBT_CLEAR_CHUNK_SIZE``.
+    :type chunk_size: int or None
+    :return: Идентификатор запуска и список ``id`` звеньев с очищенной задолженностью.
+    :rtype: DebtClearing
+    """
+    chunk_size = chunk_size or settings.SUPPLY_DEBT_CLEAR_CHUNK_SIZE
+    batch = uuid.uuid4()
+    pending = Node.objects.filter(pk__in=queryset.values("pk")).exclude(debt_to_supplier=0).order_by("pk")
+    node_ids: list[int] = []
+    last_id = 0
+    with use_primary():
+        while True:
+            with transaction.atomic():
+                chunk = list(
+                    pending.filter(pk__gt=last_id).select_for_update().values_list("pk", flat=True)[:chunk_size]
+                )
+                if not chunk:
+                    break
+                _insert_audit(chunk, batch, user)
+                node_ids += _clear_chunk(chunk)
+                Node.objects.above(chunk).shift_rollups(debt=-_cleared_debt(chunk, batch))
+                invalidate_nodes(chunk)
+            last_id = chunk[-1]
+    return DebtClearing(batch, node_ids)
+
+
+def _insert_audit(node_ids: list[int], batch: uuid.UUID, user) -> int:
+    """
+    Копирует прежние значения задолженности пакета в журнал одним ``INSERT ... SELECT``.
+    """
+    fields = {name: DebtClearingAudit._meta.get_field(name) for name in ("batch", "cleared_by", "cleared_at")}
+    select_sql, select_params = (
+        Node.objects.filter(pk__in=node_ids).order_by().values_list("pk", "debt_to_supplier").query.sql_with_params()
+    )
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(column) for column in ("node_id", "old_debt", *(f.column for f in fields.values())))
+    params = (
+        fields["batch"].get_db_prep_value(batch, connection),
+        user.pk if user is not None else None,
+        fields["cleared_at"].get_db_prep_value(timezone.now(), connection),
+    )
+    sql = (
+        f"INSERT INTO {quote(DebtClearingAudit._meta.db_table)} ({columns}) "
+        f"SELECT source.*, %s, %s, %s FROM ({select_sql}) AS source"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*params, *select_params))
+        return cursor.rowcount
+
+
+def _cleared_debt(node_ids: list[int], batch: uuid.UUID):
+    """
+    Подзапрос: сумма долга, очищенного в пакете у потомков звена (включая само звено), по журналу.
+    """
+    decimal = models.DecimalField(max_digits=14, decimal_places=2)
+    cleared = (
+        DebtClearingAudit.objects.filter(
+            batch=batch, node_id__in=node_ids, node__ancestor_links__ancestor_id=OuterRef("pk")
+        )
+        .order_by()
+        .values("batch")
+        .annotate(total=models.Sum("old_debt"))
+        .values("total")
+    )
+    return Coalesce(Subquery(cleared, output_field=decimal), Value(Decimal("0.00")), output_field=decimal)
+
+
+def _clear_chunk(node_ids: list[int]) -> list[int]:
+    """
+    Обнуляет задолженность пакета и возвращает ``id`` затронутых звеньев.
+
+    На СУБД с ``UPDATE ... RETURNING`` это один запрос; на остальных строки
+    пакета уже заблокированы, поэтому достаточно вернуть исходный список.
+    """
+    if connection.vendor not in UPDATE_RETURNING_VENDORS:
+        Node.objects.filter(pk__in=node_ids).update(debt_to_supplier=Decimal("0.00"), updated_at=timezone.now())
+        return node_ids
+    quote = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(node_ids))
+    sql = (
+        f"UPDATE {quote(Node._meta.db_table)} SET {quote('debt_to_supplier')} = %s, {quote('updated_at')} = %s "
+        f"WHERE {quote('id')} IN ({placeholders}) RETURNING {quote('id')}"
+    )
+    params = (
+        connection.ops.adapt_decimalfield_value(Decimal("0.00"), 12, 2),
+        Node._meta.get_field("updated_at").get_db_prep_value(timezone.now(), connection),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*params, *node_ids))
+        return sorted(row[0] for row in cursor.fetchall())
@@ -0,0 +1,190 @@
+"""
+Потоковая выгрузка данных приложения 'supply'.
+
+Генераторы этого модуля читают таблицы серверным курсором
+(``QuerySet.iterator(chunk_size=...)``) и отдают JSON по строкам,
+поэтому потребление памяти не зависит от размера таблицы.
+
+Под ASGI синхронный генератор ``StreamingHttpResponse`` Django сначала собирает
+в список целиком (``sync_to_async(list)``), поэтому для ASGI есть асинхронные
+варианты: ``QuerySet.aiterator`` читает тот же курсор пакетами, каждый пакет —
+отдельным вызовом через ``sync_to_async``, и ответ уходит клиенту по мере чтения.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from supply.models import Node, Product
+
+# Поля выгрузки: имя в ответе -> поле/колонка в БД
+NODE_EXPORT_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "email": "email",
+    "phone": "phone",
+    "country": "country",
+    "city": "city",
+    "street": "street",
+    "building_number": "building_number",
+    "supplier": "supplier_id",
+    "debt_to_supplier": "debt_to_supplier",
+    "created_at": "created_at",
+    "level": "level",
+    "path": "path",
+    "subtree_debt": "subtree_debt",
+    "subtree_node_count": "subtree_node_count",
+    "subtree_product_count": "subtree_product_count",
+}
+PRODUCT_EXPORT_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "model": "model",
+    "release_date": "release_date",
+    "owner": "owner_id",
+}
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def _encode_value(value):
+    """
+    Кодирует значения, которые не умеет сериализовать стандартный :mod:`json`.
+
+    Формат совпадает с API: ``Decimal`` — строкой, дата и время — в ISO 8601
+    в текущем часовом поясе проекта.
+    """
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Значение типа {type(value).__name__} не сериализуется в JSON.")
+
+
+def iter_rows(queryset, fields: dict, chunk_size: int | None = None):
+    """
+    Перебирает записи набора запросов в виде словарей с полями выгрузки.
+
+    :param queryset: Исходный набор запросов.
+    :param fields: Соответствие «имя в ответе -> колонка в БД».
+    :type fields: dict
+    :param chunk_size: Размер пакета серверного курсора.
+    :type chunk_size: int or None
+    :return: Генератор словарей.
+    """
+    names = list(fields)
+    columns = list(fields.values())
+    chunk_size = chunk_size or settings.SUPPLY_EXPORT_CHUNK_SIZE
+    for values in queryset.order_by("pk").values_list(*columns).iterator(chunk_size=chunk_size):
+        yield dict(zip(names, values))
+
+
+async def aiter_rows(queryset, fields: dict, chunk_size: int | None = None):
+    """
+    Асинхронный вариант :func:`iter_rows`: курсор читается пакетами по ``chunk_size`` строк.
+
+    :return: Асинхронный генератор словарей.
+    """
+    names = list(fields)
+    columns = list(fields.values())
+    chunk_size = chunk_size or settings.SUPPLY_EXPORT_CHUNK_SIZE
+    async for values in queryset.order_by("pk").values_list(*columns).aiterator(chunk_size=chunk_size):
+        yield dict(zip(names, values))
+
+
+def _dump(row: dict) -> str:
+    return json.dumps(row, ensure_ascii=False, default=_encode_value)
+
+
+def stream_ndjson(rows):
+    """
+    Кодирует записи в NDJSON: один JSON-объект на строку.
+
+    :param rows: Итератор словарей.
+    :return: Генератор строк.
+    """
+    for row in rows:
+        yield _dump(row) + "\n"
+
+
+async def astream_ndjson(rows):
+    """
+    Асинхронный вариант :func:`stream_ndjson`.
+
+    :param rows: Асинхронный итератор словарей.
+    """
+    async for row in rows:
+        yield _dump(row) + "\n"
+
+
+def stream_json_array(rows):
+    """
+    Кодирует записи в один JSON-массив, не собирая его в памяти целиком.
+
+    :param rows: Итератор словарей.
+    :return: Генератор фрагментов JSON.
+    """
+    yield "["
+    separator = ""
+    for row in rows:
+        yield separator + _dump(row)
+        separator = ","
+    yield "]"
+
+
+async def astream_json_array(rows):
+    """
+    Асинхронный вариант :func:`stream_json_array`.
+
+    :param rows: Асинхронный итератор словарей.
+    """
+    yield "["
+    separator = ""
+    async for row in rows:
+        yield separator + _dump(row)
+        separator = ","
+    yield "]"
+
+
+def export_nodes(output: str, chunk_size: int | None = None, asynchronous: bool = False):
+    """
+    Потоково выгружает звенья сети с уровнями и идентификаторами поставщиков.
+
+    :param output: Формат выгрузки (``ndjson`` или ``json``).
+    :type output: str
+    :param chunk_size: Размер пакета серверного курсора.
+    :param asynchronous: Вернуть асинхронный генератор (для ответа под ASGI).
+    :type asynchronous: bool
+    :return: Генератор фрагментов ответа.
+    """
+    return _stream(output, Node.objects.all(), NODE_EXPORT_FIELDS, chunk_size, asynchronous)
+
+
+def export_products(output: str, chunk_size: int | None = None, asynchronous: bool = False):
+    """
+    Потоково выгружает продукты с идентификаторами владельцев.
+
+    :param output: Формат выгрузки (``ndjson`` или ``json``).
+    :type output: str
+    :param chunk_size: Размер пакета серверного курсора.
+    :param asynchronous: Вернуть асинхронный генератор (для ответа под ASGI).
+    :type asynchronous: bool
+    :return: Генератор фрагментов ответа.
+    """
+    return _stream(output, Product.objects.all(), PRODUCT_EXPORT_FIELDS, chunk_size, asynchronous)
+
+
+def _stream(output: str, queryset, fields: dict, chunk_size: int | None, asynchronous: bool):
+    if asynchronous:
+        rows = aiter_rows(queryset, fields, chunk_size)
+        return astream_ndjson(rows) if output == "ndjson" else astream_json_array(rows)
+    rows = iter_rows(queryset, fields, chunk_size)
+    return stream_ndjson(rows) if output == "ndjson" else stream_json_array(rows)
@@ -0,0 +1,185 @@
+"""
+Базовые представления и примеси представлений для приложения 'supply'.
+
+Django REST Framework выполняет ``dispatch`` синхронно, поэтому под ASGI
+медленный запрос к БД занимает поток воркера. Классы этого модуля выполняют
+``dispatch`` как корутину: аутентификация, права и фильтры (им нужен синхронный
+доступ к БД) уходят в ``sync_to_async``, а выборка данных идёт через async ORM
+(``afirst``, ``aexists``, ``async for``). Под WSGI такие представления тоже
+работают — Django запускает их через ``async_to_sync``.
+
+:class:`SparseQuerysetMixin` сокращает список колонок запроса до полей,
+запрошенных клиентом через ``?fields=``/``?exclude=``, а :class:`ValuesQuerysetMixin`
+читает строки списков через ``.values()`` без создания объектов модели.
+"""
+
+import inspect
+
+from django.conf import settings
+from django.http import Http404
+
+from asgiref.sync import sync_to_async
+from rest_framework import generics
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+from rest_framework.settings import api_settings
+
+from supply.renderers import FastJSONRenderer
+
+
+class AsyncAPIViewMixin:
+    """
+    Выполняет ``dispatch`` DRF-представления асинхронно.
+
+    Обработчики методов (``get`` и т.п.) должны быть корутинами; ``options``
+    и ``http_method_not_allowed`` остаются синхронными.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            if method in self.http_method_names and hasattr(self, method):
+                handler = getattr(self, method)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_queryset(self):
+        """
+        Асинхронная точка расширения :meth:`get_queryset` (например, для проверки родительского объекта).
+        """
+        return self.get_queryset()
+
+    async def afilter_queryset(self, queryset):
+        """
+        Применяет фильтры в отдельном потоке: ``django-filter`` проверяет значения запросами к БД.
+        """
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+
+class AsyncRetrieveAPIView(AsyncAPIViewMixin, generics.GenericAPIView):
+    """
+    Асинхронное получение одного объекта по ``lookup_field``.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        return Response(self.get_serializer(await self.aget_object()).data)
+
+    async def aget_object(self):
+        """
+        Асинхронный вариант :meth:`get_object`.
+
+        :raises Http404: Если объект не найден.
+        """
+        queryset = await self.afilter_queryset(await self.aget_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = await queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}).afirst()
+        if obj is None:
+            raise Http404(f"Объект {queryset.model._meta.object_name} не найден.")
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class AsyncListAPIView(AsyncAPIViewMixin, generics.GenericAPIView):
+    """
+    Асинхронный список объектов с фильтрацией и keyset-пагинацией.
+
+    Класс пагинации должен поддерживать ``apaginate_queryset``
+    (см. :class:`supply.pagination.KeysetCursorPagination`).
+    """
+
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(await self.aget_queryset())
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer([obj async for obj in queryset], many=True).data)
+
+
+class SparseQuerysetMixin:
+    """
+    Выбирает из БД только колонки полей, оставшихся в ответе после ``?fields=``/``?exclude=``
+    (см. :class:`supply.serializers.SparseFieldsMixin`).
+
+    Кроме полей ответа загружаются первичный ключ, поля ключа keyset-пагинации
+    и :attr:`always_load_fields`, иначе обращение к ним догружало бы каждую запись отдельным запросом.
+    """
+
+    # Поля, нужные представлению помимо полей ответа
+    always_load_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        params = self.request.query_params
+        if self.request.method != "GET" or not ("fields" in params or "exclude" in params):
+            return queryset
+        return queryset.only(*self.get_load_fields(queryset.model))
+
+    def get_field_sources(self) -> set[str]:
+        """
+        Возвращает источники (атрибуты модели) полей ответа.
+
+        :rtype: set[str]
+        """
+        return {field.source for field in self.get_serializer().fields.values()}
+
+    def get_load_fields(self, model) -> list[str]:
+        """
+        Возвращает поля модели, которые нужно загрузить для ответа.
+
+        :rtype: list[str]
+        """
+        names = self.get_field_sources()
+        names.update(self.always_load_fields)
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, "get_ordering_fields"):
+            ordering = paginator.get_ordering_fields(paginator.get_ordering_name(self.request))
+            names.update(order.lstrip("-") for order in ordering)
+        concrete = {field.name for field in model._meta.concrete_fields}
+        return sorted(name for name in names if name in concrete)
+
+
+class ValuesQuerysetMixin(SparseQuerysetMixin):
+    """
+    Быстрый путь сериализации списков.
+
+    Строки страницы читаются через ``.values()`` (только нужные колонки, без создания
+    объектов модели), представление строится :class:`supply.serializers.ValuesListSerializer`,
+    а JSON кодирует :class:`supply.renderers.FastJSONRenderer`. Ответ побайтно совпадает
+    с обычной сериализацией объектов модели.
+
+    Используется, если включена настройка ``SUPPLY_VALUES_SERIALIZATION`` и все поля
+    сериализатора — колонки модели (без вложенных сериализаторов, например ``?expand=``);
+    иначе список сериализуется обычным образом.
+    """
+
+    renderer_classes = [
+        FastJSONRenderer if renderer is JSONRenderer else renderer
+        for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    ]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != "GET" or not settings.SUPPLY_VALUES_SERIALIZATION:
+            return queryset
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        fields = self.get_serializer().fields.values()
+        if any(isinstance(field, BaseSerializer) or field.source not in concrete for field in fields):
+            return queryset
+        return queryset.values(*self.get_load_fields(queryset.model))
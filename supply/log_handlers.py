@@ -0,0 +1,401 @@
+"""
+Неблокирующая запись журнала приложения 'supply' в файл.
+
+:class:`QueuedFileHandler` кладёт запись в ограниченную очередь и сразу
+возвращает управление; файл пишет фоновый поток пакетами (до ``batch_size``
+записей или раз в ``flush_interval`` секунд), поэтому медленный диск не
+задерживает обработку запроса. Файл ротируется по размеру (``max_bytes``) и
+по времени (``rotate_interval`` секунд, границы периодов кратны интервалу от начала
+эпохи UTC), хранится ``backup_count`` старых файлов (``reports.log.1``, ``reports.log.2``, ...).
+
+В один файл пишут все воркеры gunicorn, поэтому ротация безопасна для нескольких процессов:
+
+- перед каждой записью обработчик сверяет открытый файл с файлом по пути (устройство и inode,
+  как :class:`logging.handlers.WatchedFileHandler`) и, если файл переименован другим
+  процессом или внешним ``logrotate``, открывает новый — записи не уходят в ``reports.log.1``;
+- переименование файлов выполняется под межпроцессной блокировкой (``flock`` на
+  ``reports.log.lock``), а под блокировкой условие ротации проверяется заново: воркер,
+  опоздавший к уже выполненной ротации, просто открывает новый файл.
+
+Ротацию можно отключить (``max_bytes=0``, ``rotate_interval=0``) и поручить её ``logrotate``
+без ``copytruncate``: обработчики сами переключатся на новый файл.
+
+Если очередь заполнена, запись обрабатывается по политике ``overflow``:
+    :drop_newest: (по умолчанию) новая запись отбрасывается;
+    :drop_oldest: отбрасывается самая старая запись в очереди;
+    :block: вызывающий поток ждёт свободного места не дольше ``block_timeout`` секунд,
+        затем запись отбрасывается.
+
+Отброшенные записи считаются (:meth:`QueuedFileHandler.stats`), а фоновый поток
+пишет в журнал предупреждение с количеством записей, потерянных с прошлого отчёта.
+
+:class:`JSONFormatter` выводит запись одной строкой JSON.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: межпроцессной блокировки нет
+    fcntl = None
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+# Атрибуты LogRecord, которые не относятся к дополнительным полям (extra)
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Форматирует запись как JSON-объект в одну строку.
+
+    Поля: ``time`` (ISO 8601, UTC), ``level``, ``logger``, ``message``, ``module``,
+    ``line``, ``process``, ``thread``, ``exception`` (если есть) и все поля из ``extra``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = self.formatStack(record.stack_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in payload:
+                payload[key] = value
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class QueuedFileHandler(logging.Handler):
+    """
+    Обработчик, который пишет записи в файл из фонового потока.
+
+    :param filename: Путь к файлу журнала.
+    :param encoding: Кодировка файла.
+    :param max_queue_size: Наибольшее количество записей в очереди.
+    :param overflow: Политика переполнения очереди из :data:`OVERFLOW_POLICIES`.
+    :param block_timeout: Время ожидания места в очереди для политики ``block``, секунды.
+    :param batch_size: Наибольшее количество записей в одной записи на диск.
+    :param flush_interval: Наибольшая задержка записи на диск, секунды.
+    :param max_bytes: Размер файла для ротации (0 — без ротации по размеру).
+    :param rotate_interval: Время жизни файла для ротации, секунды (0 — без ротации по времени).
+    :param backup_count: Количество хранимых старых файлов.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        encoding: str = "utf-8",
+        max_queue_size: int = 10000,
+        overflow: str = "drop_newest",
+        block_timeout: float = 0.05,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_bytes: int = 0,
+        rotate_interval: float = 0,
+        backup_count: int = 5,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow должен быть одним из: {', '.join(OVERFLOW_POLICIES)}.")
+        super().__init__()
+        self.filename = os.path.abspath(filename)
+        self.encoding = encoding
+        self.max_queue_size = max_queue_size
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+
+        self.dropped = 0
+        self.written = 0
+        self.rotations = 0
+        self._reported_dropped = 0
+        self._counter_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._queue = queue.Queue(max_queue_size)
+        self._stop = threading.Event()
+        self._stream = None
+        self._stream_id = None
+        self._rollover_at = None
+
+    # -- вызывающий поток
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.start()
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Подготавливает запись к передаче в другой поток, как :class:`logging.handlers.QueueHandler`:
+        подставляет аргументы в сообщение и превращает исключение в текст.
+        """
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = (self.formatter or logging.Formatter()).formatException(record.exc_info)
+        record = logging.makeLogRecord(vars(record))
+        record.msg, record.args, record.exc_info = message, None, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> bool:
+        """
+        Кладёт запись в очередь с учётом политики переполнения.
+
+        Каждая потерянная запись считается в ``dropped`` ровно один раз: вытесненная — при
+        вытеснении, новая — если очередь осталась заполненной и после вытеснения.
+
+        :return: ``False``, если запись (или вытесненная ею) отброшена.
+        :rtype: bool
+        """
+        if self.overflow == "block":
+            if self._put(record, timeout=self.block_timeout):
+                return True
+        elif self._put(record):
+            return True
+        elif self.overflow == "drop_oldest":
+            evicted = self._evict_oldest()
+            if self._put(record):
+                return not evicted
+        self._count_dropped()
+        return False
+
+    def _put(self, record: logging.LogRecord, timeout: float | None = None) -> bool:
+        """
+        Кладёт запись в очередь: без ожидания или ожидая место до ``timeout`` секунд.
+        """
+        try:
+            if timeout is None:
+                self._queue.put_nowait(record)
+            else:
+                self._queue.put(record, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def _evict_oldest(self) -> bool:
+        """
+        Вытесняет самую старую запись очереди и считает её потерянной.
+
+        :return: ``False``, если очередь успел опустошить воркер.
+        """
+        try:
+            self._queue.get_nowait()
+        except queue.Empty:
+            return False
+        self._count_dropped()
+        return True
+
+    def _count_dropped(self):
+        with self._counter_lock:
+            self.dropped += 1
+
+    def stats(self) -> dict:
+        """
+        Счётчики обработчика: записано, отброшено, ротаций и текущая длина очереди.
+
+        :rtype: dict
+        """
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue_size": self.max_queue_size,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+        }
+
+    def start(self):
+        """
+        Запускает фоновый поток записи (повторно — в дочернем процессе после ``fork``).
+        """
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            if self._pid is not None:
+                # Дочерний процесс: поток родителя не унаследован, очередь и файл — заводим свои
+                self._queue = queue.Queue(self.max_queue_size)
+                self._stream = None
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="supply-log-writer", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """
+        Дописывает очередь на диск, останавливает поток и закрывает файл.
+        """
+        if self._thread is not None and self._pid == os.getpid():
+            self._stop.set()
+            self._thread.join(timeout=max(self.flush_interval * 5, 5))
+            self._thread = None
+        self._drain()
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        super().close()
+
+    # -- фоновый поток
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                self._report_dropped()
+                continue
+            batch += self._take(self.batch_size - 1)
+            self._write(batch)
+        self._drain()
+
+    def _take(self, limit: int) -> list:
+        records = []
+        while len(records) < limit:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return records
+
+    def _drain(self):
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                break
+            self._write(batch)
+        self._report_dropped()
+
+    def _report_dropped(self):
+        with self._counter_lock:
+            lost = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+        if lost:
+            record = logging.makeLogRecord(
+                {
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": f"Очередь журнала переполнена: отброшено записей — {lost}.",
+                    "dropped": lost,
+                }
+            )
+            self._write([record])
+
+    def _write(self, records: list):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + "\n")
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        data = "".join(lines)
+        size = len(data.encode(self.encoding))
+        try:
+            stream = self._open()
+            if self._should_rollover(size):
+                stream = self._rotate(size)
+            stream.write(data)
+            stream.flush()
+            self.written += len(lines)
+        except Exception:
+            self.handleError(records[-1])
+
+    def _open(self):
+        """
+        Возвращает поток текущего файла журнала, переоткрывая его, если файл по пути
+        переименован (ротация в другом процессе, ``logrotate``) или удалён.
+        """
+        if self._stream is not None:
+            try:
+                stat = os.stat(self.filename)
+                moved = (stat.st_dev, stat.st_ino) != self._stream_id
+            except FileNotFoundError:
+                moved = True
+            if moved:
+                self._stream.close()
+                self._stream = None
+        if self._stream is None:
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+            self._stream = open(self.filename, "a", encoding=self.encoding)
+            stat = os.fstat(self._stream.fileno())
+            self._stream_id = (stat.st_dev, stat.st_ino)
+            if self.rotate_interval:
+                # Граница периода общая для всех процессов, независимо от того, кто открыл файл
+                started = stat.st_mtime if stat.st_size else time.time()
+                self._rollover_at = (started // self.rotate_interval + 1) * self.rotate_interval
+        return self._stream
+
+    def _should_rollover(self, size: int) -> bool:
+        current = os.fstat(self._stream.fileno()).st_size
+        if not current:
+            return False
+        if self.max_bytes and current + size > self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.time() >= self._rollover_at
+
+    def _rotate(self, size: int):
+        """
+        Ротирует файл под межпроцессной блокировкой, если это ещё не сделал другой процесс.
+
+        :return: Поток файла, в который нужно писать.
+        """
+        with self._rotation_lock():
+            self._open()
+            if self._should_rollover(size):
+                self._rollover()
+            return self._open()
+
+    @contextmanager
+    def _rotation_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.filename}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _rollover(self):
+        """
+        Переименовывает файлы: ``reports.log`` -> ``reports.log.1`` -> ``reports.log.2`` ...
+        """
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.filename}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.filename}.{index + 1}")
+            os.replace(self.filename, f"{self.filename}.1")
+        else:
+            os.remove(self.filename)
+        self.rotations += 1
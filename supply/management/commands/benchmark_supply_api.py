@@ -0,0 +1,106 @@
+# supply/management/commands/benchmark_supply_api.py
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from supply.benchmark import SCENARIOS, HttpTarget, InProcessTarget, compare, measure_serialization, run_benchmark
+from supply.models import Node, Product
+from supply.serializers import NodeSerializer, ProductSerializer
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Нагрузочный прогон API сети поставок: p50/p95/p99, RPS и SQL-запросы по сценариям, результат в JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+        parser.add_argument("--requests", type=int, default=200, help="Количество запросов на сценарий")
+        parser.add_argument("--concurrency", type=int, default=1, help="Количество параллельных потоков")
+        parser.add_argument("--seed", type=int, help="Зерно генератора случайных чисел")
+        parser.add_argument("--base-url", help="Адрес запущенного сервера; без него запросы выполняются в процессе")
+        parser.add_argument("--token", help="JWT access-токен для --base-url")
+        parser.add_argument("--user", help="Email пользователя для прогона в процессе (по умолчанию — первый)")
+        parser.add_argument("--no-cache", action="store_true", help="Отключить кэш ответов (только в процессе)")
+        parser.add_argument("--output", help="Файл для сохранения результатов в JSON")
+        parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения p95 и RPS")
+        parser.add_argument(
+            "--serialization",
+            type=int,
+            metavar="ROWS",
+            help="Дополнительно сравнить время сериализации ROWS строк списков (только в процессе)",
+        )
+
+    def handle(self, *args, **options):
+        target, overrides = self._get_target(options)
+        with override_settings(**overrides):
+            try:
+                results = run_benchmark(
+                    target, options["scenarios"], options["requests"], options["concurrency"], options["seed"]
+                )
+            except ValueError as error:
+                raise CommandError(str(error))
+
+        if options["serialization"]:
+            results["serialization"] = self._measure_serialization(options["serialization"])
+        if options["compare"]:
+            previous = json.loads(Path(options["compare"]).read_text(encoding="utf-8"))
+            results["compared_with"] = {"file": options["compare"], "diff": compare(results, previous)}
+        self._report(results, options["output"])
+
+    def _get_target(self, options):
+        """
+        Возвращает цель прогона и настройки, которые переопределяются на время прогона.
+        """
+        if options["base_url"]:
+            if options["serialization"]:
+                raise CommandError("--serialization выполняется только в процессе, без --base-url.")
+            if not options["token"]:
+                raise CommandError("Для --base-url нужен --token.")
+            return HttpTarget(options["base_url"], options["token"]), {}
+
+        users = User.objects.order_by("pk")
+        user = users.filter(email=options["user"]).first() if options["user"] else users.first()
+        if user is None:
+            raise CommandError("Не найден пользователь для прогона (--user).")
+        # Лимиты частоты запросов (supply.throttling) в процессе не нужны: клиент один
+        overrides = {
+            "SUPPLY_SERVER_TIMING": True,
+            "REST_FRAMEWORK": {
+                **settings.REST_FRAMEWORK,
+                "DEFAULT_THROTTLE_RATES": {scope: None for scope in settings.API_THROTTLE_RATES},
+            },
+        }
+        if options["no_cache"]:
+            overrides["SUPPLY_RESPONSE_CACHE_TIMEOUT"] = 0
+        return InProcessTarget(user), overrides
+
+    @staticmethod
+    def _measure_serialization(rows: int) -> dict:
+        """
+        Сравнивает время сериализации первых ``rows`` строк списков звеньев и продуктов.
+        """
+        return {
+            "nodes": measure_serialization(NodeSerializer, Node.objects.order_by("name", "id")[:rows]),
+            "products": measure_serialization(ProductSerializer, Product.objects.order_by("name", "id")[:rows]),
+        }
+
+    def _report(self, results: dict, output: str | None):
+        """
+        Выводит сводку по сценариям и сериализации и сохраняет результаты в JSON.
+        """
+        for scenario, stats in results["scenarios"].items():
+            self.stdout.write(
+                f"{scenario:<9} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms "
+                f"rps={stats['rps']} queries={stats['queries_mean']} errors={stats['errors']}"
+            )
+        for entity, stats in results.get("serialization", {}).items():
+            self.stdout.write(
+                f"serialize {entity:<9} rows={stats['rows']} model={stats['model_us_per_row']}us/row "
+                f"values={stats['values_us_per_row']}us/row speedup=x{stats['speedup']}"
+            )
+        if output:
+            Path(output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {output}"))
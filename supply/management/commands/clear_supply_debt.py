@@ -0,0 +1,38 @@
+# supply/management/commands/clear_supply_debt.py
+from django.core.management.base import BaseCommand, CommandError
+
+from supply.debt import clear_debt
+from supply.models import Node
+
+
+class Command(BaseCommand):
+    help = "Очищает задолженность перед поставщиком у выбранных звеньев сети пакетами, с записью в журнал"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--country", help="Только звенья из указанной страны")
+        parser.add_argument("--city", help="Только звенья из указанного города")
+        parser.add_argument("--ids", type=int, nargs="+", help="Только звенья с указанными id")
+        parser.add_argument("--all", action="store_true", help="Все звенья сети (если не задан ни один фильтр)")
+        parser.add_argument("--chunk-size", type=int, help="Размер пакета (по умолчанию SUPPLY_DEBT_CLEAR_CHUNK_SIZE)")
+        parser.add_argument("--dry-run", action="store_true", help="Только показать количество звеньев")
+
+    def handle(self, *args, **options):
+        filters = {
+            "country": options["country"],
+            "city": options["city"],
+            "pk__in": options["ids"],
+        }
+        filters = {lookup: value for lookup, value in filters.items() if value}
+        if not filters and not options["all"]:
+            raise CommandError("Укажите фильтр (--country, --city, --ids) или --all.")
+        queryset = Node.objects.filter(**filters)
+
+        if options["dry_run"]:
+            count = queryset.exclude(debt_to_supplier=0).count()
+            self.stdout.write(f"Будет очищена задолженность у {count} звеньев.")
+            return
+
+        result = clear_debt(queryset, chunk_size=options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Задолженность очищена у {len(result.node_ids)} звеньев. Запуск: {result.batch}")
+        )
@@ -0,0 +1,38 @@
+# supply/management/commands/generate_supply_network.py
+from django.core.management.base import BaseCommand, CommandError
+
+from supply.synthetic import generate_network
+
+
+class Command(BaseCommand):
+    help = "Генерирует синтетическую сеть поставок заданного размера, глубины и ветвления для нагрузочных тестов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nodes", type=int, default=10_000, help="Количество звеньев")
+        parser.add_argument("--depth", type=int, default=4, help="Наибольший уровень иерархии (0 — только заводы)")
+        parser.add_argument("--fanout", type=int, default=10, help="Количество клиентов у каждого звена")
+        parser.add_argument("--products-per-node", type=int, default=10, help="Количество продуктов у звена")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Размер пакета вставки")
+        parser.add_argument("--seed", type=int, help="Зерно генератора случайных чисел")
+
+    def handle(self, *args, **options):
+        if options["nodes"] < 1 or options["fanout"] < 1 or options["depth"] < 0:
+            raise CommandError("--nodes и --fanout должны быть положительными, --depth — неотрицательным.")
+
+        def progress(level, created):
+            self.stdout.write(f"Уровень {level}: всего создано {created} звеньев")
+
+        result = generate_network(
+            nodes=options["nodes"],
+            depth=options["depth"],
+            fanout=options["fanout"],
+            products_per_node=options["products_per_node"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+            progress=progress,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано звеньев: {result['nodes']}, продуктов: {result['products']}, глубина: {result['depth']}"
+            )
+        )
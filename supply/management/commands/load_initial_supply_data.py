@@ -2,6 +2,7 @@
 from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
+from supply.cache import invalidate_all
 from supply.models import Node, Product
 
 
@@ -12,6 +13,9 @@ class Command(BaseCommand):
         if Node.objects.count() == 0:
             self.stdout.write("Loading node fixture...")
             call_command("loaddata", "supply/fixtures/nodes.json", verbosity=2)
+            # loaddata сохраняет объекты в обход Node.save(), поэтому иерархию пересчитываем отдельно
+            Node.objects.rebuild_hierarchy()
+            invalidate_all()
             self.stdout.write("Node fixture successfully loaded...")
         else:
             self.stdout.write("Node fixture already loaded.")
@@ -19,6 +23,8 @@ class Command(BaseCommand):
         if Product.objects.count() == 0:
             self.stdout.write("Loading product fixture...")
             call_command("loaddata", "supply/fixtures/products.json", verbosity=2)
+            Node.objects.all().refresh_rollups()
+            invalidate_all()
             self.stdout.write("Product fixture successfully loaded...")
         else:
             self.stdout.write("Product fixture already loaded.")
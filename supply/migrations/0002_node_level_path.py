@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_hierarchy(apps, schema_editor):
+    """
+    Заполняет ``level`` и ``path`` для уже существующих звеньев обходом в ширину.
+    """
+    Node = apps.get_model("supply", "Node")
+    db_alias = schema_editor.connection.alias
+    frontier = {}
+    for node in Node.objects.using(db_alias).filter(supplier__isnull=True):
+        node.level, node.path = 0, "/"
+        frontier[node.pk] = node
+    while frontier:
+        Node.objects.using(db_alias).bulk_update(frontier.values(), ["level", "path"], batch_size=1000)
+        parents, frontier = frontier, {}
+        for node in Node.objects.using(db_alias).filter(supplier_id__in=list(parents)):
+            parent = parents[node.supplier_id]
+            node.level, node.path = parent.level + 1, f"{parent.path}{parent.pk}/"
+            frontier[node.pk] = node
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="node",
+            name="level",
+            field=models.PositiveIntegerField(
+                db_index=True, default=0, editable=False, verbose_name="Уровень в иерархии"
+            ),
+        ),
+        migrations.AddField(
+            model_name="node",
+            name="path",
+            field=models.CharField(
+                db_index=True, default="/", editable=False, max_length=1024, verbose_name="Путь предков"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="node",
+            name="building_number",
+            field=models.CharField(max_length=20, verbose_name="Номер дома"),
+        ),
+        migrations.AlterField(
+            model_name="node",
+            name="city",
+            field=models.CharField(max_length=100, verbose_name="Город"),
+        ),
+        migrations.AlterField(
+            model_name="node",
+            name="country",
+            field=models.CharField(max_length=100, verbose_name="Страна"),
+        ),
+        migrations.AlterField(
+            model_name="node",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, verbose_name="Дата и время создания"),
+        ),
+        migrations.AlterField(
+            model_name="node",
+            name="debt_to_supplier",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name="Задолженность"),
+        ),
+        migrations.AlterField(
+            model_name="node",
+            name="email",
+            field=models.EmailField(max_length=254, unique=True, verbose_name="Электронная почта"),
+        ),
+        migrations.AlterField(
+            model_name="node",
+            name="name",
+            field=models.CharField(max_length=255, unique=True, verbose_name="Название узла поставки"),
+        ),
+        migrations.AlterField(
+            model_name="node",
+            name="phone",
+            field=models.CharField(max_length=20, unique=True, verbose_name="Номер телефона"),
+        ),
+        migrations.AlterField(
+            model_name="node",
+            name="street",
+            field=models.CharField(max_length=100, verbose_name="Улица"),
+        ),
+        migrations.AlterField(
+            model_name="node",
+            name="supplier",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="clients",
+                to="supply.node",
+                verbose_name="Поставщик",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="model",
+            field=models.CharField(max_length=100, verbose_name="Модель"),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="name",
+            field=models.CharField(max_length=255, verbose_name="Название продукта"),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="owner",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="products",
+                to="supply.node",
+                verbose_name="Владелец",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="release_date",
+            field=models.DateField(verbose_name="Дата выхода на рынок"),
+        ),
+        migrations.RunPython(populate_hierarchy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_closure(apps, schema_editor):
+    """
+    Заполняет таблицу замыканий по материализованным путям существующих звеньев.
+    """
+    Node = apps.get_model("supply", "Node")
+    NodeClosure = apps.get_model("supply", "NodeClosure")
+    db_alias = schema_editor.connection.alias
+    batch = []
+    for node_id, level, path in Node.objects.using(db_alias).values_list("id", "level", "path").iterator():
+        batch.append(NodeClosure(ancestor_id=node_id, descendant_id=node_id, depth=0))
+        ancestor_ids = [int(pk) for pk in path.strip("/").split("/") if pk]
+        batch += [
+            NodeClosure(ancestor_id=ancestor_id, descendant_id=node_id, depth=level - index)
+            for index, ancestor_id in enumerate(ancestor_ids)
+        ]
+    NodeClosure.objects.using(db_alias).bulk_create(batch, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply", "0002_node_level_path"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NodeClosure",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("depth", models.PositiveIntegerField(verbose_name="Глубина")),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="supply.node",
+                        verbose_name="Предок",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="supply.node",
+                        verbose_name="Потомок",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Связь иерархии",
+                "verbose_name_plural": "Связи иерархии",
+                "indexes": [models.Index(fields=["descendant", "depth"], name="supply_closure_ancestors_idx")],
+                "constraints": [
+                    models.UniqueConstraint(fields=("ancestor", "descendant"), name="supply_closure_pair_uniq")
+                ],
+            },
+        ),
+        migrations.RunPython(populate_closure, migrations.RunPython.noop),
+    ]
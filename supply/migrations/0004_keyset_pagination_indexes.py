@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply", "0003_node_closure"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="node",
+            index=models.Index(fields=["created_at", "id"], name="supply_node_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["name", "id"], name="supply_product_name_id_idx"),
+        ),
+    ]
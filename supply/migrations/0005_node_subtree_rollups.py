@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:39
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_rollups(apps, schema_editor):
+    """
+    Заполняет сводные показатели поддерева по таблице замыканий одним ``UPDATE``.
+    """
+    Node = apps.get_model("supply", "Node")
+    NodeClosure = apps.get_model("supply", "NodeClosure")
+    db_alias = schema_editor.connection.alias
+    subtree = NodeClosure.objects.using(db_alias).filter(ancestor_id=OuterRef("pk")).order_by().values("ancestor_id")
+    decimal = models.DecimalField(max_digits=14, decimal_places=2)
+    Node.objects.using(db_alias).update(
+        subtree_debt=Coalesce(
+            Subquery(subtree.annotate(total=models.Sum("descendant__debt_to_supplier")).values("total")),
+            Value(Decimal("0.00")),
+            output_field=decimal,
+        ),
+        subtree_node_count=Coalesce(
+            Subquery(subtree.annotate(total=models.Count("descendant_id")).values("total")), Value(1)
+        ),
+        subtree_product_count=Coalesce(
+            Subquery(subtree.annotate(total=models.Count("descendant__products")).values("total")), Value(0)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply", "0004_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="node",
+            name="subtree_debt",
+            field=models.DecimalField(
+                decimal_places=2, default=0, editable=False, max_digits=14, verbose_name="Задолженность поддерева"
+            ),
+        ),
+        migrations.AddField(
+            model_name="node",
+            name="subtree_node_count",
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name="Звеньев в поддереве"),
+        ),
+        migrations.AddField(
+            model_name="node",
+            name="subtree_product_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Продуктов в поддереве"),
+        ),
+        migrations.AddIndex(
+            model_name="node",
+            index=models.Index(fields=["subtree_debt", "id"], name="supply_node_subtree_debt_idx"),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply", "0005_node_subtree_rollups"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DebtClearingAudit",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("batch", models.UUIDField(db_index=True, verbose_name="Запуск")),
+                (
+                    "old_debt",
+                    models.DecimalField(decimal_places=2, max_digits=12, verbose_name="Задолженность до очистки"),
+                ),
+                ("cleared_at", models.DateTimeField(verbose_name="Время очистки")),
+                (
+                    "cleared_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Кем очищено",
+                    ),
+                ),
+                (
+                    "node",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="debt_clearings",
+                        to="supply.node",
+                        verbose_name="Звено",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Очистка задолженности",
+                "verbose_name_plural": "Журнал очистки задолженности",
+                "ordering": ["-cleared_at", "-id"],
+            },
+        ),
+    ]
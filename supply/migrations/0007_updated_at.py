@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply", "0006_debt_clearing_audit"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="node",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now, verbose_name="Дата и время изменения"
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now, verbose_name="Дата и время изменения"
+            ),
+            preserve_default=False,
+        ),
+    ]
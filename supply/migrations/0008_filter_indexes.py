@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply", "0007_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="node",
+            index=models.Index(fields=["country", "name", "id"], name="supply_node_country_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="node",
+            index=models.Index(fields=["city"], name="supply_node_city_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["owner", "name", "id"], name="supply_product_owner_name_idx"),
+        ),
+        # Индекс по owner_id покрывается составным индексом (owner, name, id)
+        migrations.AlterField(
+            model_name="product",
+            name="owner",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="products",
+                to="supply.node",
+                verbose_name="Владелец",
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class AddPostgreSQLIndex(migrations.AddIndex):
+    """
+    Добавляет индекс только в PostgreSQL: GIN-индексы с ``gin_trgm_ops`` в других СУБД
+    (SQLite в тестах) не поддерживаются, в состоянии моделей индекс учитывается всегда.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def trigram_index(field, name):
+    return django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(field), name="gin_trgm_ops"),
+        name=name,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply", "0008_filter_indexes"),
+    ]
+
+    operations = [
+        # В других СУБД операция ничего не делает
+        TrigramExtension(),
+        AddPostgreSQLIndex(model_name="node", index=trigram_index("name", "supply_node_name_trgm")),
+        AddPostgreSQLIndex(model_name="node", index=trigram_index("email", "supply_node_email_trgm")),
+        AddPostgreSQLIndex(model_name="node", index=trigram_index("phone", "supply_node_phone_trgm")),
+        AddPostgreSQLIndex(model_name="product", index=trigram_index("name", "supply_product_name_trgm")),
+        AddPostgreSQLIndex(model_name="product", index=trigram_index("model", "supply_product_model_trgm")),
+    ]
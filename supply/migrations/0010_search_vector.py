@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:30
+
+from django.db import migrations
+
+# Сохраняемые генерируемые колонки tsvector с весами полей (см. supply.search.SEARCH_SPECS) и GIN-индексы.
+# Колонки не описаны в моделях: Django не пишет в них и не читает их, кроме запросов поиска.
+SEARCH_VECTORS = {
+    "supply_node": (
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(city, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(country, '')), 'C')"
+    ),
+    "supply_product": (
+        "setweight(to_tsvector('simple', coalesce(model, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'B')"
+    ),
+}
+
+
+def add_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, expression in SEARCH_VECTORS.items():
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({expression}) STORED"
+        )
+        schema_editor.execute(f"CREATE INDEX {table}_search_idx ON {table} USING gin (search_vector)")
+
+
+def remove_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in SEARCH_VECTORS:
+        schema_editor.execute(f"ALTER TABLE {table} DROP COLUMN search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply", "0009_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vectors, remove_search_vectors),
+    ]
@@ -6,14 +6,378 @@
 и продуктов (Product), которые они производят или продают.
 
 Ключевые особенности:
-- Один класс Node описывает все типы звеньев, а уровень вычисляется через get_level().
+- Один класс Node описывает все типы звеньев, а уровень хранится в поле `level`.
 - Иерархическая структура сети моделируется через самореферентную связь в модели `Node`.
-- Уровень звена в иерархии (завод, розничная сеть и т.д.) вычисляется динамически.
+- Уровень звена и путь предков (materialized path) хранятся в таблице и пересчитываются
+  при создании звена, смене поставщика и удалении поставщика.
 - Продукты связаны с конкретным звеном сети.
 - Удаление поставщика не каскадное, а устанавливает связь в `NULL`.
+- Таблица замыканий `NodeClosure` хранит все пары «предок — потомок» и позволяет
+  выбирать поддерево или цепочку поставщиков одним индексированным запросом.
+- Сводные показатели поддерева (долг, число звеньев и продуктов) хранятся в `Node`
+  и обновляются инкрементально при изменении долга, поставщика или продуктов.
+- `DebtClearingAudit` хранит прежние значения задолженности при её массовой очистке.
+- `NodeQuerySet` вычисляет иерархию без денормализации: одним запросом ``WITH RECURSIVE``
+  на PostgreSQL и итеративно, пакетами по уровням, на остальных СУБД (SQLite в тестах).
 """
 
-from django.db import models
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.core.exceptions import ValidationError
+from django.db import connections, models, transaction
+from django.db.models import F, OuterRef, Prefetch, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Concat, Substr, Upper
+from django.utils import timezone
+
+# СУБД, на которых иерархия вычисляется одним рекурсивным CTE-запросом
+RECURSIVE_CTE_VENDORS = frozenset({"postgresql"})
+
+# Триграммные GIN-индексы под поиск админки (``icontains``): поле и имя индекса.
+# PostgreSQL выполняет ``icontains`` как ``UPPER(поле) LIKE UPPER(...)``, поэтому индекс строится по ``UPPER(поле)``.
+# Создаются миграцией только в PostgreSQL (нужно расширение pg_trgm).
+TRIGRAM_INDEXES = {
+    "node": (
+        ("name", "supply_node_name_trgm"),
+        ("email", "supply_node_email_trgm"),
+        ("phone", "supply_node_phone_trgm"),
+    ),
+    "product": (("name", "supply_product_name_trgm"), ("model", "supply_product_model_trgm")),
+}
+
+
+def trigram_index(field: str, name: str) -> GinIndex:
+    return GinIndex(OpClass(Upper(field), name="gin_trgm_ops"), name=name)
+
+
+# Связи звена, которые можно встроить в ответ API параметром ?expand=
+NODE_EXPANSIONS = ("products", "supplier", "clients")
+
+# Сводные поля поддерева: обновляются только инкрементально (F-выражениями), а не из памяти экземпляра
+ROLLUP_FIELDS = ("subtree_debt", "subtree_node_count", "subtree_product_count")
+
+
+def path_ids(path: str) -> list[int]:
+    """
+    Разбирает материализованный путь в список идентификаторов предков (от корня).
+
+    :param path: Путь вида ``/1/5/``.
+    :type path: str
+    :rtype: list[int]
+    """
+    return [int(pk) for pk in path.strip("/").split("/") if pk]
+
+
+class NodeQuerySet(models.QuerySet):
+    """
+    Набор запросов модели Node с операциями над иерархией.
+
+    Операции не используют денормализованные поля (``level``, ``path``, ``NodeClosure``)
+    и вычисляют иерархию по ``supplier_id``: на PostgreSQL — одним запросом
+    ``WITH RECURSIVE``, на остальных СУБД — итеративно, одним пакетным запросом
+    на каждый уровень иерархии.
+    """
+
+    def uses_recursive_cte(self) -> bool:
+        """
+        Проверяет, вычисляется ли иерархия рекурсивным CTE на текущей СУБД.
+
+        :rtype: bool
+        """
+        return connections[self.db].vendor in RECURSIVE_CTE_VENDORS
+
+    def _table(self, model=None) -> str:
+        return connections[self.db].ops.quote_name((model or self.model)._meta.db_table)
+
+    def ancestors_of(self, node_id: int) -> "NodeQuerySet":
+        """
+        Возвращает всех поставщиков звена (прямых и косвенных), без самого звена.
+
+        :param node_id: Идентификатор звена.
+        :type node_id: int
+        :return: Ленивый набор запросов; на PostgreSQL выполняется одним запросом.
+        :rtype: NodeQuerySet
+        """
+        if self.uses_recursive_cte():
+            table = self._table()
+            sql = (
+                f"WITH RECURSIVE chain(id, supplier_id) AS ("
+                f"SELECT id, supplier_id FROM {table} WHERE id = %s "
+                f"UNION ALL SELECT n.id, n.supplier_id FROM {table} n JOIN chain c ON n.id = c.supplier_id"
+                f") SELECT id FROM chain WHERE id <> %s"
+            )
+            return self.filter(pk__in=RawSQL(sql, [node_id, node_id]))
+
+        ancestor_ids = []
+        supplier_id = self.model._base_manager.filter(pk=node_id).values_list("supplier_id", flat=True).first()
+        while supplier_id is not None and supplier_id not in ancestor_ids:
+            ancestor_ids.append(supplier_id)
+            supplier_id = self.model._base_manager.filter(pk=supplier_id).values_list("supplier_id", flat=True).first()
+        return self.filter(pk__in=ancestor_ids)
+
+    def descendants_of(self, node_id: int) -> "NodeQuerySet":
+        """
+        Возвращает всех клиентов звена (прямых и косвенных), без самого звена.
+
+        :param node_id: Идентификатор звена.
+        :type node_id: int
+        :return: Ленивый набор запросов; на PostgreSQL выполняется одним запросом.
+        :rtype: NodeQuerySet
+        """
+        if self.uses_recursive_cte():
+            return self.filter(pk__in=RawSQL(self._subtree_sql(), [node_id])).exclude(pk=node_id)
+        return self.filter(pk__in=self._subtree_ids(node_id)).exclude(pk=node_id)
+
+    def computed_levels(self) -> dict[int, int]:
+        """
+        Вычисляет уровень каждого звена из набора запросов по цепочке поставщиков.
+
+        :return: Словарь ``{id звена: уровень}``.
+        :rtype: dict[int, int]
+        """
+        if self.uses_recursive_cte():
+            table = self._table()
+            origin_sql, origin_params = self.order_by().values("pk").query.sql_with_params()
+            sql = (
+                f"WITH RECURSIVE walk(origin, current_id, level) AS ("
+                f"SELECT id, supplier_id, 0 FROM {table} WHERE id IN ({origin_sql}) "
+                f"UNION ALL SELECT w.origin, n.supplier_id, w.level + 1 "
+                f"FROM {table} n JOIN walk w ON n.id = w.current_id"
+                f") SELECT origin, MAX(level) FROM walk GROUP BY origin"
+            )
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(sql, origin_params)
+                return dict(cursor.fetchall())
+
+        suppliers = dict(self.values_list("id", "supplier_id"))
+        origins = list(suppliers)
+        pending = {pk for pk in suppliers.values() if pk is not None and pk not in suppliers}
+        while pending:
+            batch = dict(self.model._base_manager.filter(pk__in=pending).values_list("id", "supplier_id"))
+            suppliers.update(batch)
+            pending = {pk for pk in batch.values() if pk is not None and pk not in suppliers}
+
+        levels: dict[int, int] = {}
+
+        def resolve(pk):
+            chain = []
+            while pk is not None and pk not in levels and pk not in chain:
+                chain.append(pk)
+                pk = suppliers.get(pk)
+            base = levels.get(pk, -1) if pk is not None else -1
+            for offset, item in enumerate(reversed(chain), start=1):
+                levels[item] = base + offset
+
+        for pk in origins:
+            resolve(pk)
+        return {pk: levels[pk] for pk in origins}
+
+    def subtree_aggregates(self, node_id: int) -> dict:
+        """
+        Считает сводные показатели поддерева звена (включая само звено).
+
+        :param node_id: Идентификатор корня поддерева.
+        :type node_id: int
+        :return: Словарь с ключами ``node_count``, ``debt_total`` и ``product_count``.
+        :rtype: dict
+        """
+        if self.uses_recursive_cte():
+            sql = (
+                f"{self._subtree_cte()} SELECT COUNT(*), COALESCE(SUM(n.debt_to_supplier), 0), "
+                f"(SELECT COUNT(*) FROM {self._table(Product)} p WHERE p.owner_id IN (SELECT id FROM subtree)) "
+                f"FROM {self._table()} n WHERE n.id IN (SELECT id FROM subtree)"
+            )
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(sql, [node_id])
+                node_count, debt_total, product_count = cursor.fetchone()
+            return {
+                "node_count": node_count,
+                "debt_total": Decimal(debt_total).quantize(Decimal("0.01")),
+                "product_count": product_count,
+            }
+
+        ids = self._subtree_ids(node_id)
+        totals = {"node_count": 0, "debt_total": Decimal("0.00"), "product_count": 0}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            nodes = self.model._base_manager.filter(pk__in=chunk).aggregate(
+                count=models.Count("pk"), debt=models.Sum("debt_to_supplier")
+            )
+            totals["node_count"] += nodes["count"]
+            totals["debt_total"] += nodes["debt"] or Decimal("0.00")
+            totals["product_count"] += Product.objects.filter(owner_id__in=chunk).count()
+        return totals
+
+    def refresh_rollups(self) -> int:
+        """
+        Пересчитывает сводные показатели поддерева для звеньев набора одним ``UPDATE``.
+
+        Значения считаются коррелированными подзапросами по таблице замыканий. Используется
+        после массовых операций в обход :meth:`Node.save` (``bulk_create``, ``QuerySet.update``).
+
+        :return: Количество обновлённых звеньев.
+        :rtype: int
+        """
+        subtree = NodeClosure.objects.filter(ancestor_id=OuterRef("pk")).order_by().values("ancestor_id")
+        debt = subtree.annotate(total=models.Sum("descendant__debt_to_supplier")).values("total")
+        nodes = subtree.annotate(total=models.Count("descendant_id")).values("total")
+        products = subtree.annotate(total=models.Count("descendant__products")).values("total")
+        decimal = models.DecimalField(max_digits=14, decimal_places=2)
+        return self.model._base_manager.filter(pk__in=self.order_by().values("pk")).update(
+            subtree_debt=Coalesce(Subquery(debt, output_field=decimal), Value(Decimal("0.00")), output_field=decimal),
+            subtree_node_count=Coalesce(Subquery(nodes), Value(1)),
+            subtree_product_count=Coalesce(Subquery(products), Value(0)),
+            updated_at=timezone.now(),
+        )
+
+    def shift_rollups(self, debt=0, nodes: int = 0, products: int = 0) -> int:
+        """
+        Сдвигает сводные показатели звеньев набора на заданные величины одним ``UPDATE``.
+
+        :param debt: Изменение суммы долга поддерева: число или выражение (например, подзапрос
+            со своим значением для каждого звена).
+        :param nodes: Изменение числа звеньев поддерева.
+        :param products: Изменение числа продуктов поддерева.
+        :return: Количество обновлённых звеньев.
+        :rtype: int
+        """
+        changes = {}
+        if hasattr(debt, "resolve_expression"):
+            changes["subtree_debt"] = F("subtree_debt") + debt
+        elif debt:
+            changes["subtree_debt"] = F("subtree_debt") + Decimal(debt)
+        if nodes:
+            changes["subtree_node_count"] = F("subtree_node_count") + nodes
+        if products:
+            changes["subtree_product_count"] = F("subtree_product_count") + products
+        return self.update(**changes, updated_at=timezone.now()) if changes else 0
+
+    def above(self, node_ids) -> "NodeQuerySet":
+        """
+        Ограничивает набор указанными звеньями и всеми их предками (по таблице замыканий).
+
+        :param node_ids: Идентификаторы звеньев или подзапрос с ними.
+        :rtype: NodeQuerySet
+        """
+        return self.filter(pk__in=NodeClosure.objects.filter(descendant_id__in=node_ids).values("ancestor_id"))
+
+    def with_expansions(self, names) -> "NodeQuerySet":
+        """
+        Подгружает связи из :data:`NODE_EXPANSIONS` для встраивания в ответ.
+
+        Поставщик присоединяется JOIN-ом, продукты и клиенты выбираются одним запросом
+        на связь (по названию), поэтому число запросов не зависит от числа звеньев.
+
+        :param names: Названия связей; неизвестные игнорируются.
+        :rtype: NodeQuerySet
+        """
+        queryset = self.select_related("supplier") if "supplier" in names else self
+        prefetches = []
+        if "products" in names:
+            prefetches.append(Prefetch("products", queryset=Product.objects.order_by("name", "id")))
+        if "clients" in names:
+            prefetches.append(Prefetch("clients", queryset=Node.objects.order_by("name", "id")))
+        return queryset.prefetch_related(*prefetches) if prefetches else queryset
+
+    def _subtree_cte(self) -> str:
+        """
+        Рекурсивный CTE ``subtree(id)`` с идентификаторами поддерева (параметр — id корня).
+        """
+        table = self._table()
+        return (
+            f"WITH RECURSIVE subtree(id) AS ("
+            f"SELECT id FROM {table} WHERE id = %s "
+            f"UNION ALL SELECT n.id FROM {table} n JOIN subtree s ON n.supplier_id = s.id)"
+        )
+
+    def _subtree_sql(self) -> str:
+        """
+        SQL, выбирающий идентификаторы поддерева (параметр — id корня).
+        """
+        return f"{self._subtree_cte()} SELECT id FROM subtree"
+
+    def _subtree_ids(self, node_id: int) -> list[int]:
+        """
+        Собирает идентификаторы поддерева обходом в ширину (один запрос на уровень).
+        """
+        ids = list(self.model._base_manager.filter(pk=node_id).values_list("id", flat=True))
+        frontier = ids
+        while frontier:
+            frontier = list(
+                self.model._base_manager.filter(supplier_id__in=frontier)
+                .exclude(pk__in=ids)
+                .values_list("id", flat=True)
+            )
+            ids += frontier
+        return ids
+
+
+class NodeManager(models.Manager.from_queryset(NodeQuerySet)):  # type: ignore[misc]
+    """
+    Менеджер модели Node.
+
+    Помимо операций :class:`NodeQuerySet` умеет перестраивать материализованную
+    иерархию (поля ``level`` и ``path``) для всей таблицы — например, после
+    ``loaddata``, который сохраняет объекты в обход :meth:`Node.save`.
+    """
+
+    def rebuild_hierarchy(self) -> int:
+        """
+        Пересчитывает ``level``, ``path``, таблицу замыканий и сводные показатели для всех звеньев сети.
+
+        На PostgreSQL выполняется одним ``UPDATE`` по рекурсивному CTE. На остальных
+        СУБД обход выполняется по уровням (в ширину): на каждый уровень иерархии
+        приходится один запрос на чтение и один пакетный ``UPDATE``.
+
+        :return: Количество обработанных звеньев.
+        :rtype: int
+        """
+        processed = 0
+        with transaction.atomic(using=self.db):
+            if self.get_queryset().uses_recursive_cte():
+                processed = self._rebuild_hierarchy_cte()
+                NodeClosure.objects.rebuild()
+                self.all().refresh_rollups()
+                return processed
+            frontier = {}
+            for node in self.filter(supplier__isnull=True).only("id", "level", "path"):
+                node.level, node.path = 0, "/"
+                frontier[node.pk] = node
+            while frontier:
+                self.bulk_update(frontier.values(), ["level", "path"], batch_size=1000)
+                processed += len(frontier)
+                parents = frontier
+                frontier = {}
+                clients = self.filter(supplier_id__in=list(parents)).only("id", "supplier_id", "level", "path")
+                for node in clients.iterator(chunk_size=2000):
+                    parent = parents[node.supplier_id]
+                    node.level, node.path = parent.level + 1, f"{parent.path}{parent.pk}/"
+                    frontier[node.pk] = node
+            NodeClosure.objects.rebuild()
+            self.all().refresh_rollups()
+        return processed
+
+    def _rebuild_hierarchy_cte(self) -> int:
+        """
+        Пересчитывает ``level`` и ``path`` одним ``UPDATE ... FROM`` по рекурсивному CTE.
+
+        :return: Количество обновлённых звеньев.
+        :rtype: int
+        """
+        table = self.get_queryset()._table()
+        sql = (
+            f"UPDATE {table} SET level = tree.level, path = tree.path FROM ("
+            f"WITH RECURSIVE walk(id, level, path) AS ("
+            f"SELECT id, 0, CAST('/' AS TEXT) FROM {table} WHERE supplier_id IS NULL "
+            f"UNION ALL SELECT n.id, w.level + 1, CAST(w.path || CAST(w.id AS TEXT) || '/' AS TEXT) "
+            f"FROM {table} n JOIN walk w ON n.supplier_id = w.id"
+            f") SELECT id, level, path FROM walk) AS tree WHERE {table}.id = tree.id"
+        )
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.rowcount
 
 
 class Node(models.Model):
@@ -43,6 +407,18 @@ class Node(models.Model):
     :type debt_to_supplier: decimal.Decimal
     :param created_at: Дата и время создания записи (устанавливается автоматически).
     :type created_at: datetime.datetime
+    :param updated_at: Дата и время последнего изменения, включая пересчёт иерархии и сводных показателей.
+    :type updated_at: datetime.datetime
+    :param level: Уровень звена в иерархии (0 — завод). Поддерживается автоматически.
+    :type level: int
+    :param path: Путь предков от корня вида ``/1/5/`` (для завода — ``/``). Поддерживается автоматически.
+    :type path: str
+    :param subtree_debt: Сумма задолженностей звена и всех его потомков. Поддерживается автоматически.
+    :type subtree_debt: decimal.Decimal
+    :param subtree_node_count: Количество звеньев в поддереве (включая само звено).
+    :type subtree_node_count: int
+    :param subtree_product_count: Количество продуктов звена и всех его потомков.
+    :type subtree_product_count: int
     """
 
     # Исключаем ругательства mypy о типизации, добавляя '# type: ignore[var-annotated]'
@@ -73,6 +449,32 @@ class Node(models.Model):
         auto_now_add=True, verbose_name="Дата и время создания"
     )  # type: ignore[var-annotated]
 
+    # -- Дата и время последнего изменения (в т.ч. уровня и сводных показателей) --
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата и время изменения"
+    )  # type: ignore[var-annotated]
+
+    # -- Материализованная иерархия (заполняется в save(), вручную не редактируется) --
+    level = models.PositiveIntegerField(
+        default=0, editable=False, db_index=True, verbose_name="Уровень в иерархии"
+    )  # type: ignore[var-annotated]
+    path = models.CharField(
+        max_length=1024, default="/", editable=False, db_index=True, verbose_name="Путь предков"
+    )  # type: ignore[var-annotated]
+
+    # -- Сводные показатели поддерева (обновляются инкрементально, вручную не редактируются) --
+    subtree_debt = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, editable=False, verbose_name="Задолженность поддерева"
+    )  # type: ignore[var-annotated]
+    subtree_node_count = models.PositiveIntegerField(
+        default=1, editable=False, verbose_name="Звеньев в поддереве"
+    )  # type: ignore[var-annotated]
+    subtree_product_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Продуктов в поддереве"
+    )  # type: ignore[var-annotated]
+
+    objects = NodeManager()
+
     def __str__(self) -> str:
         """
         Возвращает строковое представление узла сети поставок.
@@ -83,24 +485,164 @@ class Node(models.Model):
         return self.name
 
     @property
-    def level(self) -> int:
+    def subtree_path(self) -> str:
         """
-        Вычисляет уровень звена в иерархии.
+        Префикс пути, общий для всех потомков звена.
 
-        Уровень определяется количеством звеньев в цепочке до завода.
-        - 0: Завод (нет поставщика).
-        - 1: Поставщик — завод.
-        - 2: Поставщик — звено 1-го уровня, и т.д.
+        :return: Путь звена вместе с его собственным ``id``, например ``/1/5/12/``.
+        :rtype: str
+        """
+        return f"{self.path}{self.pk}/"
 
-        :return: Целочисленное значение уровня.
-        :rtype: int
+    def is_ancestor_of(self, node: "Node") -> bool:
+        """
+        Проверяет, является ли звено предком (прямым или косвенным) указанного звена.
+
+        :param node: Проверяемое звено.
+        :type node: Node
+        :return: ``True``, если ``node`` находится в поддереве текущего звена.
+        :rtype: bool
+        """
+        return self.pk is not None and node.subtree_path.startswith(self.subtree_path) and node.pk != self.pk
+
+    def clean(self):
+        """
+        Запрещает назначать поставщиком само звено или его потомка (цикл в иерархии).
+
+        :raises ValidationError: Если назначение поставщика создаёт цикл.
+        """
+        super().clean()
+        if self.supplier_id is not None and self.pk is not None:
+            supplier = Node.objects.only("id", "path").get(pk=self.supplier_id)
+            if supplier.pk == self.pk or self.is_ancestor_of(supplier):
+                raise ValidationError({"supplier": "Нельзя назначить поставщиком само звено или его клиента."})
+
+    @property
+    def ancestor_ids(self) -> list[int]:
         """
-        level = 0
-        node = self
-        while node.supplier:
-            level += 1
-            node = node.supplier
-        return level
+        Идентификаторы всех поставщиков звена от завода до ближайшего.
+
+        :rtype: list[int]
+        """
+        return path_ids(self.path)
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет звено, поддерживая иерархию и сводные показатели в актуальном состоянии.
+
+        Путь вычисляется по поставщику. Если у существующего звена сменился поставщик,
+        путь и уровень всех его потомков переписываются одним ``UPDATE`` по префиксу пути,
+        связи поддерева в :class:`NodeClosure` переносятся к новым предкам, а сводные
+        показатели поддерева вычитаются у старых предков и прибавляются новым.
+        Изменение долга прибавляется к ``subtree_debt`` звена и всех его предков.
+
+        Сводные поля из памяти экземпляра не записываются: они меняются только
+        F-выражениями, чтобы не затереть параллельные инкременты.
+        """
+        update_fields = kwargs.get("update_fields")
+        hierarchy_changed = update_fields is None or "supplier" in update_fields
+        debt_changed = update_fields is None or "debt_to_supplier" in update_fields
+        self.debt_to_supplier = Decimal(str(self.debt_to_supplier))
+
+        with transaction.atomic():
+            old = None
+            if not self._state.adding and self.pk is not None:
+                old = (
+                    Node.objects.filter(pk=self.pk).values("level", "path", "debt_to_supplier", *ROLLUP_FIELDS).first()
+                )
+            if hierarchy_changed:
+                self._refresh_hierarchy()
+            # Прежний путь нужен обработчикам post_save (сброс кэша у бывших предков и поддерева)
+            self._previous_path = old["path"] if old is not None else None
+
+            if old is None:
+                self.subtree_debt, self.subtree_node_count, self.subtree_product_count = self.debt_to_supplier, 1, 0
+                super().save(*args, **kwargs)
+                NodeClosure.objects.attach(self)
+                Node.objects.filter(pk__in=self.ancestor_ids).shift_rollups(debt=self.debt_to_supplier, nodes=1)
+                return
+
+            fields = update_fields or [f.name for f in self._meta.concrete_fields if not f.primary_key]
+            fields = {name for name in fields if name not in ROLLUP_FIELDS}
+            kwargs["update_fields"] = fields | {"level", "path"} if hierarchy_changed else fields
+            super().save(*args, **kwargs)
+
+            old_ancestor_ids = path_ids(old["path"])
+            debt_delta = self.debt_to_supplier - old["debt_to_supplier"] if debt_changed else 0
+            if debt_delta:
+                Node.objects.filter(pk__in=[*old_ancestor_ids, self.pk]).shift_rollups(debt=debt_delta)
+            if hierarchy_changed and old["path"] != self.path:
+                self._move_descendants(f"{old['path']}{self.pk}/", self.level - old["level"])
+                NodeClosure.objects.unlink_subtree(self.pk)
+                NodeClosure.objects.link_subtree(self.pk, self.supplier_id)
+                totals = {
+                    "debt": old["subtree_debt"] + debt_delta,
+                    "nodes": old["subtree_node_count"],
+                    "products": old["subtree_product_count"],
+                }
+                Node.objects.filter(pk__in=old_ancestor_ids).shift_rollups(**{k: -v for k, v in totals.items()})
+                Node.objects.filter(pk__in=self.ancestor_ids).shift_rollups(**totals)
+            for name in ROLLUP_FIELDS:
+                setattr(self, name, old[name])
+            self.subtree_debt += debt_delta
+
+    def _refresh_hierarchy(self):
+        """
+        Вычисляет ``level`` и ``path`` по текущему поставщику (одним запросом к БД).
+
+        :raises ValueError: Если поставщик — само звено или его потомок.
+        """
+        if self.supplier_id is None:
+            self.level, self.path = 0, "/"
+            return
+        supplier = Node.objects.only("id", "level", "path").get(pk=self.supplier_id)
+        if supplier.pk == self.pk or self.is_ancestor_of(supplier):
+            raise ValueError("Нельзя назначить поставщиком само звено или его клиента.")
+        self.level, self.path = supplier.level + 1, supplier.subtree_path
+
+    def _move_descendants(self, old_prefix: str, level_delta: int):
+        """
+        Переносит всех потомков звена на новый путь после смены поставщика.
+
+        :param old_prefix: Префикс пути потомков до переноса.
+        :type old_prefix: str
+        :param level_delta: Изменение уровня звена (переносится на всё поддерево).
+        :type level_delta: int
+        """
+        Node.objects.filter(path__startswith=old_prefix).update(
+            path=Concat(
+                Value(self.subtree_path), Substr("path", len(old_prefix) + 1), output_field=models.CharField()
+            ),
+            level=F("level") + level_delta,
+            updated_at=timezone.now(),
+        )
+
+    def detach_subtree(self):
+        """
+        Делает клиентов звена корнями перед его удалением.
+
+        При удалении поставщика Django выставляет ``supplier = NULL`` у клиентов
+        (``SET_NULL``) без вызова ``save()``, поэтому путь и уровень всего поддерева
+        пересчитываются здесь одним ``UPDATE``, связи поддерева с предками удаляются
+        из :class:`NodeClosure`, а сводные показатели поддерева вычитаются у предков.
+        Путь берётся из БД, так как при каскадном удалении нескольких звеньев
+        экземпляр в памяти может быть устаревшим.
+        """
+        current = Node.objects.filter(pk=self.pk).values("level", "path", *ROLLUP_FIELDS).first()
+        if current is None:
+            return
+        prefix = f"{current['path']}{self.pk}/"
+        Node.objects.filter(path__startswith=prefix).update(
+            path=Concat(Value("/"), Substr("path", len(prefix) + 1), output_field=models.CharField()),
+            level=F("level") - (current["level"] + 1),
+            updated_at=timezone.now(),
+        )
+        NodeClosure.objects.unlink_subtree(self.pk)
+        Node.objects.filter(pk__in=path_ids(current["path"])).shift_rollups(
+            debt=-current["subtree_debt"],
+            nodes=-current["subtree_node_count"],
+            products=-current["subtree_product_count"],
+        )
 
     class Meta:
         """
@@ -109,11 +651,157 @@ class Node(models.Model):
         :ivar verbose_name: Имя модели в единственном числе для отображения в админ-панели.
         :ivar verbose_name_plural: Имя модели во множественном числе.
         :ivar ordering: Порядок сортировки по умолчанию для запросов.
+        :ivar indexes: Индексы под ключи keyset-пагинации (``name`` уже уникален и индексирован),
+            сортировку по задолженности поддерева, фильтры списка и админки по стране и городу
+            (``(country, name, id)`` отдаёт страницу списка ``?country=`` по порядку индекса)
+            и триграммные индексы под поиск админки ``icontains`` (только PostgreSQL, см. :data:`TRIGRAM_INDEXES`).
         """
 
         verbose_name = "Узел сети поставок"
         verbose_name_plural = "Узлы сети поставок"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="supply_node_created_id_idx"),
+            models.Index(fields=["subtree_debt", "id"], name="supply_node_subtree_debt_idx"),
+            models.Index(fields=["country", "name", "id"], name="supply_node_country_name_idx"),
+            models.Index(fields=["city"], name="supply_node_city_idx"),
+            *(trigram_index(field, name) for field, name in TRIGRAM_INDEXES["node"]),
+        ]
+
+
+class NodeClosureManager(models.Manager):
+    """
+    Менеджер таблицы замыканий. Поддерживает её в согласованном состоянии с полем ``supplier``.
+    """
+
+    def links_for(self, node_id: int, level: int, path: str) -> list:
+        """
+        Строит связи звена с самим собой и со всеми предками по материализованному пути.
+
+        :param node_id: Идентификатор звена.
+        :type node_id: int
+        :param level: Уровень звена.
+        :type level: int
+        :param path: Путь предков звена.
+        :type path: str
+        :return: Несохранённые объекты :class:`NodeClosure`.
+        :rtype: list
+        """
+        ancestor_ids = path_ids(path)
+        links = [self.model(ancestor_id=node_id, descendant_id=node_id, depth=0)]
+        links += [
+            self.model(ancestor_id=ancestor_id, descendant_id=node_id, depth=level - index)
+            for index, ancestor_id in enumerate(ancestor_ids)
+        ]
+        return links
+
+    def attach(self, *nodes: Node):
+        """
+        Добавляет связи для только что созданных звеньев: с самими собой и со всеми предками.
+
+        Предки берутся из материализованного пути, поэтому чтение из БД не требуется.
+
+        :param nodes: Созданные звенья (``level`` и ``path`` уже вычислены).
+        :type nodes: Node
+        """
+        links = []
+        for node in nodes:
+            links += self.links_for(node.pk, node.level, node.path)
+        self.bulk_create(links, batch_size=5000)
+
+    def unlink_subtree(self, node_id: int) -> int:
+        """
+        Отрывает поддерево звена от всех его (внешних) предков.
+
+        :param node_id: Корень поддерева.
+        :type node_id: int
+        :return: Количество удалённых связей.
+        :rtype: int
+        """
+        subtree = self.filter(ancestor_id=node_id).values("descendant_id")
+        deleted, _ = self.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+        return deleted
+
+    def link_subtree(self, node_id: int, supplier_id: int | None):
+        """
+        Связывает поддерево звена со всеми предками нового поставщика.
+
+        Выполняется одним ``INSERT ... SELECT`` (декартово произведение предков
+        поставщика и потомков звена), без выгрузки поддерева в Python.
+
+        :param node_id: Корень поддерева.
+        :type node_id: int
+        :param supplier_id: Новый поставщик или ``None`` для корня.
+        :type supplier_id: int or None
+        """
+        if supplier_id is None:
+            return
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (ancestor_id, descendant_id, depth) "
+                f"SELECT up.ancestor_id, down.descendant_id, up.depth + down.depth + 1 "
+                f"FROM {table} up, {table} down "
+                f"WHERE up.descendant_id = %s AND down.ancestor_id = %s",
+                [supplier_id, node_id],
+            )
+
+    def rebuild(self) -> int:
+        """
+        Полностью перестраивает таблицу замыканий по материализованным путям звеньев.
+
+        :return: Количество созданных связей.
+        :rtype: int
+        """
+        self.all().delete()
+        batch = []
+        created = 0
+        for node_id, level, path in Node.objects.values_list("id", "level", "path").iterator(chunk_size=2000):
+            batch += self.links_for(node_id, level, path)
+            if len(batch) >= 5000:
+                created += len(self.bulk_create(batch))
+                batch = []
+        created += len(self.bulk_create(batch))
+        return created
+
+
+class NodeClosure(models.Model):
+    """
+    Таблица замыканий иерархии звеньев сети.
+
+    Для каждого звена хранит связь с самим собой (``depth=0``) и со всеми его предками.
+    Поддерево звена — это все строки с ``ancestor = звено``, цепочка поставщиков — все
+    строки с ``descendant = звено``; оба запроса обслуживаются индексами.
+
+    :param ancestor: Предок (поставщик любого уровня выше).
+    :type ancestor: Node
+    :param descendant: Потомок (клиент любого уровня ниже).
+    :type descendant: Node
+    :param depth: Расстояние между звеньями в иерархии.
+    :type depth: int
+    """
+
+    ancestor = models.ForeignKey(
+        Node, on_delete=models.CASCADE, related_name="descendant_links", verbose_name="Предок"
+    )  # type: ignore[var-annotated]
+    descendant = models.ForeignKey(
+        Node, on_delete=models.CASCADE, related_name="ancestor_links", verbose_name="Потомок"
+    )  # type: ignore[var-annotated]
+    depth = models.PositiveIntegerField(verbose_name="Глубина")  # type: ignore[var-annotated]
+
+    objects = NodeClosureManager()
+
+    def __str__(self) -> str:
+        return f"{self.ancestor_id} → {self.descendant_id} ({self.depth})"
+
+    class Meta:
+        verbose_name = "Связь иерархии"
+        verbose_name_plural = "Связи иерархии"
+        constraints = [
+            models.UniqueConstraint(fields=["ancestor", "descendant"], name="supply_closure_pair_uniq"),
+        ]
+        indexes = [models.Index(fields=["descendant", "depth"], name="supply_closure_ancestors_idx")]
 
 
 class Product(models.Model):
@@ -130,6 +818,8 @@ class Product(models.Model):
     :type release_date: datetime.date
     :param owner: Звено сети, которому принадлежит продукт.
     :type owner: Node
+    :param updated_at: Дата и время создания или последнего изменения (устанавливается автоматически).
+    :type updated_at: datetime.datetime
     """
 
     # Исключаем ругательства mypy о типизации, добавляя '# type: ignore[var-annotated]'
@@ -137,9 +827,13 @@ class Product(models.Model):
     model = models.CharField(max_length=100, verbose_name="Модель")  # type: ignore[var-annotated]
     release_date = models.DateField(verbose_name="Дата выхода на рынок")  # type: ignore[var-annotated]
 
-    # Владелец продукта — узел сети
+    # Владелец продукта — узел сети (отдельный индекс не нужен: его покрывает индекс (owner, name, id))
     owner = models.ForeignKey(
-        Node, on_delete=models.CASCADE, related_name="products", verbose_name="Владелец"
+        Node, on_delete=models.CASCADE, db_index=False, related_name="products", verbose_name="Владелец"
+    )  # type: ignore[var-annotated]
+
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата и время изменения"
     )  # type: ignore[var-annotated]
 
     def __str__(self) -> str:
@@ -151,6 +845,24 @@ class Product(models.Model):
         """
         return f"{self.name} ({self.model})"
 
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет продукт и обновляет ``subtree_product_count`` владельца и его предков.
+
+        При смене владельца счётчик уменьшается у старой цепочки и увеличивается у новой.
+        """
+        with transaction.atomic():
+            old_owner_id = None
+            if not self._state.adding and self.pk is not None:
+                old_owner_id = Product.objects.filter(pk=self.pk).values_list("owner_id", flat=True).first()
+            # Прежний владелец нужен обработчикам post_save (сброс кэша его продуктов)
+            self._previous_owner_id = old_owner_id
+            super().save(*args, **kwargs)
+            if old_owner_id != self.owner_id:
+                if old_owner_id is not None:
+                    Node.objects.above([old_owner_id]).shift_rollups(products=-1)
+                Node.objects.above([self.owner_id]).shift_rollups(products=1)
+
     class Meta:
         """
         Мета-опции для модели Product.
@@ -158,8 +870,55 @@ class Product(models.Model):
         :ivar verbose_name: Имя модели в единственном числе для отображения в админ-панели.
         :ivar verbose_name_plural: Имя модели во множественном числе.
         :ivar ordering: Порядок сортировки по умолчанию для запросов.
+        :ivar indexes: Индексы под ключ keyset-пагинации ``(name, id)``, тот же ключ в пределах владельца
+            (фильтр ``owner`` и продукты звена) и триграммные индексы под поиск админки (только PostgreSQL).
         """
 
         verbose_name = "Продукт"
         verbose_name_plural = "Продукты"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["name", "id"], name="supply_product_name_id_idx"),
+            models.Index(fields=["owner", "name", "id"], name="supply_product_owner_name_idx"),
+            *(trigram_index(field, name) for field, name in TRIGRAM_INDEXES["product"]),
+        ]
+
+
+class DebtClearingAudit(models.Model):
+    """
+    Журнал очистки задолженности перед поставщиком.
+
+    Строки пишутся пакетно (``INSERT ... SELECT``) сервисом :func:`supply.debt.clear_debt`
+    до обнуления задолженности, поэтому прежнее значение можно восстановить.
+
+    :param batch: Идентификатор запуска очистки (общий для всех строк одного запуска).
+    :type batch: uuid.UUID
+    :param node: Звено, у которого очищена задолженность (``NULL``, если звено удалено).
+    :type node: Node or None
+    :param old_debt: Задолженность до очистки.
+    :type old_debt: decimal.Decimal
+    :param cleared_by: Пользователь, запустивший очистку (``NULL`` для management-команды).
+    :type cleared_by: user.models.User or None
+    :param cleared_at: Время очистки.
+    :type cleared_at: datetime.datetime
+    """
+
+    batch = models.UUIDField(db_index=True, verbose_name="Запуск")  # type: ignore[var-annotated]
+    node = models.ForeignKey(
+        Node, on_delete=models.SET_NULL, null=True, related_name="debt_clearings", verbose_name="Звено"
+    )  # type: ignore[var-annotated]
+    old_debt = models.DecimalField(
+        max_digits=12, decimal_places=2, verbose_name="Задолженность до очистки"
+    )  # type: ignore[var-annotated]
+    cleared_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Кем очищено"
+    )  # type: ignore[var-annotated]
+    cleared_at = models.DateTimeField(verbose_name="Время очистки")  # type: ignore[var-annotated]
+
+    def __str__(self) -> str:
+        return f"{self.node_id}: {self.old_debt} ({self.cleared_at:%Y-%m-%d %H:%M})"
+
+    class Meta:
+        verbose_name = "Очистка задолженности"
+        verbose_name_plural = "Журнал очистки задолженности"
+        ordering = ["-cleared_at", "-id"]
@@ -0,0 +1,263 @@
+"""
+Пагинация для приложения 'supply'.
+
+Содержит keyset-пагинацию (seek method) по составному ключу сортировки
+``(поле, id)``. В отличие от ``LIMIT/OFFSET``, каждая страница выбирается
+условием ``WHERE (поле, id) > (значение, id)`` по индексу, поэтому глубокие
+страницы стоят столько же, сколько первая.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+KeysetCursor = namedtuple("KeysetCursor", ["ordering", "reverse", "position"])
+
+
+def _encode_key_value(value):
+    """
+    Кодирует значение ключа в JSON без потери точности.
+
+    ``DjangoJSONEncoder`` обрезает время до миллисекунд, из-за чего курсор по
+    ``created_at`` мог бы пропускать или повторять записи, поэтому даты кодируются полностью.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Значение типа {type(value).__name__} не поддерживается в курсоре.")
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация по составному ключу ``(поле, id)``.
+
+    Курсор — непрозрачная base64-строка с названием сортировки, направлением
+    и значениями ключа граничной записи. Клиент выбирает сортировку параметром
+    ``?ordering=`` из словаря :attr:`ordering_options` (префикс ``-`` — по убыванию)
+    и размер страницы параметром ``?page_size=``.
+
+    Формат ответа совпадает с :class:`rest_framework.pagination.CursorPagination`:
+    ``{"next": ..., "previous": ..., "results": [...]}``.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering_query_param = "ordering"
+    invalid_cursor_message = "Неверный курсор."
+
+    # Допустимые сортировки: название параметра -> поля ключа (последним всегда идёт уникальный id)
+    ordering_options = {"name": ("name", "id")}
+    default_ordering = "name"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Возвращает одну страницу набора запросов, отфильтрованную по ключу курсора.
+
+        :param queryset: Исходный набор запросов.
+        :param request: HTTP-запрос с параметрами ``cursor``, ``ordering`` и ``page_size``.
+        :param view: Представление, для которого выполняется пагинация.
+        :return: Список объектов страницы или ``None``, если пагинация отключена.
+        """
+        page_queryset = self.get_page_queryset(queryset, request)
+        if page_queryset is None:
+            return None
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Асинхронный вариант :meth:`paginate_queryset` для async-представлений (async ORM).
+        """
+        page_queryset = self.get_page_queryset(queryset, request)
+        if page_queryset is None:
+            return None
+        return self.set_page([obj async for obj in page_queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Разбирает параметры запроса и возвращает ленивый запрос страницы (на одну запись больше).
+
+        :return: Срез набора запросов или ``None``, если пагинация отключена.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering_name = self.get_ordering_name(request)
+        self.ordering = self.get_ordering_fields(self.ordering_name)
+        self.model = queryset.model
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        queryset = queryset.order_by(*(self._reverse(self.ordering) if reverse else self.ordering))
+        if self.cursor is not None:
+            queryset = queryset.filter(self._keyset_filter(self.cursor.position, reverse))
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results: list) -> list:
+        """
+        Запоминает страницу и наличие соседних страниц по выбранным записям.
+
+        :param results: Записи страницы плюс, возможно, одна лишняя (признак следующей страницы).
+        :return: Записи страницы.
+        :rtype: list
+        """
+        reverse = self.cursor is not None and self.cursor.reverse
+        self.page = results[: self.page_size]
+        has_more = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def get_ordering_name(self, request) -> str:
+        """
+        Возвращает выбранную клиентом сортировку или сортировку по умолчанию.
+
+        Неизвестные значения игнорируются, как в :class:`rest_framework.filters.OrderingFilter`.
+
+        :rtype: str
+        """
+        name = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        return name if name.lstrip("-") in self.ordering_options else self.default_ordering
+
+    def get_ordering_fields(self, name: str) -> tuple:
+        """
+        Раскрывает название сортировки в поля ключа с учётом направления.
+
+        :param name: Название сортировки, например ``-created_at``.
+        :type name: str
+        :return: Поля для ``order_by``, например ``("-created_at", "-id")``.
+        :rtype: tuple
+        """
+        prefix = "-" if name.startswith("-") else ""
+        return tuple(f"{prefix}{field}" for field in self.ordering_options[name.lstrip("-")])
+
+    def _keyset_filter(self, position, reverse: bool) -> Q:
+        """
+        Строит условие «строго после граничной записи» для составного ключа.
+
+        Для ключа ``(a, id)`` это ``a > x OR (a = x AND id > y)``; направление
+        сравнения зависит от сортировки и от того, листаем ли мы назад.
+        """
+        conditions = []
+        for index, order in enumerate(self.ordering):
+            field = order.lstrip("-")
+            lookup = "lt" if order.startswith("-") != reverse else "gt"
+            equal = {self.ordering[i].lstrip("-"): position[i] for i in range(index)}
+            conditions.append(Q(**equal, **{f"{field}__{lookup}": position[index]}))
+        return reduce(lambda left, right: left | right, conditions)
+
+    @staticmethod
+    def _reverse(ordering: tuple) -> tuple:
+        return tuple(order[1:] if order.startswith("-") else f"-{order}" for order in ordering)
+
+    def _get_position_from_instance(self, instance, ordering):
+        fields = [order.lstrip("-") for order in ordering]
+        if isinstance(instance, dict):
+            return [instance[field] for field in fields]
+        return [getattr(instance, field) for field in fields]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(KeysetCursor(self.ordering_name, False, position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(KeysetCursor(self.ordering_name, True, position))
+
+    def decode_cursor(self, request):
+        """
+        Декодирует курсор из параметра запроса.
+
+        Значения ключа приводятся к типам полей сортировки, поэтому подделанный курсор
+        (например, строка вместо ``id`` или неверная дата) даёт ``404``, а не ошибку запроса к БД.
+
+        :raises NotFound: Если курсор повреждён или выдан для другой сортировки.
+        :return: Курсор или ``None``, если запрошена первая страница.
+        :rtype: KeysetCursor or None
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            cursor = KeysetCursor(payload["o"], bool(payload["r"]), list(payload["p"]))
+            if cursor.ordering != self.ordering_name or len(cursor.position) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+            return cursor._replace(position=self._coerce_position(cursor.position))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _coerce_position(self, position: list) -> list:
+        """
+        Приводит значения ключа курсора к типам полей сортировки.
+
+        :raises ValidationError: Если значение не подходит полю.
+        :raises ValueError: Если значение пустое (поля ключа не допускают ``NULL``).
+        """
+        values = []
+        for order, raw in zip(self.ordering, position):
+            if raw is None or isinstance(raw, (list, dict)):
+                raise ValueError("Недопустимое значение ключа курсора.")
+            values.append(self.model._meta.get_field(order.lstrip("-")).to_python(raw))
+        return values
+
+    def encode_cursor(self, cursor):
+        """
+        Кодирует курсор в ссылку на соседнюю страницу.
+
+        :param cursor: Курсор граничной записи.
+        :type cursor: KeysetCursor
+        :return: Абсолютный URL страницы.
+        :rtype: str
+        """
+        payload = json.dumps(
+            {"o": cursor.ordering, "r": int(cursor.reverse), "p": cursor.position},
+            default=_encode_key_value,
+            separators=(",", ":"),
+        )
+        encoded = urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        url = replace_query_param(self.base_url, self.cursor_query_param, encoded)
+        return replace_query_param(url, self.ordering_query_param, self.ordering_name)
+
+
+class NodeCursorPagination(KeysetCursorPagination):
+    """
+    Пагинация списков звеньев сети: по названию, времени создания или сводным показателям поддерева.
+    """
+
+    ordering_options = {
+        "name": ("name", "id"),
+        "created_at": ("created_at", "id"),
+        "subtree_debt": ("subtree_debt", "id"),
+        "subtree_node_count": ("subtree_node_count", "id"),
+        "subtree_product_count": ("subtree_product_count", "id"),
+    }
+
+
+class ProductCursorPagination(KeysetCursorPagination):
+    """
+    Пагинация списков продуктов: по названию.
+    """
+
+    ordering_options = {"name": ("name", "id")}
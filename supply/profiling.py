@@ -0,0 +1,205 @@
+"""
+Профилирование запросов к API.
+
+:class:`RequestProfilingMiddleware` для каждого запроса считает количество
+SQL-запросов, время в БД, время рендеринга ответа и общее время. Значения
+отдаются в заголовке ``Server-Timing`` и пишутся структурированной (JSON)
+строкой уровня ``INFO`` в лог ``supply.profiling``. У этого логера свой файл
+(``supply/logs/profiling.log``), а не журнал действий ``reports.log``; в production
+его уровень по умолчанию ``WARNING`` (``SUPPLY_PROFILING_LOG_LEVEL``), и построчный
+лог запросов выключен.
+
+Для имён маршрутов из ``settings.SUPPLY_QUERY_BUDGETS`` задаётся бюджет
+запросов к БД: превышение пишется в лог предупреждением и отправляется
+сигналом :data:`query_budget_exceeded`, на который подписана pytest-фикстура
+``enforce_query_budgets`` (``conftest.py``) — тест с N+1 падает.
+
+При включённом пуле соединений (``DB_POOL``) в лог добавляются занятые и
+ожидающие соединения пула, насыщение пула пишется предупреждением.
+"""
+
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import Signal, receiver
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from supply.db import pool_stats
+
+logger = logging.getLogger(__name__)
+
+# Отправляется с аргументами ``profile`` (dict) и ``budget`` (int) при превышении бюджета запросов
+query_budget_exceeded = Signal()
+
+# Счётчик текущего HTTP-запроса. Контекстная переменная копируется в потоки
+# sync_to_async, поэтому запросы async ORM попадают в счётчик своего HTTP-запроса.
+_current_counter: ContextVar["QueryCounter | None"] = ContextVar("supply_query_counter", default=None)
+
+
+class QueryCounter:
+    """
+    Считает SQL-запросы и суммарное время их выполнения.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Обёртка ``execute_wrapper``, постоянно установленная на все соединения:
+    учитывает запрос в счётчике текущего HTTP-запроса, если он есть.
+    """
+    counter = _current_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.duration += time.perf_counter() - started
+        counter.count += 1
+
+
+def install_query_counter(connection) -> None:
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+@receiver(connection_created)
+def install_on_connect(sender, connection, **kwargs):
+    install_query_counter(connection)
+
+
+class RequestProfilingMiddleware:
+    """
+    Измеряет запросы к БД и время обработки каждого HTTP-запроса.
+
+    Метрики:
+        :db: время выполнения SQL (``desc`` — количество запросов);
+        :serialize: рендеринг ответа после выхода из представления (JSON-кодирование);
+        :app: остальное время представления (в т.ч. построение данных сериализатором);
+        :total: полное время обработки запроса.
+
+    Заголовок ``Server-Timing`` добавляется при ``settings.SUPPLY_SERVER_TIMING``,
+    профилирование целиком отключается ``settings.SUPPLY_PROFILING``.
+    Работает и в синхронной (WSGI), и в асинхронной (ASGI) цепочке middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Соединения, открытые до загрузки middleware, сигнал connection_created уже пропустили
+        for connection in connections.all(initialized_only=True):
+            install_query_counter(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.SUPPLY_PROFILING:
+            return self.get_response(request)
+        counter, token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_counter.reset(token)
+        return self.finish(request, response, counter, started)
+
+    async def __acall__(self, request):
+        if not settings.SUPPLY_PROFILING:
+            return await self.get_response(request)
+        counter, token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_counter.reset(token)
+        return self.finish(request, response, counter, started)
+
+    @staticmethod
+    def start(request):
+        counter = QueryCounter()
+        request._profiling_rendered_at = None
+        return counter, _current_counter.set(counter), time.perf_counter()
+
+    def finish(self, request, response, counter: QueryCounter, started: float):
+        """
+        Собирает метрики запроса, добавляет ``Server-Timing``, пишет лог и проверяет бюджет.
+        """
+        finished = time.perf_counter()
+        view_finished = request._profiling_rendered_at or finished
+        profile = {
+            "method": request.method,
+            "path": request.path,
+            "view": getattr(request.resolver_match, "view_name", None),
+            "status": response.status_code,
+            "queries": counter.count,
+            "db_ms": round(counter.duration * 1000, 2),
+            "serialize_ms": round((finished - view_finished) * 1000, 2),
+            "total_ms": round((finished - started) * 1000, 2),
+        }
+        profile["app_ms"] = round(max(profile["total_ms"] - profile["db_ms"] - profile["serialize_ms"], 0), 2)
+        pool = pool_stats()
+        if pool is not None:
+            profile["pool"] = {key: pool[key] for key in ("in_use", "waiting", "saturation")}
+            if pool["saturated"]:
+                logger.warning("Пул соединений БД насыщен: %s", json.dumps(pool))
+
+        if settings.SUPPLY_SERVER_TIMING:
+            response["Server-Timing"] = self.server_timing(profile)
+        logger.info(json.dumps(profile, ensure_ascii=False))
+        self.check_budget(profile)
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Отмечает момент выхода из представления: DRF-ответ рендерится после этого хука.
+        """
+        request._profiling_rendered_at = time.perf_counter()
+        return response
+
+    @staticmethod
+    def server_timing(profile: dict) -> str:
+        """
+        Формирует значение заголовка ``Server-Timing``.
+
+        :param profile: Метрики запроса.
+        :type profile: dict
+        :rtype: str
+        """
+        return (
+            f'db;dur={profile["db_ms"]};desc="{profile["queries"]} queries", '
+            f'serialize;dur={profile["serialize_ms"]}, app;dur={profile["app_ms"]}, total;dur={profile["total_ms"]}'
+        )
+
+    @staticmethod
+    def check_budget(profile: dict) -> None:
+        """
+        Сообщает о превышении бюджета SQL-запросов для маршрута.
+
+        :param profile: Метрики запроса.
+        :type profile: dict
+        """
+        budget = settings.SUPPLY_QUERY_BUDGETS.get(profile["view"])
+        if budget is None or profile["queries"] <= budget:
+            return
+        logger.warning(
+            "Превышен бюджет запросов к БД для %s: %s > %s (%s %s)",
+            profile["view"],
+            profile["queries"],
+            budget,
+            profile["method"],
+            profile["path"],
+        )
+        query_budget_exceeded.send(sender=RequestProfilingMiddleware, profile=profile, budget=budget)
@@ -0,0 +1,41 @@
+"""
+Рендереры ответов API приложения 'supply'.
+
+:class:`FastJSONRenderer` кодирует ответ через ``orjson`` (если пакет установлен),
+выдавая те же байты, что и :class:`rest_framework.renderers.JSONRenderer`
+с настройками по умолчанию (компактные разделители, UTF-8 без экранирования,
+экранированные ``U+2028``/``U+2029``). Данные, которые ``orjson`` не кодирует
+(``Decimal``, ленивые строки и т.п.), и ответы с отступами кодируются стандартным рендерером.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на ``orjson`` с откатом на стандартный :class:`JSONRenderer`.
+
+    Предназначен для списков, построенных :class:`supply.serializers.ValuesListSerializer`:
+    в них только строки, целые числа, ``bool`` и ``None``. Числа с плавающей точкой
+    ``orjson`` записывает иначе, чем :mod:`json` (например, ``1e16`` вместо ``1e+16``).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return content.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
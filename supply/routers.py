@@ -0,0 +1,147 @@
+"""
+Маршрутизация запросов к БД между основной базой и репликами чтения.
+
+:class:`PrimaryReplicaRouter` отправляет чтение моделей приложений ``supply`` и ``user``
+на реплики из ``settings.SUPPLY_DB_REPLICAS``, запись — всегда в основную базу
+(``default``). Чтение остаётся в основной базе, если:
+
+- идёт транзакция в основной базе (чтение внутри записи, ``select_for_update``);
+- код выполняется в блоке :func:`use_primary` (например, массовая очистка задолженности);
+- обрабатывается запрос с небезопасным методом (``POST``, ``PUT``, ``PATCH``, ``DELETE``);
+- клиент недавно что-то записал: после успешного небезопасного запроса
+  :class:`ReplicaPinningMiddleware` на ``SUPPLY_REPLICA_PIN_SECONDS`` секунд закрепляет клиента
+  (по заголовку ``Authorization`` или сессии) за основной базой, чтобы он видел свои изменения
+  несмотря на отставание реплик.
+
+Без настроенных реплик маршрутизатор ничего не меняет.
+"""
+
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from supply.cache import get_cache
+
+# Чтение текущего запроса (или блока use_primary) идёт в основную базу
+_primary_pinned: ContextVar[bool] = ContextVar("supply_primary_pinned", default=False)
+
+UNSAFE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+def primary_pinned() -> bool:
+    """
+    Проверяет, должно ли чтение в текущем контексте идти в основную базу.
+
+    :rtype: bool
+    """
+    return _primary_pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+@contextmanager
+def use_primary():
+    """
+    Направляет все чтения внутри блока в основную базу.
+    """
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Чтение моделей ``supply`` и ``user`` — со случайной реплики, запись — в основную базу.
+    """
+
+    route_app_labels = frozenset({"supply", "user"})
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.SUPPLY_DB_REPLICAS
+        if not replicas or model._meta.app_label not in self.route_app_labels or primary_pinned():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        databases = {DEFAULT_DB_ALIAS, *settings.SUPPLY_DB_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит репликацией из основной базы
+        if db in settings.SUPPLY_DB_REPLICAS:
+            return False
+        return None
+
+
+def _pin_key(request) -> str | None:
+    """
+    Ключ кэша закрепления клиента: хэш заголовка ``Authorization`` или cookie сессии.
+    """
+    credential = request.headers.get("Authorization") or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return f"supply:primary-pin:{hashlib.sha256(credential.encode('utf-8')).hexdigest()}"
+
+
+class ReplicaPinningMiddleware:
+    """
+    Закрепляет за основной базой небезопасные запросы и клиентов, недавно выполнивших запись.
+
+    Без настроенных реплик (``SUPPLY_DB_REPLICAS``) ничего не делает.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.SUPPLY_DB_REPLICAS:
+            return self.get_response(request)
+        key = _pin_key(request)
+        token = _primary_pinned.set(request.method in UNSAFE_METHODS or bool(key and get_cache().get(key)))
+        try:
+            response = self.get_response(request)
+        finally:
+            _primary_pinned.reset(token)
+        if self.wrote(request, response, key):
+            get_cache().set(key, True, settings.SUPPLY_REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.SUPPLY_DB_REPLICAS:
+            return await self.get_response(request)
+        key = _pin_key(request)
+        token = _primary_pinned.set(request.method in UNSAFE_METHODS or bool(key and await get_cache().aget(key)))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _primary_pinned.reset(token)
+        if self.wrote(request, response, key):
+            await get_cache().aset(key, True, settings.SUPPLY_REPLICA_PIN_SECONDS)
+        return response
+
+    @staticmethod
+    def wrote(request, response, key: str | None) -> bool:
+        """
+        Проверяет, нужно ли закрепить клиента за основной базой: он успешно выполнил небезопасный запрос.
+        """
+        return bool(key) and request.method in UNSAFE_METHODS and response.status_code < 400
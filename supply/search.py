@@ -0,0 +1,234 @@
+"""
+Поиск по сети поставок: звенья (название, город, страна) и продукты (модель, название).
+
+На PostgreSQL поиск идёт по сохраняемой генерируемой колонке ``search_vector``
+(``tsvector`` с весами полей, GIN-индекс; создаётся миграцией ``0010_search_vector``)
+и по триграммному сходству (``pg_trgm``, индексы по ``UPPER(поле)``): каждое слово
+запроса ищется как префикс, опечатки в названии звена или модели продукта находит
+триграммное сходство. Ранг — сумма ``ts_rank`` и ``word_similarity``, подсветка —
+``ts_headline``.
+
+Подсветка — HTML: текст полей экранируется (как :func:`django.utils.html.escape`) до
+расстановки ``<mark>``, поэтому разметка в названии не попадает в ответ как HTML.
+
+На остальных СУБД (SQLite в тестах) работает упрощённый вариант: каждое слово должно
+встречаться (``icontains``) хотя бы в одном поле, ранг и подсветка вычисляются в Python
+по тем же весам полей.
+"""
+
+import re
+from collections import namedtuple
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVectorField,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import F, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Replace, Upper
+from django.utils.html import escape
+
+from supply.models import Node, Product
+
+# СУБД с полнотекстовым поиском по колонке search_vector
+FULL_TEXT_SEARCH_VENDORS = frozenset({"postgresql"})
+
+# Конфигурация текстового поиска колонки search_vector: без стемминга, названия и модели ищутся по префиксам
+SEARCH_CONFIG = "simple"
+HIGHLIGHT_START, HIGHLIGHT_STOP = "<mark>", "</mark>"
+
+# Веса ts_rank по умолчанию для меток A/B/C/D
+RANK_WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+# Во сколько раз больше лимита записей читает упрощённый поиск перед ранжированием в Python
+FALLBACK_SCAN_FACTOR = 5
+
+# Замены django.utils.html.escape; «&» заменяется первым
+HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;"))
+
+SearchSpec = namedtuple("SearchSpec", ["model", "weights", "trigram_field", "highlight", "fields"])
+
+# Что ищется по каждому типу результата: веса полей (совпадают с миграцией 0010_search_vector),
+# поле триграммного сходства, подсвечиваемые поля и поля ответа (имя в ответе -> атрибут модели)
+SEARCH_SPECS = {
+    "node": SearchSpec(
+        model=Node,
+        weights={"name": "A", "city": "B", "country": "C"},
+        trigram_field="name",
+        highlight=("name", "city"),
+        fields={"name": "name", "country": "country", "city": "city"},
+    ),
+    "product": SearchSpec(
+        model=Product,
+        weights={"model": "A", "name": "B"},
+        trigram_field="model",
+        highlight=("name", "model"),
+        fields={"name": "name", "model": "model", "owner": "owner_id"},
+    ),
+}
+
+
+def escape_html(field: str):
+    """
+    SQL-выражение поля с экранированным HTML (для ``ts_headline``).
+    """
+    expression = F(field)
+    for char, entity in HTML_ESCAPES:
+        expression = Replace(expression, Value(char), Value(entity))
+    return expression
+
+
+def highlight(text: str, pattern) -> str:
+    """
+    Экранирует HTML в тексте и оборачивает совпадения ``pattern`` в ``<mark>``.
+
+    :rtype: str
+    """
+    parts, position = [], 0
+    for match in pattern.finditer(text):
+        parts += [escape(text[position : match.start()]), HIGHLIGHT_START, escape(match.group(0)), HIGHLIGHT_STOP]
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return "".join(parts)
+
+
+def search_terms(query: str) -> list[str]:
+    """
+    Разбивает строку запроса на слова (в нижнем регистре, без знаков препинания).
+
+    :rtype: list[str]
+    """
+    return re.findall(r"\w+", query.casefold())
+
+
+def search(query: str, limit: int, types=None) -> list[dict]:
+    """
+    Ищет звенья и продукты и возвращает общий список по убыванию ранга.
+
+    :param query: Строка запроса.
+    :param limit: Наибольшее количество результатов.
+    :param types: Типы результатов из :data:`SEARCH_SPECS` (по умолчанию — все).
+    :return: Результаты вида ``{"type": "node", "id": 1, "name": ..., "rank": 0.9, "highlights": {...}}``.
+    :rtype: list[dict]
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    results = []
+    for kind in types or SEARCH_SPECS:
+        spec = SEARCH_SPECS[kind]
+        if connections[spec.model.objects.db].vendor in FULL_TEXT_SEARCH_VENDORS:
+            results += _full_text_search(kind, spec, terms, limit)
+        else:
+            results += _fallback_search(kind, spec, re.findall(r"\w+", query), limit)
+    results.sort(key=lambda item: (-item["rank"], item["type"], item["id"]))
+    return results[:limit]
+
+
+def _full_text_search(kind: str, spec: SearchSpec, terms: list[str], limit: int) -> list[dict]:
+    text = " ".join(terms).upper()
+    query = SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config=SEARCH_CONFIG)
+    table = connections[spec.model.objects.db].ops.quote_name(spec.model._meta.db_table)
+    queryset = (
+        spec.model.objects.only(*spec.fields.values())
+        .alias(
+            document=RawSQL(f"{table}.search_vector", [], output_field=SearchVectorField()),
+            trigram_text=Upper(spec.trigram_field),
+        )
+        .filter(Q(document=query) | Q(trigram_text__trigram_word_similar=text))
+        .annotate(
+            rank=SearchRank(F("document"), query) + TrigramWordSimilarity(Value(text), Upper(spec.trigram_field)),
+            **{
+                f"highlight_{field}": SearchHeadline(
+                    escape_html(field),
+                    query,
+                    config=SEARCH_CONFIG,
+                    start_sel=HIGHLIGHT_START,
+                    stop_sel=HIGHLIGHT_STOP,
+                    highlight_all=True,
+                )
+                for field in spec.highlight
+            },
+        )
+        .order_by("-rank", "pk")[:limit]
+    )
+    return [
+        _item(kind, spec, obj, obj.rank, {field: getattr(obj, f"highlight_{field}") for field in spec.highlight})
+        for obj in queryset
+    ]
+
+
+def _fallback_search(kind: str, spec: SearchSpec, words: list[str], limit: int) -> list[dict]:
+    """
+    Упрощённый поиск. Слова передаются в исходном регистре: SQLite сравнивает
+    ``LIKE`` без учёта регистра только для ASCII.
+    """
+    condition = reduce(
+        lambda combined, word: combined & reduce(or_, (Q(**{f"{field}__icontains": word}) for field in spec.weights)),
+        words,
+        Q(),
+    )
+    rows = spec.model.objects.only(*spec.fields.values()).filter(condition).order_by("pk")
+    terms = [word.casefold() for word in words]
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    items = []
+    for obj in rows[: limit * FALLBACK_SCAN_FACTOR]:
+        highlights = {field: highlight(getattr(obj, field), pattern) for field in spec.highlight}
+        items.append(_item(kind, spec, obj, _fallback_rank(obj, spec, terms), highlights))
+    items.sort(key=lambda item: (-item["rank"], item["id"]))
+    return items[:limit]
+
+
+def _fallback_rank(obj, spec: SearchSpec, terms: list[str]) -> float:
+    """
+    Ранг упрощённого поиска: совпадение слова целиком — 1, префикс слова — 0.5,
+    вхождение — 0.25, с весом поля; среднее по словам запроса.
+    """
+    total = 0.0
+    for term in terms:
+        best = 0.0
+        for field, weight in spec.weights.items():
+            words = search_terms(getattr(obj, field))
+            if term in words:
+                score = 1.0
+            elif any(word.startswith(term) for word in words):
+                score = 0.5
+            elif term in getattr(obj, field).casefold():
+                score = 0.25
+            else:
+                continue
+            best = max(best, score * RANK_WEIGHTS[weight])
+        total += best
+    return total / len(terms)
+
+
+def _item(kind: str, spec: SearchSpec, obj, rank: float, highlights: dict) -> dict:
+    return {
+        "type": kind,
+        "id": obj.pk,
+        **{name: getattr(obj, attr) for name, attr in spec.fields.items()},
+        "rank": round(float(rank), 4),
+        "highlights": highlights,
+    }
+
+
+def search_limit(value) -> int:
+    """
+    Разбирает параметр ``?limit=``.
+
+    :raises ValueError: Если значение не целое число от 1 до ``SUPPLY_SEARCH_MAX_LIMIT``.
+    :rtype: int
+    """
+    if value in (None, ""):
+        return settings.SUPPLY_SEARCH_LIMIT
+    limit = int(value)
+    if not 1 <= limit <= settings.SUPPLY_SEARCH_MAX_LIMIT:
+        raise ValueError(limit)
+    return limit
@@ -6,17 +6,245 @@
 сети поставок (Node) в формат JSON и обратно, обеспечивая взаимодействие
 с API Django REST Framework.
 """
-from rest_framework import serializers
+
+from datetime import date
+from decimal import Decimal, getcontext
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
 from supply.models import Node, Product
 
 
-class NodeSerializer(serializers.ModelSerializer):
+def parse_field_names(value: str | None) -> list[str]:
+    """
+    Разбирает список полей вида ``id,name,level``.
+
+    :rtype: list[str]
+    """
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+class SparseFieldsMixin:
+    """
+    Оставляет в ответе на ``GET`` только поля из ``?fields=`` и/или убирает поля из ``?exclude=``.
+
+    Например, ``?fields=id,name,level`` или ``?exclude=street,building_number``.
+    Для запросов на запись набор полей не меняется.
+    """
+
+    fields_query_param = "fields"
+    exclude_query_param = "exclude"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is not None and request.method == "GET":
+            selected = set(self.get_sparse_field_names(request))
+            for name in [name for name in self.fields if name not in selected]:
+                self.fields.pop(name)
+
+    def get_sparse_field_names(self, request) -> list[str]:
+        """
+        Возвращает поля ответа с учётом параметров запроса.
+
+        :raises serializers.ValidationError: Если запрошено неизвестное поле.
+        :rtype: list[str]
+        """
+        available = list(self.fields)
+        requested = parse_field_names(request.query_params.get(self.fields_query_param)) or available
+        excluded = parse_field_names(request.query_params.get(self.exclude_query_param))
+        for param, names in ((self.fields_query_param, requested), (self.exclude_query_param, excluded)):
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                raise serializers.ValidationError({param: f"Неизвестные поля: {', '.join(unknown)}."})
+        return [name for name in requested if name not in excluded]
+
+
+class ExpandFieldsMixin:
+    """
+    Встраивает в ответ на ``GET`` связанные объекты, перечисленные в ``?expand=``.
+
+    Связи задаёт словарь :attr:`expandable_fields` вида ``{название: (сериализатор, many)}``;
+    сериализатор ``"self"`` — тот же класс (например, поставщик звена). Встроенные поля
+    добавляются к полям ответа после ``?fields=``/``?exclude=``. Связи должны быть подгружены заранее
+    (``select_related``/``prefetch_related``), иначе каждая запись потребует отдельных запросов.
+    """
+
+    expand_query_param = "expand"
+    expandable_fields: dict = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is not None and request.method == "GET":
+            for name in self.get_expand_names(request):
+                self.fields[name] = self.get_expanded_field(name)
+
+    def get_expand_names(self, request) -> list[str]:
+        """
+        Возвращает запрошенные связи.
+
+        :raises serializers.ValidationError: Если запрошена неизвестная связь.
+        :rtype: list[str]
+        """
+        names = parse_field_names(request.query_params.get(self.expand_query_param))
+        unknown = [name for name in names if name not in self.expandable_fields]
+        if unknown:
+            raise serializers.ValidationError({self.expand_query_param: f"Неизвестные связи: {', '.join(unknown)}."})
+        return list(dict.fromkeys(names))
+
+    def get_expanded_field(self, name: str) -> serializers.BaseSerializer:
+        """
+        Возвращает вложенный сериализатор связи (только для чтения) по :attr:`expandable_fields`.
+
+        :rtype: serializers.BaseSerializer
+        """
+        serializer_class, many = self.expandable_fields[name]
+        if serializer_class == "self":
+            serializer_class = type(self)
+        return serializer_class(many=many, read_only=True)
+
+
+# Поля, чьё представление совпадает со значением колонки из .values()
+VALUES_IDENTITY_FIELDS = (
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+def _datetime_converter(field):
+    """
+    Повторяет :meth:`rest_framework.fields.DateTimeField.to_representation` для формата ISO 8601.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    field_timezone = getattr(field, "timezone", None) or (timezone.get_current_timezone() if settings.USE_TZ else None)
+
+    def convert(value):
+        if field_timezone is None or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+def _decimal_converter(field):
+    """
+    Повторяет :meth:`rest_framework.fields.DecimalField.to_representation` для строкового представления.
+    """
+    coerce_to_string = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or getattr(field, "normalize_output", False):
+        return field.to_representation
+    if field.decimal_places is None:
+        return "{:f}".format
+    quantum = Decimal(1).scaleb(-field.decimal_places)
+    context = getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+
+    # При не более чем 6 знаках после запятой str() даёт ту же запись, что и формат "f", но быстрее
+    fmt = str if field.decimal_places <= 6 else "{:f}".format
+
+    def convert(value):
+        return fmt(value.quantize(quantum, rounding=field.rounding, context=context))
+
+    return convert
+
+
+def _date_converter(field):
+    output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    return date.isoformat
+
+
+def values_converter(field):
+    """
+    Возвращает функцию представления значения колонки для поля сериализатора.
+
+    :return: ``None``, если значение выводится как есть, иначе функция от значения.
+    """
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is not None:
+        return field.pk_field.to_representation
+    if type(field) in VALUES_IDENTITY_FIELDS:
+        return None
+    if type(field) is serializers.BigIntegerField:
+        return None if not getattr(field, "coerce_to_string", api_settings.COERCE_BIGINT_TO_STRING) else str
+    if type(field) is serializers.DateTimeField:
+        return _datetime_converter(field)
+    if type(field) is serializers.DecimalField:
+        return _decimal_converter(field)
+    if type(field) is serializers.DateField:
+        return _date_converter(field)
+    return field.to_representation
+
+
+class ValuesListSerializer(serializers.ListSerializer):
+    """
+    Список, который умеет сериализовать строки ``QuerySet.values()`` в обход полей DRF.
+
+    Для словарей (строк ``.values()`` с ключами-источниками полей) представление строится
+    без объектов полей на каждую строку: значения колонок выбираются в порядке полей ответа,
+    а преобразуются только значения, чьё представление отличается от колонки — даты,
+    ``Decimal`` (см. :func:`values_converter`). Результат совпадает с обычным
+    ``to_representation`` по объектам модели; объекты модели сериализуются как обычно.
+    """
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if not rows or not isinstance(rows[0], dict):
+            return [self.child.to_representation(item) for item in rows]
+        fields = self.child.fields
+        names = list(fields)
+        if not names:
+            return [{} for _ in rows]
+        get_values = itemgetter(*(field.source for field in fields.values()))
+        converters = [(name, convert) for name in names if (convert := values_converter(fields[name])) is not None]
+        if len(names) == 1:
+            representation = [{names[0]: get_values(row)} for row in rows]
+        else:
+            representation = [dict(zip(names, get_values(row))) for row in rows]
+        for item in representation:
+            for name, convert in converters:
+                value = item[name]
+                if value is not None:
+                    item[name] = convert(value)
+        return representation
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Сериализатор для модели Product.
+
+    Поддерживает выбор полей ответа параметрами ``?fields=`` и ``?exclude=`` (:class:`SparseFieldsMixin`).
+    """
+
+    class Meta:
+        model = Product
+        fields = "__all__"
+        list_serializer_class = ValuesListSerializer
+
+
+class NodeSerializer(ExpandFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Node.
 
     Преобразует объекты модели :class:`~supply.models.Node` в JSON и обратно,
     при этом запрещает прямое изменение поля `debt_to_supplier` через API.
+    Поддерживает выбор полей ответа параметрами ``?fields=`` и ``?exclude=`` (:class:`SparseFieldsMixin`)
+    и встраивание связей ``?expand=products,supplier,clients`` (:class:`ExpandFieldsMixin`):
+    вместо идентификатора поставщика — его карточка, плюс списки продуктов и клиентов звена.
 
     Поля:
         :id: (int) Уникальный идентификатор узла.
@@ -29,12 +257,30 @@ class NodeSerializer(serializers.ModelSerializer):
         :supplier: (:class:`~supply.models.Node` or None) Ссылка на поставщика (другой узел сети).
         :debt_to_supplier: (Decimal) Задолженность перед поставщиком (только для чтения).
         :created_at: (datetime) Время создания записи (только для чтения).
+        :updated_at: (datetime) Время последнего изменения, в т.ч. уровня и сводных показателей (только для чтения).
+        :level: (int) Уровень звена в иерархии (только для чтения, хранится в таблице).
+        :path: (str) Путь предков звена вида ``/1/5/`` (только для чтения).
+        :subtree_debt: (Decimal) Сумма задолженностей звена и всех его потомков (только для чтения).
+        :subtree_node_count: (int) Количество звеньев в поддереве, включая само звено (только для чтения).
+        :subtree_product_count: (int) Количество продуктов звена и его потомков (только для чтения).
     """
 
-    level = serializers.SerializerMethodField()
+    # Те же связи, что подгружает NodeQuerySet.with_expansions (NODE_EXPANSIONS)
+    expandable_fields = {"products": (ProductSerializer, True), "supplier": ("self", False), "clients": ("self", True)}
 
-    def get_level(self, obj):
-        return obj.level
+    def validate_supplier(self, supplier):
+        """
+        Запрещает назначать поставщиком само звено или его клиента (цикл в иерархии).
+
+        :param supplier: Новый поставщик.
+        :type supplier: supply.models.Node or None
+        :raises serializers.ValidationError: Если назначение создаёт цикл.
+        :return: Проверенный поставщик.
+        """
+        if supplier is not None and self.instance is not None:
+            if supplier.pk == self.instance.pk or self.instance.is_ancestor_of(supplier):
+                raise serializers.ValidationError("Нельзя назначить поставщиком само звено или его клиента.")
+        return supplier
 
     class Meta:
         """
@@ -47,7 +293,15 @@ class NodeSerializer(serializers.ModelSerializer):
 
         model = Node
         fields = "__all__"
-        read_only_fields = ["debt_to_supplier", "level"]
+        list_serializer_class = ValuesListSerializer
+        read_only_fields = [
+            "debt_to_supplier",
+            "level",
+            "path",
+            "subtree_debt",
+            "subtree_node_count",
+            "subtree_product_count",
+        ]
 
     def update(self, instance, validated_data):
         """
@@ -63,13 +317,3 @@ class NodeSerializer(serializers.ModelSerializer):
         """
         validated_data.pop("debt_to_supplier", None)
         return super().update(instance, validated_data)
-
-
-class ProductSerializer(serializers.ModelSerializer):
-    """
-    Сериализатор для модели Product.
-    """
-
-    class Meta:
-        model = Product
-        fields = "__all__"
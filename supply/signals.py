@@ -0,0 +1,76 @@
+"""
+Обработчики сигналов приложения 'supply'.
+
+Поддерживают согласованность материализованной иерархии звеньев сети
+и сводных показателей поддерева в тех случаях, когда Django изменяет данные
+в обход :meth:`supply.models.Node.save` и :meth:`supply.models.Product.save`,
+а также сбрасывают кэш ответов API (:mod:`supply.cache`) при изменении данных.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from supply.cache import invalidate_nodes, invalidate_products
+from supply.models import Node, Product, path_ids
+
+
+@receiver(pre_delete, sender=Node)
+def detach_clients_before_delete(sender, instance, **kwargs):
+    """
+    Перед удалением поставщика делает его клиентов корнями иерархии.
+
+    :param sender: Класс модели, отправивший сигнал.
+    :param instance: Удаляемое звено сети.
+    :type instance: supply.models.Node
+    """
+    # Пока связи в таблице замыканий целы: у предков меняются сводные показатели, у клиентов — уровень
+    invalidate_nodes([instance.pk], with_subtrees=True)
+    instance.detach_subtree()
+
+
+@receiver(post_save, sender=Node)
+def invalidate_node_cache(sender, instance, created, **kwargs):
+    """
+    Сбрасывает кэш карточки звена, его нынешних и бывших предков, а при смене
+    уровня — и всех клиентов звена.
+
+    :param sender: Класс модели, отправивший сигнал.
+    :param instance: Сохранённое звено сети.
+    :type instance: supply.models.Node
+    :param created: Создано ли звено.
+    :type created: bool
+    """
+    previous_path = getattr(instance, "_previous_path", None) or instance.path
+    invalidate_nodes(
+        [instance.pk],
+        extra_ancestor_ids=path_ids(instance.path) + path_ids(previous_path),
+        with_subtrees=not created and previous_path != instance.path,
+    )
+
+
+@receiver(post_save, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш продуктов нынешнего и прежнего владельца.
+
+    :param sender: Класс модели, отправивший сигнал.
+    :param instance: Сохранённый продукт.
+    :type instance: supply.models.Product
+    """
+    invalidate_products([instance.owner_id, getattr(instance, "_previous_owner_id", None)])
+
+
+@receiver(post_delete, sender=Product)
+def shift_product_count_after_delete(sender, instance, **kwargs):
+    """
+    После удаления продукта уменьшает ``subtree_product_count`` владельца и его предков.
+
+    При каскадном удалении владельца его связи в таблице замыканий уже удалены,
+    а показатели предков скорректированы в :meth:`supply.models.Node.detach_subtree`.
+
+    :param sender: Класс модели, отправивший сигнал.
+    :param instance: Удалённый продукт.
+    :type instance: supply.models.Product
+    """
+    Node.objects.above([instance.owner_id]).shift_rollups(products=-1)
+    invalidate_products([instance.owner_id])
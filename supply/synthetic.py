@@ -0,0 +1,127 @@
+"""
+Генератор синтетической сети поставок для нагрузочного тестирования.
+
+Сеть строится по уровням: сначала заводы, затем у каждого звена предыдущего
+уровня — ``fanout`` клиентов, пока не будет создано нужное количество звеньев
+или не будет достигнута глубина ``depth``. Звенья вставляются пакетами через
+``bulk_create`` с заранее вычисленными ``level``/``path``, связи иерархии —
+через :meth:`~supply.models.NodeClosureManager.attach`, продукты — пакетами,
+поэтому генерация миллионов строк не требует держать их в памяти.
+"""
+
+import math
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max
+
+from supply.cache import invalidate_all
+from supply.models import Node, NodeClosure, Product
+
+COUNTRIES = ("KZ", "RU", "BY", "UZ", "KG")
+CITIES = ("Алматы", "Астана", "Москва", "Минск", "Ташкент", "Бишкек")
+
+
+def roots_for(nodes: int, depth: int, fanout: int) -> int:
+    """
+    Возвращает минимальное число заводов, при котором дерево вмещает ``nodes`` звеньев.
+
+    :rtype: int
+    """
+    capacity = sum(fanout**level for level in range(depth + 1))
+    return max(1, math.ceil(nodes / capacity))
+
+
+def generate_network(
+    nodes: int,
+    depth: int,
+    fanout: int,
+    products_per_node: int = 0,
+    batch_size: int = 5000,
+    seed: int | None = None,
+    progress=None,
+) -> dict:
+    """
+    Создаёт синтетическую сеть поставок.
+
+    Названия, email и телефоны строятся от ``max(id) + 1``, поэтому повторный
+    запуск не конфликтует с уже созданными звеньями.
+
+    :param nodes: Количество звеньев.
+    :param depth: Наибольший уровень (0 — только заводы).
+    :param fanout: Количество клиентов у каждого звена.
+    :param products_per_node: Количество продуктов у каждого звена.
+    :param batch_size: Размер пакета вставки.
+    :param seed: Зерно генератора случайных чисел (для повторяемости).
+    :param progress: Необязательная функция ``progress(level, created)`` для вывода хода генерации.
+    :return: Количество созданных звеньев, продуктов и достигнутая глубина.
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    offset = (Node.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+    first_id = None
+    created = products = 0
+    # Звенья предыдущего уровня: (id, путь поддерева)
+    parents: list[tuple[int | None, str]] = [(None, "/")] * roots_for(nodes, depth, fanout)
+    level = 0
+    while created < nodes and level <= depth and parents:
+        per_parent = 1 if level == 0 else fanout
+        count = min(len(parents) * per_parent, nodes - created)
+        next_parents = []
+        for start in range(0, count, batch_size):
+            batch = []
+            for index in range(start, min(start + batch_size, count)):
+                supplier_id, path = parents[index // per_parent]
+                batch.append(_make_node(rng, offset + created, supplier_id, path, level))
+                created += 1
+            with transaction.atomic():
+                batch = Node.objects.bulk_create(batch)
+                NodeClosure.objects.attach(*batch)
+                products += _create_products(rng, batch, products_per_node)
+            first_id = first_id or batch[0].pk
+            next_parents += [(node.pk, node.subtree_path) for node in batch]
+        if progress:
+            progress(level, created)
+        parents = next_parents
+        level += 1
+
+    if first_id is not None:
+        Node.objects.filter(pk__gte=first_id).refresh_rollups()
+        invalidate_all()
+    return {"nodes": created, "products": products, "depth": level - 1}
+
+
+def _make_node(rng: random.Random, number: int, supplier_id, path: str, level: int) -> Node:
+    return Node(
+        name=f"Звено {number}",
+        email=f"node-{number}@bench.example",
+        phone=f"+999{number:013d}",
+        country=rng.choice(COUNTRIES),
+        city=rng.choice(CITIES),
+        street="Синтетическая",
+        building_number=str(rng.randint(1, 300)),
+        supplier_id=supplier_id,
+        debt_to_supplier=Decimal(rng.randint(0, 1_000_000)) / 100 if supplier_id else Decimal("0.00"),
+        level=level,
+        path=path,
+    )
+
+
+def _create_products(rng: random.Random, owners: list[Node], per_node: int) -> int:
+    if per_node <= 0:
+        return 0
+    today = date.today()
+    batch = [
+        Product(
+            name=f"Продукт {owner.pk}-{index}",
+            model=f"M-{rng.randint(1, 999)}",
+            release_date=today - timedelta(days=rng.randint(0, 3650)),
+            owner_id=owner.pk,
+        )
+        for owner in owners
+        for index in range(per_node)
+    ]
+    Product.objects.bulk_create(batch, batch_size=5000)
+    return len(batch)
@@ -1,15 +1,58 @@
+import json
+import logging
+import os
+import queue
+import sys
+import time
+import zlib
+from base64 import urlsafe_b64encode
 from datetime import date
+from decimal import Decimal
 
-from django.urls import reverse
+from django.contrib.auth.models import Group
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models.query import ValuesListIterable
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
 
 import pytest
+from asgiref.sync import async_to_sync
 from rest_framework import status
+from rest_framework.response import Response
 from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
 
-from supply.models import Node, Product
+from supply.benchmark import measure_serialization
+from supply.cache import ALL, NODES, ResponseCacheMixin, get_cache, get_versions, node_scope
+from supply.checks import (
+    LOCMEM_CACHE_BACKEND,
+    check_database_connections,
+    validate_cache_settings,
+    validate_database_settings,
+)
+from supply.db import estimated_count, pool_stats
+from supply.debt import clear_debt
+from supply.log_handlers import JSONFormatter, QueuedFileHandler
+from supply.models import DebtClearingAudit, Node, NodeClosure, Product
+from supply.routers import ReplicaPinningMiddleware, use_primary
+from supply.serializers import NodeSerializer
+from supply.synthetic import generate_network
+from supply.throttling import SlidingWindowThrottle, request_throttled, sliding_window_wait
 from user.models import User
 
 
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """
+    Очищает кэш ответов API перед каждым тестом.
+    """
+    get_cache().clear()
+
+
 @pytest.mark.django_db
 class TestNodeEndpoints:
     """
@@ -69,7 +112,7 @@ class TestNodeEndpoints:
         url = reverse("supply:node-list") + "?country=Россия"
         response = self.client.get(url)
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
+        assert len(response.data["results"]) == 1
 
     def test_retrieve_node(self):
         """
@@ -184,7 +227,7 @@ class TestProductEndpoints:
         url = reverse("supply:node-product-list", kwargs={"node_id": self.node.pk})
         response = self.client.get(url)
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
+        assert len(response.data["results"]) == 1
 
     def test_node_product_retrieve(self):
         """
@@ -222,3 +265,1725 @@ class TestProductEndpoints:
         response = self.client.delete(url)
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert not Product.objects.filter(pk=product.pk).exists()
+
+
+def make_node(name, supplier=None, **extra):
+    """
+    Создаёт звено сети с уникальными контактами, производными от названия.
+
+    :param name: Название звена.
+    :param supplier: Поставщик звена.
+    :param extra: Дополнительные поля модели.
+    :return: Созданное звено.
+    :rtype: supply.models.Node
+    """
+    suffix = zlib.crc32(name.encode()) % 10**9
+    defaults = {
+        "email": f"n{suffix}@example.com",
+        "phone": f"7{suffix:010d}",
+        "country": "KZ",
+        "city": "Алматы",
+        "street": "Абая",
+        "building_number": "1",
+    }
+    defaults.update(extra)
+    return Node.objects.create(name=name, supplier=supplier, **defaults)
+
+
+@pytest.mark.django_db
+class TestNodeHierarchy:
+    """
+    Тесты материализованной иерархии звеньев (поля ``level`` и ``path``).
+    """
+
+    def setup_method(self):
+        """
+        Подготовка цепочки завод → дистрибьютор → магазин → ИП.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.factory = make_node("Завод")
+        self.distributor = make_node("Дистрибьютор", supplier=self.factory)
+        self.shop = make_node("Магазин", supplier=self.distributor)
+        self.entrepreneur = make_node("ИП", supplier=self.shop)
+
+    def test_level_and_path_on_create(self):
+        """
+        Уровень и путь вычисляются при создании звена.
+        """
+        assert (self.factory.level, self.factory.path) == (0, "/")
+        assert self.distributor.level == 1
+        assert self.entrepreneur.level == 3
+        assert self.entrepreneur.path == f"/{self.factory.pk}/{self.distributor.pk}/{self.shop.pk}/"
+
+    def test_supplier_reassignment_moves_subtree(self):
+        """
+        Смена поставщика через API пересчитывает уровень и путь всего поддерева.
+        """
+        url = reverse("supply:node-update", args=[self.shop.pk])
+        response = self.client.patch(url, {"supplier": self.factory.pk})
+        assert response.status_code == status.HTTP_200_OK
+        self.shop.refresh_from_db()
+        self.entrepreneur.refresh_from_db()
+        assert self.shop.level == 1
+        assert self.entrepreneur.level == 2
+        assert self.entrepreneur.path == f"/{self.factory.pk}/{self.shop.pk}/"
+
+    def test_supplier_cycle_rejected(self):
+        """
+        Нельзя назначить поставщиком собственного клиента.
+        """
+        url = reverse("supply:node-update", args=[self.distributor.pk])
+        response = self.client.patch(url, {"supplier": self.entrepreneur.pk})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_supplier_delete_reroots_clients(self):
+        """
+        Удаление поставщика (``SET_NULL``) делает его клиентов корнями.
+        """
+        self.distributor.delete()
+        self.shop.refresh_from_db()
+        self.entrepreneur.refresh_from_db()
+        assert self.shop.supplier is None
+        assert (self.shop.level, self.shop.path) == (0, "/")
+        assert self.entrepreneur.level == 1
+        assert self.entrepreneur.path == f"/{self.shop.pk}/"
+
+    def test_rebuild_hierarchy(self):
+        """
+        Перестройка иерархии восстанавливает значения, записанные в обход ``save()``.
+        """
+        Node.objects.update(level=0, path="/")
+        assert Node.objects.rebuild_hierarchy() == 4
+        self.entrepreneur.refresh_from_db()
+        assert self.entrepreneur.level == 3
+
+    def test_list_filter_by_level_without_extra_queries(self, django_assert_max_num_queries):
+        """
+        Список с фильтром по уровню не делает запросов на каждую строку.
+        """
+        url = reverse("supply:node-list") + "?level=2"
+        with django_assert_max_num_queries(2):
+            response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["name"] for item in response.data["results"]] == ["Магазин"]
+
+
+@pytest.mark.django_db
+class TestNodeClosure:
+    """
+    Тесты таблицы замыканий и эндпоинтов поддерева/цепочки поставщиков.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка дерева: завод → (дистрибьютор → магазин → ИП, склад).
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.factory = make_node("Завод")
+        self.distributor = make_node("Дистрибьютор", supplier=self.factory)
+        self.warehouse = make_node("Склад", supplier=self.factory)
+        self.shop = make_node("Магазин", supplier=self.distributor)
+        self.entrepreneur = make_node("ИП", supplier=self.shop)
+
+    @staticmethod
+    def closure_snapshot():
+        """
+        Возвращает содержимое таблицы замыканий в виде множества троек.
+        """
+        return set(NodeClosure.objects.values_list("ancestor_id", "descendant_id", "depth"))
+
+    def test_descendants_endpoint(self, django_assert_num_queries):
+        """
+        Поддерево звена выбирается фиксированным числом запросов.
+        """
+        url = reverse("supply:node-descendants", args=[self.distributor.pk])
+        with django_assert_num_queries(2):
+            response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert {item["name"] for item in response.data["results"]} == {"Магазин", "ИП"}
+
+    def test_descendants_max_depth(self):
+        """
+        Параметр ``max_depth`` ограничивает глубину поддерева.
+        """
+        url = reverse("supply:node-descendants", args=[self.factory.pk]) + "?max_depth=1"
+        response = self.client.get(url)
+        assert {item["name"] for item in response.data["results"]} == {"Дистрибьютор", "Склад"}
+
+    def test_ancestors_endpoint(self):
+        """
+        Цепочка поставщиков возвращается от завода к ближайшему поставщику.
+        """
+        url = reverse("supply:node-ancestors", args=[self.entrepreneur.pk])
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["name"] for item in response.data] == ["Завод", "Дистрибьютор", "Магазин"]
+
+    def test_unknown_node_returns_404(self):
+        """
+        Для несуществующего звена возвращается 404.
+        """
+        response = self.client.get(reverse("supply:node-ancestors", args=[10**6]))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_closure_follows_move_and_delete(self):
+        """
+        После переноса и удаления звеньев таблица совпадает с перестроенной с нуля.
+        """
+        self.shop.supplier = self.warehouse
+        self.shop.save()
+        self.factory.delete()
+        actual = self.closure_snapshot()
+        NodeClosure.objects.rebuild()
+        assert actual == self.closure_snapshot()
+        assert (self.warehouse.pk, self.entrepreneur.pk, 2) in actual
+
+
+@pytest.fixture(params=["cte", "batched"])
+def hierarchy_strategy(request, monkeypatch):
+    """
+    Переключает вычисление иерархии между рекурсивным CTE и пакетным обходом.
+
+    SQLite понимает тот же ``WITH RECURSIVE``, поэтому CTE-ветку можно проверить без PostgreSQL.
+    """
+    vendors = frozenset({"sqlite", "postgresql"}) if request.param == "cte" else frozenset()
+    monkeypatch.setattr("supply.models.RECURSIVE_CTE_VENDORS", vendors)
+    return request.param
+
+
+@pytest.mark.django_db
+class TestNodeQuerySet:
+    """
+    Тесты операций над иерархией без денормализованных полей (CTE и пакетный обход).
+    """
+
+    def setup_method(self):
+        """
+        Подготовка дерева: завод → (дистрибьютор → магазин → ИП, склад) с долгами и продуктами.
+        """
+        self.factory = make_node("Завод")
+        self.distributor = make_node("Дистрибьютор", supplier=self.factory, debt_to_supplier="100.50")
+        self.warehouse = make_node("Склад", supplier=self.factory, debt_to_supplier="7.00")
+        self.shop = make_node("Магазин", supplier=self.distributor, debt_to_supplier="20.25")
+        self.entrepreneur = make_node("ИП", supplier=self.shop, debt_to_supplier="1.00")
+        for owner in (self.distributor, self.shop, self.shop):
+            Product.objects.create(name="P", model="M", release_date=date.today(), owner=owner)
+
+    def test_ancestors_and_descendants(self, hierarchy_strategy):
+        """
+        Цепочка поставщиков и поддерево совпадают для обеих стратегий.
+        """
+        ancestors = Node.objects.ancestors_of(self.entrepreneur.pk)
+        descendants = Node.objects.descendants_of(self.distributor.pk)
+        assert set(ancestors.values_list("name", flat=True)) == {"Завод", "Дистрибьютор", "Магазин"}
+        assert set(descendants.values_list("name", flat=True)) == {"Магазин", "ИП"}
+
+    def test_computed_levels_match_stored(self, hierarchy_strategy):
+        """
+        Вычисленные уровни совпадают с хранимыми.
+        """
+        levels = Node.objects.filter(country="KZ").computed_levels()
+        assert levels == dict(Node.objects.values_list("id", "level"))
+
+    def test_subtree_aggregates(self, hierarchy_strategy):
+        """
+        Сводные показатели поддерева считаются вместе с корнем.
+        """
+        totals = Node.objects.subtree_aggregates(self.distributor.pk)
+        assert totals == {"node_count": 3, "debt_total": Decimal("121.75"), "product_count": 3}
+
+    def test_rebuild_hierarchy(self, hierarchy_strategy):
+        """
+        Перестройка восстанавливает уровни и пути, затёртые в обход ``save()``.
+        """
+        expected = set(Node.objects.values_list("id", "level", "path"))
+        Node.objects.update(level=0, path="/")
+        assert Node.objects.rebuild_hierarchy() == 5
+        assert set(Node.objects.values_list("id", "level", "path")) == expected
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+    """
+    Тесты курсорной (keyset) пагинации списков звеньев и продуктов.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка 7 звеньев и 5 продуктов с одинаковыми названиями.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.nodes = [make_node(f"Узел {index}") for index in range(7)]
+        for _ in range(5):
+            Product.objects.create(name="Одинаковый", model="M", release_date=date.today(), owner=self.nodes[0])
+
+    def collect(self, url):
+        """
+        Проходит все страницы по ссылкам ``next`` и возвращает записи и число страниц.
+        """
+        items, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            items += response.data["results"]
+            url = response.data["next"]
+            pages += 1
+        return items, pages
+
+    def test_nodes_paginated_by_name(self):
+        """
+        Страницы по названию покрывают весь список без пропусков и повторов.
+        """
+        items, pages = self.collect(reverse("supply:node-list") + "?page_size=3")
+        assert [item["name"] for item in items] == sorted(node.name for node in self.nodes)
+        assert pages == 3
+
+    def test_nodes_paginated_by_created_at_desc(self):
+        """
+        Сортировка по убыванию времени создания с ключом ``(created_at, id)``.
+        """
+        items, _ = self.collect(reverse("supply:node-list") + "?page_size=2&ordering=-created_at")
+        assert [item["id"] for item in items] == [node.pk for node in reversed(self.nodes)]
+
+    def test_products_with_equal_names(self):
+        """
+        Записи с одинаковым значением поля сортировки различаются по ``id``.
+        """
+        items, _ = self.collect(reverse("supply:product-list") + "?page_size=2")
+        assert [item["id"] for item in items] == sorted(Product.objects.values_list("id", flat=True))
+
+    def test_previous_link(self):
+        """
+        Ссылка ``previous`` возвращает предыдущую страницу в прежнем порядке.
+        """
+        first = self.client.get(reverse("supply:node-list") + "?page_size=3").data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        assert back["results"] == first["results"]
+
+    def test_invalid_cursor(self):
+        """
+        Повреждённый курсор приводит к ответу 404.
+        """
+        response = self.client.get(reverse("supply:node-list") + "?cursor=not-a-cursor")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize(
+        "ordering, position",
+        [
+            ("name", ["Звено", "abc"]),
+            ("created_at", ["не дата", 1]),
+            ("subtree_debt", ["много", 1]),
+            ("name", [None, 1]),
+            ("name", ["Звено", {"id": 1}]),
+        ],
+    )
+    def test_tampered_cursor(self, ordering, position):
+        """
+        Курсор с подменёнными значениями ключа неверного типа приводит к ответу 404.
+        """
+        payload = json.dumps({"o": ordering, "r": 0, "p": position}).encode("utf-8")
+        cursor = urlsafe_b64encode(payload).decode("ascii")
+        response = self.client.get(reverse("supply:node-list"), {"cursor": cursor, "ordering": ordering})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestSupplyExport:
+    """
+    Тесты потоковой выгрузки звеньев и продуктов.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка цепочки из двух звеньев и одного продукта.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.factory = make_node("Завод")
+        self.shop = make_node("Магазин", supplier=self.factory, debt_to_supplier="15.10")
+        self.product = Product.objects.create(name="P1", model="M1", release_date=date(2025, 1, 2), owner=self.shop)
+
+    def test_nodes_ndjson(self):
+        """
+        NDJSON: одна строка на звено, с уровнем и поставщиком.
+        """
+        response = self.client.get(reverse("supply:node-export"))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "application/x-ndjson"
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        assert [(row["name"], row["level"], row["supplier"]) for row in rows] == [
+            ("Завод", 0, None),
+            ("Магазин", 1, self.factory.pk),
+        ]
+        assert rows[1]["debt_to_supplier"] == "15.10"
+
+    def test_products_json_array(self):
+        """
+        JSON: весь ответ — один корректный массив.
+        """
+        response = self.client.get(reverse("supply:product-export") + "?output=json")
+        rows = json.loads(b"".join(response.streaming_content))
+        assert rows == [
+            {"id": self.product.pk, "name": "P1", "model": "M1", "release_date": "2025-01-02", "owner": self.shop.pk}
+        ]
+
+    def test_streams_incrementally_under_asgi(self, settings, monkeypatch):
+        """
+        Под ASGI выгрузка асинхронная: первая строка уходит, когда прочитан только первый пакет курсора.
+        """
+        settings.SUPPLY_EXPORT_CHUNK_SIZE = 2
+        for index in range(5):
+            make_node(f"Клиент {index}", supplier=self.factory)
+        fetched = []
+        iterate = ValuesListIterable.__iter__
+
+        def counting_iter(iterable):
+            for row in iterate(iterable):
+                fetched.append(row)
+                yield row
+
+        monkeypatch.setattr(ValuesListIterable, "__iter__", counting_iter)
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+        async def export():
+            response = await AsyncClient().get(reverse("supply:node-export"), headers=headers)
+            parts = aiter(response)
+            first = await anext(parts)
+            fetched_before_first = len(fetched)
+            rest = [part async for part in parts]
+            return response, [first, *rest], fetched_before_first
+
+        response, parts, fetched_before_first = async_to_sync(export)()
+        assert response.is_async
+        assert fetched_before_first == 2
+        assert len(b"".join(parts).decode().splitlines()) == len(fetched) == 7
+
+    def test_unknown_output(self):
+        """
+        Неизвестный формат выгрузки отклоняется с кодом 400.
+        """
+        response = self.client.get(reverse("supply:node-export") + "?output=xml")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestBulkUpsert:
+    """
+    Тесты пакетного создания/обновления звеньев и продуктов.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка клиента и существующего завода.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.factory = make_node("Завод", email="factory@example.com")
+
+    @staticmethod
+    def node_item(name, **extra):
+        """
+        Возвращает корректную запись пакета звеньев.
+        """
+        suffix = zlib.crc32(name.encode()) % 10**9
+        item = {
+            "name": name,
+            "email": f"b{suffix}@example.com",
+            "phone": f"8{suffix:010d}",
+            "country": "KZ",
+            "city": "Астана",
+            "street": "Кенесары",
+            "building_number": "5",
+        }
+        item.update(extra)
+        return item
+
+    def test_bulk_nodes_per_item_results(self, django_assert_max_num_queries):
+        """
+        Пакет звеньев пишется фиксированным числом запросов и возвращает результат по каждой записи.
+        """
+        items = [self.node_item(f"Магазин {index}", supplier=self.factory.pk) for index in range(50)]
+        items.append(self.node_item("Дубликат", email="factory@example.com"))
+        items.append(self.node_item("Сирота", supplier=10**6))
+        items.append({"name": "Неполный"})
+        with django_assert_max_num_queries(12):
+            response = self.client.post(reverse("supply:node-bulk"), items, format="json")
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data["created"], response.data["errors"]) == (50, 3)
+        assert [result["status"] for result in response.data["results"][-3:]] == ["error"] * 3
+        assert "email" in response.data["results"][50]["errors"]
+        assert "supplier" in response.data["results"][51]["errors"]
+        shop = Node.objects.get(name="Магазин 7")
+        assert (shop.level, shop.path) == (1, f"/{self.factory.pk}/")
+        assert NodeClosure.objects.filter(ancestor=self.factory, depth=1).count() == 50
+
+    def test_bulk_nodes_upsert_by_name(self):
+        """
+        Запись с существующим названием обновляет звено, в том числе переносит его к другому поставщику.
+        """
+        shop = make_node("Магазин")
+        client_node = make_node("ИП", supplier=shop)
+        items = [self.node_item("Магазин", city="Караганда", supplier=self.factory.pk)]
+        response = self.client.post(reverse("supply:node-bulk"), items, format="json")
+        assert response.data["results"][0] == {"index": 0, "status": "updated", "id": shop.pk}
+        client_node.refresh_from_db()
+        assert client_node.level == 2
+        assert Node.objects.get(pk=shop.pk).city == "Караганда"
+
+    def test_bulk_nodes_rejects_supplier_swap(self):
+        """
+        Взаимный обмен поставщиками внутри пакета — ошибка записей, а не ответ 500; остальные записи сохраняются.
+        """
+        first, second, third = make_node("Первый"), make_node("Второй"), make_node("Третий")
+        items = [
+            self.node_item("Первый", supplier=second.pk),
+            self.node_item("Второй", supplier=first.pk),
+            self.node_item("Третий", supplier=self.factory.pk),
+        ]
+        response = self.client.post(reverse("supply:node-bulk"), items, format="json")
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data["results"]
+        assert [result["status"] for result in results] == ["error", "error", "updated"]
+        assert all("supplier" in result["errors"] for result in results[:2])
+        assert Node.objects.get(pk=first.pk).supplier_id is None
+        assert Node.objects.get(pk=third.pk).supplier_id == self.factory.pk
+
+    def test_bulk_nodes_rejects_cycle_through_batch(self):
+        """
+        Цикл, который замыкается только с учётом других переносов пакета, тоже отклоняется.
+        """
+        first, second = make_node("Первый"), make_node("Второй")
+        child = make_node("Клиент", supplier=first)
+        items = [self.node_item("Первый", supplier=second.pk), self.node_item("Второй", supplier=child.pk)]
+        response = self.client.post(reverse("supply:node-bulk"), items, format="json")
+        assert [result["status"] for result in response.data["results"]] == ["error", "error"]
+
+    def test_bulk_products(self):
+        """
+        Пакет продуктов создаёт новые записи и обновляет записи с ``id``.
+        """
+        product = Product.objects.create(name="Old", model="M", release_date=date.today(), owner=self.factory)
+        items = [
+            {"name": "P1", "model": "M1", "release_date": "2025-01-01", "owner": self.factory.pk},
+            {"id": product.pk, "name": "New", "model": "M", "release_date": "2025-01-01", "owner": self.factory.pk},
+            {"name": "P2", "model": "M2", "release_date": "2025-01-01", "owner": 10**6},
+        ]
+        response = self.client.post(reverse("supply:product-bulk"), items, format="json")
+        assert [result["status"] for result in response.data["results"]] == ["created", "updated", "error"]
+        product.refresh_from_db()
+        assert product.name == "New"
+
+    def test_bulk_nodes_conflict_with_concurrent_insert(self, monkeypatch):
+        """
+        Звено, созданное параллельным запросом после проверки пакета, даёт 409 без частичной записи.
+        """
+        in_bulk = Node.objects.in_bulk
+
+        def racing_in_bulk(*args, **kwargs):
+            found = in_bulk(*args, **kwargs)
+            make_node("Магазин")
+            return found
+
+        monkeypatch.setattr(Node.objects, "in_bulk", racing_in_bulk)
+        items = [self.node_item("Склад"), self.node_item("Магазин")]
+        response = self.client.post(reverse("supply:node-bulk"), items, format="json")
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data["detail"].code == "bulk_conflict"
+        assert not Node.objects.filter(name="Склад").exists()
+
+    def test_bulk_products_conflict_with_concurrent_delete(self, monkeypatch):
+        """
+        Продукт, удалённый параллельным запросом после проверки пакета, даёт 409.
+        """
+        product = Product.objects.create(name="Old", model="M", release_date=date.today(), owner=self.factory)
+        bulk_create = Product.objects.bulk_create
+
+        def racing_bulk_create(*args, **kwargs):
+            Product.objects.filter(pk=product.pk).delete()
+            return bulk_create(*args, **kwargs)
+
+        monkeypatch.setattr(Product.objects, "bulk_create", racing_bulk_create)
+        items = [
+            {"name": "P1", "model": "M1", "release_date": "2025-01-01", "owner": self.factory.pk},
+            {"id": product.pk, "name": "New", "model": "M", "release_date": "2025-01-01", "owner": self.factory.pk},
+        ]
+        response = self.client.post(reverse("supply:product-bulk"), items, format="json")
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not Product.objects.filter(name="P1").exists()
+
+    def test_bulk_rejects_non_array(self):
+        """
+        Тело запроса должно быть непустым массивом.
+        """
+        response = self.client.post(reverse("supply:product-bulk"), {"name": "P1"}, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestSubtreeRollups:
+    """
+    Тесты сводных показателей поддерева (долг, число звеньев и продуктов).
+    """
+
+    ROLLUPS = ("id", "subtree_debt", "subtree_node_count", "subtree_product_count")
+
+    def setup_method(self):
+        """
+        Подготовка цепочки завод -> дистрибьютор -> магазин и отдельного завода.
+        """
+        self.factory = make_node("Завод")
+        self.dealer = make_node("Дилер", supplier=self.factory, debt_to_supplier="100.00")
+        self.shop = make_node("Магазин", supplier=self.dealer, debt_to_supplier="25.50")
+        self.other = make_node("Другой завод")
+        Product.objects.create(name="P", model="M", release_date=date.today(), owner=self.shop)
+
+    def assert_consistent(self):
+        """
+        Инкрементально обновлённые значения совпадают с полным пересчётом.
+        """
+        stored = set(Node.objects.values_list(*self.ROLLUPS))
+        Node.objects.all().refresh_rollups()
+        assert stored == set(Node.objects.values_list(*self.ROLLUPS))
+
+    def test_create_and_products(self):
+        """
+        Новые звенья и продукты учитываются у всех предков.
+        """
+        factory = Node.objects.get(pk=self.factory.pk)
+        assert (factory.subtree_debt, factory.subtree_node_count, factory.subtree_product_count) == (
+            Decimal("125.50"),
+            3,
+            1,
+        )
+        self.assert_consistent()
+
+    def test_debt_change_and_move(self):
+        """
+        Изменение долга и перенос поддерева к другому поставщику.
+        """
+        self.shop.debt_to_supplier = Decimal("30.00")
+        self.shop.save()
+        self.dealer.supplier = self.other
+        self.dealer.save()
+        assert Node.objects.get(pk=self.factory.pk).subtree_node_count == 1
+        assert Node.objects.get(pk=self.other.pk).subtree_debt == Decimal("130.00")
+        self.assert_consistent()
+
+    def test_product_owner_change_and_delete(self):
+        """
+        Смена владельца продукта и удаление продуктов и звеньев.
+        """
+        product = Product.objects.get()
+        product.owner = self.other
+        product.save()
+        assert Node.objects.get(pk=self.other.pk).subtree_product_count == 1
+        self.assert_consistent()
+        product.delete()
+        self.dealer.delete()
+        assert Node.objects.get(pk=self.factory.pk).subtree_node_count == 1
+        self.assert_consistent()
+
+    def test_filter_and_ordering(self):
+        """
+        Список звеньев фильтруется и сортируется по сводным показателям.
+        """
+        client = APIClient()
+        client.force_authenticate(
+            user=User.objects.create_user(
+                email="user@example.com", password="secure1234", first_name="Имя", last_name="Ф", phone="70000000000"
+            )
+        )
+        url = reverse("supply:node-list")
+        response = client.get(url, {"subtree_node_count__gte": 2, "ordering": "-subtree_node_count", "page_size": 1})
+        assert [item["name"] for item in response.data["results"]] == ["Завод"]
+        response = client.get(response.data["next"])
+        assert [item["name"] for item in response.data["results"]] == ["Дилер"]
+        assert response.data["results"][0]["subtree_debt"] == "125.50"
+
+
+@pytest.mark.django_db
+class TestDebtClearing:
+    """
+    Тесты пакетной очистки задолженности с журналированием.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка завода и пяти клиентов: четырёх с задолженностью в KZ и одного в RU.
+        """
+        self.factory = make_node("Завод")
+        self.debtors = [
+            make_node(f"Клиент {index}", supplier=self.factory, debt_to_supplier=f"{index + 1}0.00")
+            for index in range(4)
+        ]
+        self.foreign = make_node("Клиент RU", supplier=self.factory, debt_to_supplier="7.00", country="RU")
+        make_node("Без долга", supplier=self.factory)
+
+    def test_clear_in_chunks_with_audit(self, django_assert_num_queries):
+        """
+        Каждый пакет обрабатывается фиксированным числом запросов, прежние значения попадают в журнал.
+        """
+        user = User.objects.create_user(
+            email="admin@example.com", password="secure1234", first_name="Имя", last_name="Ф", phone="70000000001"
+        )
+        # 2 пакета по 2 звена (savepoint + 4 запроса + предки для сброса кэша) и пустой выбор, завершающий цикл
+        with django_assert_num_queries(2 * 7 + 3):
+            result = clear_debt(Node.objects.filter(country="KZ"), user=user, chunk_size=2)
+        assert result.node_ids == [node.pk for node in self.debtors]
+        audit = DebtClearingAudit.objects.filter(batch=result.batch).order_by("node_id")
+        assert [(row.node_id, row.old_debt, row.cleared_by_id) for row in audit] == [
+            (node.pk, Decimal(f"{index + 1}0.00"), user.pk) for index, node in enumerate(self.debtors)
+        ]
+        factory = Node.objects.get(pk=self.factory.pk)
+        assert factory.subtree_debt == Decimal("7.00")
+        assert set(Node.objects.filter(debt_to_supplier__gt=0).values_list("pk", flat=True)) == {self.foreign.pk}
+
+    def test_rollups_of_nested_debtors(self):
+        """
+        Очищенный долг вычитается из сводных показателей всех предков, в том числе очищенных звеньев.
+        """
+        dealer = make_node("Дилер", supplier=self.debtors[0], debt_to_supplier="5.00")
+        make_node("Магазин", supplier=dealer, debt_to_supplier="3.00", country="RU")
+        clear_debt(Node.objects.filter(pk__in=[dealer.pk, self.debtors[0].pk]), chunk_size=1)
+        shifted = dict(Node.objects.values_list("pk", "subtree_debt"))
+        Node.objects.all().refresh_rollups()
+        assert shifted == dict(Node.objects.values_list("pk", "subtree_debt"))
+        assert shifted[self.debtors[0].pk] == Decimal("3.00")
+
+    def test_management_command(self):
+        """
+        Команда очищает задолженность по фильтру и требует явного фильтра или ``--all``.
+        """
+        call_command("clear_supply_debt", "--ids", str(self.foreign.pk))
+        assert Node.objects.get(pk=self.foreign.pk).debt_to_supplier == 0
+        assert DebtClearingAudit.objects.get().old_debt == Decimal("7.00")
+        with pytest.raises(CommandError):
+            call_command("clear_supply_debt")
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+    """
+    Тесты кэша ответов API и его сброса по сигналам моделей.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка цепочки завод -> дилер -> магазин с продуктом у магазина.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.factory = make_node("Завод")
+        self.dealer = make_node("Дилер", supplier=self.factory)
+        self.shop = make_node("Магазин", supplier=self.dealer)
+        self.product = Product.objects.create(name="P", model="M", release_date=date.today(), owner=self.shop)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return response
+
+    def test_view_without_scopes_is_not_cached(self):
+        """
+        Представление без объявленных областей отвечает без кэша; с ``cache_scopes`` — через кэш.
+        """
+
+        class PlainView(APIView):
+            authentication_classes, permission_classes = [], []
+
+            def get(self, request):
+                return Response({"ok": True})
+
+        class UncachedView(ResponseCacheMixin, PlainView):
+            pass
+
+        class CachedView(UncachedView):
+            cache_scopes = (NODES,)
+
+        request = RequestFactory().get("/")
+        response = UncachedView.as_view()(request)
+        assert response.status_code == status.HTTP_200_OK
+        assert "X-Cache" not in response and "ETag" not in response
+        assert [CachedView.as_view()(request)["X-Cache"] for _ in range(2)] == ["MISS", "HIT"]
+
+    def test_locmem_cache_rejected_for_several_workers(self):
+        """
+        Кэш в памяти процесса допустим только для одного процесса в режиме отладки.
+        """
+        aliases = {"SUPPLY_CACHE_ALIAS": "default"}
+        locmem = {"default": {"BACKEND": LOCMEM_CACHE_BACKEND}}
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        assert validate_cache_settings(locmem, aliases, debug=True, workers=1) == []
+        assert [m.id for m in validate_cache_settings(locmem, aliases, debug=True, workers=4)] == ["supply.E005"]
+        assert [m.id for m in validate_cache_settings(locmem, aliases, debug=False, workers=1)] == ["supply.E005"]
+        assert validate_cache_settings(redis, aliases, debug=False, workers=4) == []
+
+    def test_hit_ignores_param_order(self, django_assert_num_queries):
+        """
+        Повторный запрос с теми же параметрами в другом порядке обслуживается из кэша без запросов к БД.
+        """
+        url = reverse("supply:node-list")
+        assert self.get(url, country="KZ", page_size=2)["X-Cache"] == "MISS"
+        with django_assert_num_queries(0):
+            response = self.client.get(f"{url}?page_size=2&country=KZ")
+        assert response["X-Cache"] == "HIT"
+
+    def test_level_change_invalidates_clients(self):
+        """
+        Перенос дилера сбрасывает кэш карточек его клиентов (изменился уровень).
+        """
+        url = reverse("supply:node-detail", args=[self.shop.pk])
+        assert self.get(url).data["level"] == 2
+        unrelated = reverse("supply:node-detail", args=[make_node("Другой").pk])
+        self.get(unrelated)
+        self.dealer.supplier = None
+        self.dealer.save()
+        response = self.get(url)
+        assert (response["X-Cache"], response.data["level"]) == ("MISS", 1)
+        assert self.get(unrelated)["X-Cache"] == "HIT"
+
+    def test_product_change_invalidates_owner_products(self):
+        """
+        Изменение продукта сбрасывает списки продуктов владельца и сводные показатели в карточках предков.
+        """
+        products_url = reverse("supply:node-product-list", args=[self.shop.pk])
+        factory_url = reverse("supply:node-detail", args=[self.factory.pk])
+        self.get(products_url)
+        self.get(factory_url)
+        self.product.delete()
+        assert self.get(products_url).data["results"] == []
+        assert self.get(factory_url).data["subtree_product_count"] == 0
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    """
+    Тесты условных запросов (ETag / Last-Modified) к спискам и карточкам.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка звена с продуктом и авторизованного клиента.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.node = make_node("Завод")
+        self.product = Product.objects.create(name="P", model="M", release_date=date.today(), owner=self.node)
+
+    def test_if_none_match_returns_304_without_queries(self, django_assert_num_queries):
+        """
+        Совпадающий ``ETag`` даёт 304 без запросов к БД, изменение продукта — новый ``ETag``.
+        """
+        url = reverse("supply:product-list")
+        etag = self.client.get(url)["ETag"]
+        with django_assert_num_queries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not response.content
+        self.product.name = "P2"
+        self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    @staticmethod
+    def age_versions(scopes, seconds: int = 10):
+        """
+        Сдвигает время смены версий областей в прошлое.
+        """
+        versions = get_versions(scopes)
+        get_cache().set_many(
+            {
+                f"supply:version:{scope}": f"{version.partition(':')[0]}:{time.time() - seconds}"
+                for scope, version in zip(scopes, versions)
+            },
+            timeout=None,
+        )
+
+    def test_if_modified_since(self):
+        """
+        ``Last-Modified`` карточки — время смены её версий; запрос с ``If-Modified-Since`` даёт 304.
+        В секунду смены версии ``Last-Modified`` не отдаётся.
+        """
+        url = reverse("supply:node-detail", args=[self.node.pk])
+        assert "Last-Modified" not in self.client.get(url)
+        self.age_versions([ALL, node_scope(self.node.pk)])
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_modified_since_after_delete_from_list(self):
+        """
+        Удаление звена со страницы списка меняет ``Last-Modified``: прежний ``If-Modified-Since`` даёт 200.
+        """
+        store = make_node("Магазин", supplier=self.node)
+        url = reverse("supply:node-list")
+        self.age_versions([ALL, NODES])
+        last_modified = self.client.get(url)["Last-Modified"]
+        store.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == status.HTTP_200_OK
+        assert store.pk not in [item["id"] for item in response.data["results"]]
+
+    def test_rollup_change_updates_ancestor(self):
+        """
+        Изменение сводных показателей обновляет ``updated_at`` предка.
+        """
+        before = Node.objects.get(pk=self.node.pk).updated_at
+        make_node("Магазин", supplier=self.node)
+        assert Node.objects.get(pk=self.node.pk).updated_at > before
+
+
+@pytest.mark.django_db
+class TestRequestProfiling:
+    """
+    Тесты middleware профилирования запросов и бюджетов SQL-запросов.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка авторизованного клиента и двух звеньев.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.node = make_node("Завод")
+        make_node("Магазин", supplier=self.node)
+
+    def test_server_timing_header(self, settings):
+        """
+        Заголовок ``Server-Timing`` содержит время БД с количеством запросов, рендеринг и общее время.
+        """
+        settings.SUPPLY_SERVER_TIMING = True
+        response = self.client.get(reverse("supply:node-descendants", args=[self.node.pk]))
+        timing = response["Server-Timing"]
+        assert 'desc="2 queries"' in timing
+        assert all(f"{metric};dur=" in timing for metric in ("db", "serialize", "app", "total"))
+
+    def test_profiling_log_is_separate_from_audit_log(self):
+        """
+        Метрики запросов пишутся в свой файл и не попадают в журнал действий ``reports.log``.
+        """
+        profiling = logging.getLogger("supply.profiling")
+        assert not profiling.propagate
+        files = [handler.filename for handler in profiling.handlers if isinstance(handler, QueuedFileHandler)]
+        assert [os.path.basename(filename) for filename in files] == ["profiling.log"]
+
+    def test_budget_exceeded(self, settings, enforce_query_budgets):
+        """
+        Превышение бюджета маршрута фиксируется фикстурой ``enforce_query_budgets``.
+        """
+        settings.SUPPLY_QUERY_BUDGETS = {"supply:node-descendants": 1}
+        self.client.get(reverse("supply:node-descendants", args=[self.node.pk]))
+        assert enforce_query_budgets == [
+            f"GET /supply/nodes/{self.node.pk}/descendants/ (supply:node-descendants): 2 > 1"
+        ]
+        enforce_query_budgets.clear()
+
+
+@pytest.mark.django_db
+class TestSyntheticNetworkAndBenchmark:
+    """
+    Тесты генератора синтетической сети и нагрузочного прогона.
+    """
+
+    def test_generate_network(self):
+        """
+        Сеть заданного размера и ветвления согласована по уровням, замыканиям и сводным показателям.
+        """
+        result = generate_network(nodes=40, depth=2, fanout=3, products_per_node=2, batch_size=7, seed=1)
+        assert result == {"nodes": 40, "products": 80, "depth": 2}
+        assert Node.objects.filter(level=0).count() == 4
+        assert NodeClosure.objects.count() == sum(level + 1 for level in Node.objects.values_list("level", flat=True))
+        stored = set(Node.objects.values_list("id", "subtree_debt", "subtree_node_count", "subtree_product_count"))
+        Node.objects.all().refresh_rollups()
+        assert stored == set(
+            Node.objects.values_list("id", "subtree_debt", "subtree_node_count", "subtree_product_count")
+        )
+        assert generate_network(nodes=5, depth=1, fanout=4, seed=1)["nodes"] == 5
+
+    def test_benchmark_command(self, tmp_path):
+        """
+        Прогон в процессе сохраняет перцентили, RPS и количество SQL-запросов по сценариям в JSON.
+        """
+        User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        generate_network(nodes=20, depth=2, fanout=3, products_per_node=1, seed=2)
+        output = tmp_path / "run.json"
+        call_command("benchmark_supply_api", "--requests", "5", "--seed", "3", "--output", str(output))
+        results = json.loads(output.read_text(encoding="utf-8"))
+        assert set(results["scenarios"]) == {"list", "detail", "products", "create"}
+        for stats in results["scenarios"].values():
+            assert stats["errors"] == 0
+            assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+            assert stats["queries_max"] is not None
+
+
+@pytest.mark.django_db
+class TestAsyncReadViews:
+    """
+    Тесты async-представлений чтения (карточка звена, продукты звена, список продуктов) под ASGI.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка JWT-токена, звена с продуктом и асинхронного клиента.
+        """
+        user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client = AsyncClient()
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        self.node = make_node("Завод")
+        Product.objects.create(name="Станок", model="S-1", release_date=date(2024, 1, 1), owner=self.node)
+
+    def get(self, url, **headers):
+        return async_to_sync(self.client.get)(url, headers={**self.auth, **headers})
+
+    def test_views_are_async(self):
+        urls = [reverse(name, args=[self.node.pk]) for name in ("supply:node-detail", "supply:node-product-list")]
+        assert all(resolve(url).func.view_class.view_is_async for url in [*urls, reverse("supply:product-list")])
+
+    def test_responses_cache_and_etag(self, settings):
+        """
+        Async-представления отдают те же данные, кэшируют ответы и отвечают ``304`` на ``If-None-Match``.
+        """
+        settings.SUPPLY_SERVER_TIMING = True
+        response = self.get(reverse("supply:node-detail", args=[self.node.pk]))
+        assert response.status_code == 200
+        assert response.json()["subtree_product_count"] == 1
+        assert self.get(reverse("supply:node-detail", args=[self.node.pk]))["X-Cache"] == "HIT"
+        assert (
+            self.get(reverse("supply:node-detail", args=[self.node.pk]), if_none_match=response["ETag"]).status_code
+            == 304
+        )
+
+        products = self.get(reverse("supply:node-product-list", args=[self.node.pk]))
+        assert [item["name"] for item in products.json()["results"]] == ["Станок"]
+        # Пользователь по токену, проверка звена и страница: запросы из потоков sync_to_async тоже учтены
+        assert 'desc="3 queries"' in products["Server-Timing"]
+        assert (
+            self.get(reverse("supply:product-list") + f"?owner={self.node.pk}").json()["results"][0]["model"] == "S-1"
+        )
+
+    def test_errors(self):
+        """
+        Неизвестное звено — ``404``, запрос без токена — ``401``.
+        """
+        assert self.get(reverse("supply:node-detail", args=[0])).status_code == 404
+        assert self.get(reverse("supply:node-product-list", args=[0])).status_code == 404
+        assert async_to_sync(self.client.get)(reverse("supply:product-list")).status_code == 401
+
+
+class FakePool:
+    """
+    Пул с фиксированной статистикой в формате ``psycopg_pool.ConnectionPool.get_stats()``.
+    """
+
+    min_size, max_size = 2, 10
+
+    def get_stats(self):
+        return {"pool_min": 2, "pool_max": 10, "pool_size": 10, "pool_available": 1, "requests_waiting": 0}
+
+
+@pytest.mark.django_db
+class TestDatabaseConnections:
+    """
+    Тесты проверок настроек соединений с БД, метрик пула и эндпоинта состояния БД.
+    """
+
+    def test_validate_database_settings(self):
+        """
+        Пул с постоянными соединениями и перепутанными размерами — ошибки; PostgreSQL без
+        переиспользования соединений и постоянные соединения без проверок — предупреждения.
+        """
+        postgresql = {"ENGINE": "django.db.backends.postgresql", "CONN_HEALTH_CHECKS": True}
+        pooled = {**postgresql, "CONN_MAX_AGE": 60, "OPTIONS": {"pool": {"min_size": 5, "max_size": 2}}}
+        ids = {message.id for message in validate_database_settings("default", pooled)}
+        assert {"supply.E002", "supply.E003"} <= ids
+        assert [m.id for m in validate_database_settings("default", {**postgresql, "CONN_MAX_AGE": 0})] == [
+            "supply.W001"
+        ]
+        assert [
+            m.id
+            for m in validate_database_settings(
+                "default", {**postgresql, "CONN_MAX_AGE": None, "CONN_HEALTH_CHECKS": False}
+            )
+        ] == ["supply.W002"]
+        assert validate_database_settings("default", {**postgresql, "CONN_MAX_AGE": 60}) == []
+        assert check_database_connections(None, databases=["default"]) == []
+
+    def test_pool_metrics(self, monkeypatch):
+        """
+        Метрики пула попадают в эндпоинт состояния БД; 9 из 10 занятых соединений — насыщение.
+        """
+        assert pool_stats() is None
+        monkeypatch.setattr(connections["default"], "pool", FakePool(), raising=False)
+        stats = pool_stats()
+        assert (stats["in_use"], stats["saturation"], stats["saturated"]) == (9, 0.9, True)
+
+        client = APIClient()
+        user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        client.force_authenticate(user=user)
+        assert client.get(reverse("supply:health-db")).status_code == status.HTTP_403_FORBIDDEN
+        user.is_staff = True
+        user.save()
+        response = client.get(reverse("supply:health-db"))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["vendor"] == "sqlite"
+        assert response.data["pool"]["in_use"] == 9
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+    """
+    Тесты планов запросов: фильтры списков, админки и поиск ``icontains`` используют индексы.
+
+    Триграммные индексы есть только в PostgreSQL, поэтому их проверка выполняется только на нём.
+    """
+
+    def setup_method(self):
+        self.factory = make_node("Завод", country="KZ", city="Алматы")
+        Product.objects.create(name="Станок", model="S-1", release_date=date(2024, 1, 1), owner=self.factory)
+
+    def test_filter_indexes(self):
+        """
+        Фильтры по стране, городу и владельцу продукта идут по B-tree индексам.
+        """
+        plans = {
+            "supply_node_country_name_idx": Node.objects.filter(country="KZ").order_by("name", "id")[:51],
+            "supply_node_city_idx": Node.objects.filter(city="Алматы"),
+            "supply_product_owner_name_idx": Product.objects.filter(owner=self.factory).order_by("name", "id")[:51],
+        }
+        for index, queryset in plans.items():
+            assert index in queryset.explain(), index
+
+    def test_trigram_indexes(self):
+        """
+        Поиск админки ``icontains`` по звеньям и продуктам использует триграммные GIN-индексы.
+        """
+        if connection.vendor != "postgresql":
+            pytest.skip("Триграммные индексы создаются только в PostgreSQL.")
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plans = {
+            "supply_node_name_trgm": Node.objects.filter(name__icontains="вод"),
+            "supply_node_email_trgm": Node.objects.filter(email__icontains="example"),
+            "supply_node_phone_trgm": Node.objects.filter(phone__icontains="700"),
+            "supply_product_name_trgm": Product.objects.filter(name__icontains="ано"),
+            "supply_product_model_trgm": Product.objects.filter(model__icontains="s-1"),
+        }
+        for index, queryset in plans.items():
+            assert index in queryset.explain(), index
+
+
+@pytest.mark.django_db
+class TestSupplySearch:
+    """
+    Тесты поиска ``/supply/search/`` (на SQLite — упрощённый вариант с теми же весами полей).
+    """
+
+    def setup_method(self):
+        """
+        Подготовка авторизованного клиента, двух звеньев и продукта.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.factory = make_node("Завод Альфа", city="Алматы")
+        self.shop = make_node("Магазин Бета", supplier=self.factory, city="Астана")
+        self.product = Product.objects.create(
+            name="Бета-станок", model="X-200", release_date=date(2024, 1, 1), owner=self.factory
+        )
+
+    def search(self, **params):
+        return self.client.get(reverse("supply:search"), params)
+
+    def test_ranked_mixed_results_with_highlights(self):
+        """
+        Звено с совпадением в названии выше продукта с совпадением в названии (вес поля меньше).
+        """
+        response = self.search(q="Бета")
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data["results"]
+        assert [(item["type"], item["id"]) for item in results] == [
+            ("node", self.shop.pk),
+            ("product", self.product.pk),
+        ]
+        assert results[0]["rank"] > results[1]["rank"]
+        assert results[0]["highlights"]["name"] == "Магазин <mark>Бета</mark>"
+        assert results[1]["owner"] == self.factory.pk
+
+    def test_highlight_escapes_html(self):
+        """
+        Разметка в названии экранируется, в подсветке остаются только ``<mark>``.
+        """
+        make_node('<img src=x onerror="alert(1)"> Гамма', city="Алматы")
+        (result,) = self.search(q="Гамма").data["results"]
+        assert result["highlights"]["name"] == "&lt;img src=x onerror=&quot;alert(1)&quot;&gt; <mark>Гамма</mark>"
+        assert result["name"] == '<img src=x onerror="alert(1)"> Гамма'
+
+    def test_prefix_and_filters(self):
+        """
+        Слова ищутся как префиксы во всех полях; ``?type=`` и ``?limit=`` ограничивают результаты.
+        """
+        results = self.search(q="Алм").data["results"]
+        assert [item["id"] for item in results] == [self.factory.pk]
+        assert results[0]["highlights"]["city"] == "<mark>Алм</mark>аты"
+        assert [item["type"] for item in self.search(q="X-2").data["results"]] == ["product"]
+        assert self.search(q="Бета", type="product").data["results"][0]["id"] == self.product.pk
+        assert len(self.search(q="Бета", limit=1).data["results"]) == 1
+
+    def test_invalid_params(self):
+        for params in ({"q": " "}, {"q": "Бета", "limit": 0}, {"q": "Бета", "type": "user"}):
+            assert self.search(**params).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReplicaRouting:
+    """
+    Тесты маршрутизации чтения на реплики и закрепления клиента за основной базой после записи.
+
+    Реплика задаётся только в настройках: тесты проверяют выбор базы, запросы к ней не выполняются.
+    """
+
+    @pytest.fixture(autouse=True)
+    def replicas(self, settings):
+        settings.SUPPLY_DB_REPLICAS = ["replica"]
+
+    def test_router(self):
+        """
+        Чтение supply/user — с реплики; запись, блокировки, транзакции и ``use_primary`` — в основной базе.
+        """
+        assert Node.objects.all().db == User.objects.all().db == "replica"
+        assert Group.objects.all().db == "default"
+        assert Node.objects.select_for_update().db == "default"
+        with use_primary():
+            assert Node.objects.all().db == "default"
+        with transaction.atomic():
+            assert Node.objects.all().db == "default"
+
+    def test_client_pinned_after_write(self):
+        """
+        После успешной записи клиент читает из основной базы, другие клиенты и неуспешная запись — с реплики.
+        """
+        factory = RequestFactory()
+
+        def call(method, token, status_code=200):
+            seen = []
+
+            def view(request):
+                seen.append(Node.objects.all().db)
+                return HttpResponse(status=status_code)
+
+            ReplicaPinningMiddleware(view)(getattr(factory, method)("/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+            return seen[0]
+
+        assert call("get", "a") == "replica"
+        assert call("post", "a") == "default"
+        assert call("get", "a") == "default"
+        assert call("get", "b") == "replica"
+        assert call("post", "c", status_code=400) == "default"
+        assert call("get", "c") == "replica"
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+    """
+    Тесты выбора полей ответа ``?fields=``/``?exclude=`` и сокращения списка колонок запроса.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка авторизованного клиента, завода с клиентом и продукта.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.factory = make_node("Завод")
+        self.shop = make_node("Магазин", supplier=self.factory)
+        self.product = Product.objects.create(name="P", model="M", release_date=date.today(), owner=self.factory)
+
+    def get_with_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return response, " ".join(query["sql"] for query in queries.captured_queries if "supply_node" in query["sql"])
+
+    def test_fields_trim_payload_and_columns(self):
+        """
+        ``?fields=`` оставляет в ответе только выбранные поля и не читает из БД лишние колонки.
+        """
+        response, sql = self.get_with_queries(
+            reverse("supply:node-list"), fields="id,name,level", ordering="-created_at"
+        )
+        assert [set(item) for item in response.data["results"]] == [{"id", "name", "level"}] * 2
+        assert '"email"' not in sql and '"street"' not in sql
+        assert '"level"' in sql and '"created_at"' in sql
+        response, _ = self.get_with_queries(reverse("supply:node-detail", args=[self.shop.pk]), fields="supplier")
+        assert response.data == {"supplier": self.factory.pk}
+
+    def test_exclude(self):
+        """
+        ``?exclude=`` убирает поля из ответа, остальные поля на месте.
+        """
+        response = self.client.get(reverse("supply:product-list"), {"exclude": "release_date,model"})
+        item = response.data["results"][0]
+        assert "release_date" not in item and "model" not in item
+        assert item["name"] == "P" and item["owner"] == self.factory.pk
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse("supply:node-list"), {"fields": "id,password"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "password" in str(response.data["fields"])
+
+    def test_cached_separately(self):
+        """
+        Ответы с разным набором полей кэшируются раздельно.
+        """
+        url = reverse("supply:node-list")
+        assert set(self.client.get(url).data["results"][0]) > {"id", "name"}
+        assert set(self.client.get(url, {"fields": "id,name"}).data["results"][0]) == {"id", "name"}
+
+
+@pytest.mark.django_db
+class TestValuesSerialization:
+    """
+    Контракт быстрого пути сериализации списков: ответ побайтно совпадает с обычной сериализацией.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка цепочки звеньев с дробными долгами, Unicode-строками и продуктами.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.factory = make_node("Завод «Альфа»\u2028")
+        self.dealer = make_node("Дилер", supplier=self.factory, debt_to_supplier=Decimal("1234.5"))
+        self.shop = make_node("Магазин", supplier=self.dealer, debt_to_supplier=Decimal("0.07"))
+        for index in range(3):
+            Product.objects.create(
+                name=f"Товар {index}", model=f"M-{index}", release_date=date(2024, 2, index + 1), owner=self.shop
+            )
+
+    def render(self, url, params, fast: bool) -> bytes:
+        get_cache().clear()
+        with override_settings(SUPPLY_VALUES_SERIALIZATION=fast):
+            response = self.client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return response.content
+
+    @pytest.mark.parametrize(
+        "route, args, params",
+        [
+            ("supply:node-list", [], {}),
+            ("supply:node-list", [], {"ordering": "-created_at", "page_size": 2}),
+            ("supply:node-list", [], {"ordering": "-subtree_debt", "fields": "id,subtree_debt,created_at"}),
+            ("supply:product-list", [], {"page_size": 2}),
+            ("supply:product-list", [], {"exclude": "owner"}),
+        ],
+    )
+    def test_lists_byte_compatible(self, route, args, params):
+        url = reverse(route, args=args)
+        assert self.render(url, params, fast=True) == self.render(url, params, fast=False)
+
+    def test_hierarchy_and_node_products_byte_compatible(self):
+        for url in (
+            reverse("supply:node-descendants", args=[self.factory.pk]),
+            reverse("supply:node-ancestors", args=[self.shop.pk]),
+            reverse("supply:node-product-list", args=[self.shop.pk]),
+        ):
+            assert self.render(url, {}, fast=True) == self.render(url, {}, fast=False)
+
+    def test_values_rows_and_next_page(self, django_assert_num_queries):
+        """
+        Быстрый путь читает страницу одним запросом ``.values()``, курсор следующей страницы работает.
+        """
+        url = reverse("supply:product-list")
+        with django_assert_num_queries(1):
+            first = self.client.get(url, {"page_size": 2})
+        assert isinstance(first.renderer_context["view"].paginator.page[0], dict)
+        second = self.client.get(first.data["next"])
+        assert [item["name"] for item in first.data["results"] + second.data["results"]] == [
+            "Товар 0",
+            "Товар 1",
+            "Товар 2",
+        ]
+
+    def test_measure_serialization(self):
+        stats = measure_serialization(NodeSerializer, Node.objects.order_by("name", "id"), repeat=1)
+        assert stats["rows"] == 3 and stats["model_us_per_row"] > 0 and stats["speedup"] is not None
+
+
+@pytest.mark.django_db
+class TestNodeExpansion:
+    """
+    Тесты встраивания связей ``?expand=products,supplier,clients`` в списки и карточки звеньев.
+    """
+
+    def setup_method(self):
+        """
+        Подготовка завода с двумя дилерами, у каждого — клиент и продукты.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.factory = make_node("Завод")
+        self.dealers = [make_node(f"Дилер {index}", supplier=self.factory) for index in range(2)]
+        for dealer in self.dealers:
+            make_node(f"Магазин {dealer.name}", supplier=dealer)
+            for index in range(2):
+                Product.objects.create(
+                    name=f"{dealer.name} P{index}", model="M", release_date=date.today(), owner=dealer
+                )
+
+    def test_list_fixed_query_count(self, django_assert_num_queries):
+        """
+        Страница любого размера со всеми связями — три запроса: звенья с поставщиками, продукты, клиенты.
+        """
+        url = reverse("supply:node-list")
+        with django_assert_num_queries(3):
+            response = self.client.get(url, {"expand": "products,supplier,clients"})
+        assert response.status_code == status.HTTP_200_OK
+        dealer = next(item for item in response.data["results"] if item["id"] == self.dealers[0].pk)
+        assert dealer["supplier"]["name"] == "Завод"
+        assert [product["name"] for product in dealer["products"]] == ["Дилер 0 P0", "Дилер 0 P1"]
+        assert [client["name"] for client in dealer["clients"]] == ["Магазин Дилер 0"]
+        factory = next(item for item in response.data["results"] if item["id"] == self.factory.pk)
+        assert factory["supplier"] is None and len(factory["clients"]) == 2
+
+    def test_detail_with_sparse_fields(self, django_assert_num_queries):
+        url = reverse("supply:node-detail", args=[self.dealers[1].pk])
+        with django_assert_num_queries(2):
+            response = self.client.get(url, {"expand": "supplier,products", "fields": "id,name"})
+        assert response.status_code == status.HTTP_200_OK
+        assert list(response.data) == ["id", "name", "supplier", "products"]
+        assert response.data["supplier"]["id"] == self.factory.pk
+        assert len(response.data["products"]) == 2
+
+    def test_unknown_expansion(self):
+        response = self.client.get(reverse("supply:node-list"), {"expand": "debt_clearings"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "debt_clearings" in str(response.data["expand"])
+
+    def test_supplier_change_invalidates_expanded_detail(self):
+        """
+        Переименование поставщика сбрасывает кэш карточки клиента со встроенным поставщиком.
+        """
+        url = reverse("supply:node-detail", args=[self.dealers[0].pk])
+        assert self.client.get(url, {"expand": "supplier"}).data["supplier"]["name"] == "Завод"
+        self.factory.name = "Завод 2"
+        self.factory.save()
+        response = self.client.get(url, {"expand": "supplier"})
+        assert (response["X-Cache"], response.data["supplier"]["name"]) == ("MISS", "Завод 2")
+
+
+class TestQueuedFileHandler:
+    """
+    Тесты неблокирующего журнала: фоновая запись JSON, переполнение очереди и ротация.
+    """
+
+    def make_handler(self, tmp_path, **options):
+        handler = QueuedFileHandler(str(tmp_path / "reports.log"), flush_interval=0.01, **options)
+        handler.setFormatter(JSONFormatter())
+        return handler
+
+    @staticmethod
+    def record(message, *args, **extra):
+        return logging.makeLogRecord(
+            {"name": "supply.views", "levelname": "INFO", "levelno": 20, "msg": message, "args": args, **extra}
+        )
+
+    @staticmethod
+    def read(path):
+        return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+    def test_writes_json_records_in_background(self, tmp_path):
+        handler = self.make_handler(tmp_path)
+        handler.handle(self.record("Узел поставки создан: id=%s", 5, node_id=5))
+        try:
+            raise ValueError("сбой")
+        except ValueError:
+            handler.handle(logging.makeLogRecord({"msg": "Ошибка", "levelname": "ERROR", "exc_info": sys.exc_info()}))
+        handler.close()
+        first, second = self.read(tmp_path / "reports.log")
+        assert (first["message"], first["logger"], first["node_id"]) == (
+            "Узел поставки создан: id=5",
+            "supply.views",
+            5,
+        )
+        assert second["level"] == "ERROR" and "ValueError: сбой" in second["exception"]
+        assert handler.stats()["written"] == 2
+
+    @pytest.mark.parametrize(
+        "overflow, kept", [("drop_newest", ["a", "b"]), ("drop_oldest", ["b", "c"]), ("block", ["a", "b"])]
+    )
+    def test_overflow_policies(self, tmp_path, overflow, kept):
+        """
+        Переполненная очередь отбрасывает записи по политике и считает их; в журнал пишется предупреждение.
+        """
+        handler = self.make_handler(tmp_path, max_queue_size=2, overflow=overflow, block_timeout=0.01)
+        results = [handler.enqueue(self.record(message)) for message in "abc"]
+        assert results[:2] == [True, True] and results[2] is False
+        assert handler.stats()["dropped"] == 1
+        handler.close()
+        records = self.read(tmp_path / "reports.log")
+        assert [record["message"] for record in records[:2]] == kept
+        assert records[2]["level"] == "WARNING" and records[2]["dropped"] == 1
+
+    def test_drop_oldest_counts_each_lost_record_once(self, tmp_path, monkeypatch):
+        """
+        Если очередь опустошили и тут же снова заполнили между вытеснением и повторной вставкой,
+        потеряна одна новая запись, и она считается один раз.
+        """
+        handler = self.make_handler(tmp_path, max_queue_size=1, overflow="drop_oldest")
+        assert handler.enqueue(self.record("a"))
+
+        def drained(*args, **kwargs):
+            raise queue.Empty
+
+        monkeypatch.setattr(handler._queue, "get_nowait", drained)
+        assert handler.enqueue(self.record("b")) is False
+        assert handler.stats()["dropped"] == 1
+        monkeypatch.undo()
+        handler.close()
+
+    def test_rotation_by_size_and_time(self, tmp_path):
+        path = tmp_path / "reports.log"
+        handler = self.make_handler(tmp_path, max_bytes=400, backup_count=2, batch_size=1)
+        for index in range(12):
+            handler.enqueue(self.record(f"запись {index}"))
+        handler.close()
+        assert {file.name for file in tmp_path.glob("reports.log*")} - {"reports.log.lock"} == {
+            "reports.log",
+            "reports.log.1",
+            "reports.log.2",
+        }
+        assert handler.stats()["rotations"] > 2
+        assert self.read(path)[-1]["message"] == "запись 11"
+
+        handler = self.make_handler(tmp_path / "daily", rotate_interval=3600)
+        handler.enqueue(self.record("вчера"))
+        handler.close()
+        day_ago = time.time() - 24 * 60 * 60
+        os.utime(tmp_path / "daily" / "reports.log", (day_ago, day_ago))
+        handler.enqueue(self.record("сегодня"))
+        handler.close()
+        assert [record["message"] for record in self.read(tmp_path / "daily" / "reports.log.1")] == ["вчера"]
+        assert [record["message"] for record in self.read(tmp_path / "daily" / "reports.log")] == ["сегодня"]
+
+    def test_rotation_by_another_process(self, tmp_path):
+        """
+        Обработчик с открытым файлом, который ротировал другой процесс, пишет в новый файл, а не в ``reports.log.1``.
+        """
+        path = tmp_path / "reports.log"
+        rotating = self.make_handler(tmp_path, max_bytes=400, backup_count=10, batch_size=1)
+        other = self.make_handler(tmp_path, max_bytes=400, backup_count=10)
+        other.enqueue(self.record("другой воркер: до ротации"))
+        other._drain()
+        for index in range(8):
+            rotating.enqueue(self.record(f"запись {index}"))
+        rotating._drain()
+        assert rotating.stats()["rotations"]
+        other.enqueue(self.record("другой воркер: после ротации"))
+        other.close()
+        rotating.close()
+        assert other.stats()["rotations"] == 0
+        assert self.read(path)[-1]["message"] == "другой воркер: после ротации"
+        rotated = [record["message"] for file in tmp_path.glob("reports.log.[0-9]") for record in self.read(file)]
+        assert "другой воркер: после ротации" not in rotated
+        assert "другой воркер: до ротации" in rotated
+
+
+@pytest.mark.django_db
+class TestThrottling:
+    """
+    Набор тестов для ограничения частоты запросов скользящим окном.
+    """
+
+    @pytest.fixture(autouse=True)
+    def throttle_rates(self, settings, monkeypatch):
+        """
+        Лимиты 3 чтения и 2 записи в минуту; время окна управляется тестом.
+        """
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"read": "3/min", "write": "2/min", "auth": None},
+        }
+        self.now = 600.0
+        monkeypatch.setattr(SlidingWindowThrottle, "timer", lambda throttle: self.now)
+
+    def setup_method(self):
+        self.user = User.objects.create_user(
+            email="throttle@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="700"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("supply:node-list")
+
+    def test_read_limit_returns_429_with_retry_after(self):
+        signals = []
+
+        def collect(sender, signal, **kwargs):
+            signals.append(kwargs)
+
+        request_throttled.connect(collect)
+        try:
+            assert [self.client.get(self.url).status_code for _ in range(3)] == [200] * 3
+            response = self.client.get(self.url)
+        finally:
+            request_throttled.disconnect(collect)
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        # В следующем окне оценка 3 * (1 - доля) + 1 <= 3 при доле >= 1/3: 60 + 20 с
+        assert response["Retry-After"] == "80"
+        assert signals == [{"scope": "read", "ident": str(self.user.pk), "path": self.url, "wait": 80}]
+
+    def test_window_slides(self):
+        for _ in range(3):
+            self.client.get(self.url)
+        # Середина следующего окна: оценка 3 * 0.5 = 1.5, можно ещё один запрос
+        self.now += 90
+        assert self.client.get(self.url).status_code == status.HTTP_200_OK
+        response = self.client.get(self.url)
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        # 3 * (1 - доля) + 1 + 1 <= 3 при доле >= 2/3: через 10 с
+        assert response["Retry-After"] == "10"
+        self.now += 10
+        assert self.client.get(self.url).status_code == status.HTTP_200_OK
+
+    def test_groups_and_users_are_counted_separately(self):
+        for _ in range(3):
+            self.client.get(self.url)
+        assert self.client.get(self.url).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        response = self.client.post(reverse("supply:node-create"), {"name": "Завод", "country": "KZ", "city": "A"})
+        assert response.status_code != status.HTTP_429_TOO_MANY_REQUESTS
+        other = User.objects.create_user(
+            email="other@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="701"
+        )
+        self.client.force_authenticate(user=other)
+        assert self.client.get(self.url).status_code == status.HTTP_200_OK
+
+    def test_locmem_counters_rejected(self):
+        """
+        Счётчики в памяти процесса умножили бы лимит на количество воркеров: проверка их отклоняет.
+        """
+        caches_config = {
+            "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"},
+            "throttle": {"BACKEND": LOCMEM_CACHE_BACKEND},
+        }
+        messages = validate_cache_settings(
+            caches_config, {"API_THROTTLE_CACHE_ALIAS": "throttle"}, debug=False, workers=4
+        )
+        assert [message.id for message in messages] == ["supply.E005"]
+
+    def test_sliding_window_wait(self):
+        assert sliding_window_wait(previous=0, current=3, elapsed=0.0, limit=3, duration=60) == pytest.approx(80)
+        assert sliding_window_wait(previous=4, current=1, elapsed=0.5, limit=3, duration=60) == pytest.approx(15)
+
+
+@pytest.mark.django_db
+class TestAdminChangelists:
+    """
+    Набор тестов для списков администратора звеньев и продуктов.
+    """
+
+    def setup_method(self):
+        self.admin = User.objects.create_superuser(
+            email="root@example.com", password="secure1234", first_name="Имя", last_name="Ф", phone="70000000009"
+        )
+        self.client = APIClient()
+        self.client.force_login(self.admin)
+        self.factory = make_node("Завод")
+        self.url = reverse("admin:supply_node_changelist")
+
+    def changelist_queries(self, url) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            assert self.client.get(url).status_code == status.HTTP_200_OK
+        return len(queries)
+
+    def test_node_changelist_queries_do_not_grow_with_rows(self):
+        """
+        Поставщик выбирается JOIN-ом: число запросов не зависит от количества строк, ссылка ведёт на карточку звена.
+        """
+        make_node("Клиент 0", supplier=self.factory)
+        self.changelist_queries(self.url)  # прогрев кэша значений фильтров
+        few = self.changelist_queries(self.url)
+        for index in range(1, 6):
+            make_node(f"Клиент {index}", supplier=self.factory, city=f"Город {index}")
+        self.changelist_queries(self.url)
+        assert self.changelist_queries(self.url) == few
+        response = self.client.get(self.url)
+        assert reverse("admin:supply_node_change", args=[self.factory.pk]) in response.content.decode()
+
+    def test_product_changelist_selects_owner(self):
+        for index in range(3):
+            Product.objects.create(
+                name=f"Продукт {index}", model="M", release_date=date(2024, 1, 1), owner=self.factory
+            )
+        url = reverse("admin:supply_product_changelist")
+        self.changelist_queries(url)
+        few = self.changelist_queries(url)
+        owner = make_node("Другой владелец")
+        Product.objects.create(name="Продукт 3", model="M", release_date=date(2024, 1, 1), owner=owner)
+        self.changelist_queries(url)
+        assert self.changelist_queries(url) == few
+        # Фильтра по неограниченному множеству названий нет, названия ищутся поиском
+        assert "name__exact" not in self.client.get(url).content.decode()
+
+    def test_filter_values_are_cached_until_nodes_change(self):
+        self.changelist_queries(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        assert not [query for query in queries if "DISTINCT" in query["sql"]]
+        make_node("Клиент", supplier=self.factory, city="Шымкент")
+        assert "Шымкент" in self.client.get(self.url).content.decode()
+
+    def test_supplier_uses_autocomplete(self):
+        response = self.client.get(reverse("admin:supply_node_change", args=[self.factory.pk]))
+        assert "admin-autocomplete" in response.content.decode()
+
+    def test_estimated_count_falls_back_to_count(self):
+        make_node("Клиент", supplier=self.factory)
+        assert estimated_count(Node.objects.all(), threshold=0) == 2
+        assert estimated_count(Node.objects.filter(supplier=self.factory), threshold=0) == 1
@@ -0,0 +1,152 @@
+"""
+Ограничение частоты запросов к API.
+
+:class:`SlidingWindowThrottle` ограничивает запросы клиента в группе представлений:
+
+- ``read`` — безопасные методы (``GET``, ``HEAD``, ``OPTIONS``);
+- ``write`` — изменяющие методы;
+- ``auth`` — вход и регистрация (``throttle_scope = "auth"`` у представлений ``user``).
+
+Представление может задать свою группу атрибутом ``throttle_scope``. Лимиты групп берутся из
+``REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]`` (``"600/min"``, ``None`` — без лимита). Клиент —
+аутентифицированный пользователь, иначе IP-адрес.
+
+Алгоритм — скользящее окно со счётчиками: запросы считаются в текущем и предыдущем
+фиксированных окнах, оценка ``предыдущее * (1 - доля прошедшего окна) + текущее``
+не даёт клиенту удвоить лимит на стыке окон. Счётчики лежат в кэше
+``API_THROTTLE_CACHE_ALIAS`` (по умолчанию ``default`` — Redis из ``compose.yaml``), ``incr`` атомарен.
+Лимит общий для всех воркеров, только если кэш общий: с LocMemCache у каждого процесса свои
+счётчики и фактический лимит равен заданному, умноженному на ``WEB_WORKERS``. Поэтому системная
+проверка ``supply.E005`` (:mod:`supply.checks`) отклоняет LocMemCache для этого алиаса вне
+однопроцессного режима отладки.
+
+Отклонённый запрос получает ``429`` с заголовком ``Retry-After``, пишется в лог
+предупреждением со структурированными полями и отправляется сигналом :data:`request_throttled`.
+"""
+
+import logging
+import math
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.dispatch import Signal
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+logger = logging.getLogger(__name__)
+
+READ_SCOPE, WRITE_SCOPE, AUTH_SCOPE = "read", "write", "auth"
+
+# Отправляется с аргументами ``scope``, ``ident``, ``path`` и ``wait`` (секунды) при отклонении запроса
+request_throttled = Signal()
+
+
+def sliding_window_wait(previous: int, current: int, elapsed: float, limit: int, duration: int) -> float:
+    """
+    Время до момента, когда оценка скользящего окна позволит ещё один запрос.
+
+    :param previous: Запросов в предыдущем окне.
+    :param current: Запросов в текущем окне.
+    :param elapsed: Доля прошедшего текущего окна (от 0 до 1).
+    :param limit: Лимит запросов на окно.
+    :param duration: Длина окна, секунды.
+    :rtype: float
+    """
+    if current < limit:
+        # Успеет «выветриться» часть предыдущего окна
+        return max(0.0, 1 - elapsed - (limit - 1 - current) / previous) * duration
+    # Нужно дождаться следующего окна, где текущее станет предыдущим
+    return (1 - elapsed + 1 - (limit - 1) / current) * duration
+
+
+class SlidingWindowThrottle(ScopedRateThrottle):
+    """
+    Лимит запросов клиента в группе представлений по скользящему окну.
+    """
+
+    cache_format = "api:throttle:%(scope)s:%(ident)s"
+
+    @property
+    def cache(self):
+        return caches[settings.API_THROTTLE_CACHE_ALIAS]
+
+    def get_scope(self, request, view) -> str:
+        """
+        Группа представления: ``throttle_scope`` или ``read``/``write`` по методу запроса.
+
+        :rtype: str
+        """
+        scope = getattr(view, self.scope_attr, None)
+        if scope:
+            return scope
+        return READ_SCOPE if request.method in SAFE_METHODS else WRITE_SCOPE
+
+    def get_rate(self):
+        # Настройки читаются при каждом запросе: override_settings в тестах и перезагрузка api_settings работают
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        if self.scope not in rates:
+            raise ImproperlyConfigured(f"Не задан лимит запросов для группы '{self.scope}'.")
+        return rates[self.scope]
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        now = self.timer()
+        window = int(now // self.duration)
+        elapsed = now / self.duration - window
+        current_key, previous_key = f"{self.key}:{window}", f"{self.key}:{window - 1}"
+        counts = self.cache.get_many([previous_key, current_key])
+        previous, current = counts.get(previous_key, 0), counts.get(current_key, 0)
+        # Вклад предыдущего окна; округление убирает погрешность float на границе Retry-After
+        carried = round(previous * (1 - elapsed), 6)
+
+        if carried + current + 1 > self.num_requests:
+            return self.throttle_failure(request, previous, current, elapsed)
+        current = self.increment(current_key)
+        if carried + current > self.num_requests:
+            # Другой воркер успел занять последний запрос окна
+            return self.throttle_failure(request, previous, current, elapsed)
+        return True
+
+    def increment(self, key: str) -> int:
+        """
+        Атомарно увеличивает счётчик окна; счётчик живёт два окна.
+
+        :rtype: int
+        """
+        self.cache.add(key, 0, timeout=self.duration * 2)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Ключ истёк между add и incr
+            self.cache.set(key, 1, timeout=self.duration * 2)
+            return 1
+
+    def throttle_failure(self, request, previous: int = 0, current: int = 0, elapsed: float = 0.0):
+        wait = sliding_window_wait(previous, current, elapsed, self.num_requests, self.duration)
+        self.retry_after = max(1, math.ceil(round(wait, 6)))
+        ident = self.key.rsplit(":", 1)[-1]
+        logger.warning(
+            "Превышен лимит запросов группы %s (%s): %s %s, повтор через %s с",
+            self.scope,
+            self.rate,
+            request.method,
+            request.path,
+            self.retry_after,
+            extra={"throttle_scope": self.scope, "throttle_ident": ident, "retry_after": self.retry_after},
+        )
+        request_throttled.send(
+            sender=self.__class__, scope=self.scope, ident=ident, path=request.path, wait=self.retry_after
+        )
+        return False
+
+    def wait(self):
+        return getattr(self, "retry_after", None)
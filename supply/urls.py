@@ -2,18 +2,26 @@ from django.urls import path
 
 from supply.apps import SupplyConfig
 from supply.views import (
+    DatabaseHealthAPIView,
+    NodeAncestorListAPIView,
+    NodeBulkUpsertAPIView,
     NodeCreateAPIView,
+    NodeDescendantListAPIView,
     NodeDestroyAPIView,
+    NodeExportAPIView,
     NodeListAPIView,
     NodeProductListAPIView,
     NodeProductRetrieveAPIView,
     NodeRetrieveAPIView,
     NodeUpdateAPIView,
+    ProductBulkUpsertAPIView,
     ProductCreateAPI,
     ProductDestroyAPIView,
+    ProductExportAPIView,
     ProductListAPI,
     ProductRetrieveAPIView,
     ProductUpdateAPIView,
+    SupplySearchAPIView,
 )
 
 app_name = SupplyConfig.name
@@ -21,12 +29,16 @@ app_name = SupplyConfig.name
 urlpatterns = [
     path("nodes/", NodeListAPIView.as_view(), name="node-list"),
     path("nodes/create/", NodeCreateAPIView.as_view(), name="node-create"),
+    path("nodes/bulk/", NodeBulkUpsertAPIView.as_view(), name="node-bulk"),
     path("nodes/<int:pk>/", NodeRetrieveAPIView.as_view(), name="node-detail"),
     path("nodes/<int:pk>/update/", NodeUpdateAPIView.as_view(), name="node-update"),
     path("nodes/<int:pk>/delete/", NodeDestroyAPIView.as_view(), name="node-delete"),
+    path("nodes/<int:pk>/descendants/", NodeDescendantListAPIView.as_view(), name="node-descendants"),
+    path("nodes/<int:pk>/ancestors/", NodeAncestorListAPIView.as_view(), name="node-ancestors"),
     #
     path("products/", ProductListAPI.as_view(), name="product-list"),
     path("products/create/", ProductCreateAPI.as_view(), name="product-create"),
+    path("products/bulk/", ProductBulkUpsertAPIView.as_view(), name="product-bulk"),
     path("products/<int:pk>/", ProductRetrieveAPIView.as_view(), name="product-detail"),
     path("products/<int:pk>/update/", ProductUpdateAPIView.as_view(), name="product-update"),
     path("products/<int:pk>/delete/", ProductDestroyAPIView.as_view(), name="product-delete"),
@@ -37,4 +49,10 @@ urlpatterns = [
         NodeProductRetrieveAPIView.as_view(),
         name="node-product-detail",
     ),
+    #
+    path("export/nodes/", NodeExportAPIView.as_view(), name="node-export"),
+    path("export/products/", ProductExportAPIView.as_view(), name="product-export"),
+    #
+    path("search/", SupplySearchAPIView.as_view(), name="search"),
+    path("health/db/", DatabaseHealthAPIView.as_view(), name="health-db"),
 ]
@@ -6,15 +6,30 @@
 :mod:`rest_framework.generics` для выполнения операций CRUD
 (Create, Retrieve, Update, Delete) над моделью :class:`supply.models.Node`.
 """
+
 import logging
+from collections import Counter
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics
-from rest_framework.exceptions import NotFound
-from rest_framework.permissions import IsAuthenticated
-
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from supply.bulk import CREATED, ERROR, UPDATED, bulk_upsert_nodes, bulk_upsert_products
+from supply.cache import NODES, PRODUCTS, AsyncResponseCacheMixin, ResponseCacheMixin, node_products_scope, node_scope
+from supply.db import database_status
+from supply.export import EXPORT_FORMATS, export_nodes, export_products
+from supply.generics import AsyncListAPIView, AsyncRetrieveAPIView, SparseQuerysetMixin, ValuesQuerysetMixin
 from supply.models import Node, Product
-from supply.serializers import NodeSerializer, ProductSerializer
+from supply.pagination import NodeCursorPagination, ProductCursorPagination
+from supply.search import SEARCH_SPECS, search, search_limit
+from supply.serializers import NodeSerializer, ProductSerializer, parse_field_names
 
 logger = logging.getLogger(__name__)
 
@@ -39,43 +54,138 @@ class NodeCreateAPIView(generics.CreateAPIView):
         logger.info("Узел поставки создан: id=%s name='%s'", instance.id, instance.name)
 
 
+# -- BULK CREATE/UPSERT
+class BulkUpsertAPIView(APIView):
+    """
+    Базовое представление пакетного создания/обновления.
+
+    Принимает POST с JSON-массивом записей и возвращает результат для каждой записи::
+
+        {"created": 2, "updated": 1, "errors": 1,
+         "results": [{"index": 0, "status": "created", "id": 15}, ...]}
+
+    Корректные записи сохраняются в одной транзакции, ошибочные пропускаются
+    и возвращаются со статусом ``error`` и описанием ошибок. Если после проверки
+    пакета данные изменил параллельный запрос, пакет не сохраняется и возвращается ``409``.
+
+    Требует аутентификации пользователя.
+    """
+
+    permission_classes = [IsAuthenticated]
+    upsert = None
+    entity = ""
+
+    def post(self, request, *args, **kwargs):
+        results = self.upsert(request.data)
+        statuses = Counter(result["status"] for result in results)
+        summary = {"created": statuses[CREATED], "updated": statuses[UPDATED], "errors": statuses[ERROR]}
+        logger.info(
+            "Пакетная загрузка (%s): создано=%s обновлено=%s ошибок=%s",
+            self.entity,
+            summary["created"],
+            summary["updated"],
+            summary["errors"],
+        )
+        return Response({**summary, "results": results})
+
+
+class NodeBulkUpsertAPIView(BulkUpsertAPIView):
+    """
+    Пакетное создание/обновление звеньев сети по адресу ``/supply/nodes/bulk/``.
+
+    Ключ upsert — ``name``: существующее звено с таким названием обновляется.
+    Поставщик указывается идентификатором уже существующего звена.
+    """
+
+    upsert = staticmethod(bulk_upsert_nodes)
+    entity = "узлы поставки"
+
+
+class ProductBulkUpsertAPIView(BulkUpsertAPIView):
+    """
+    Пакетное создание/обновление продуктов по адресу ``/supply/products/bulk/``.
+
+    Запись с ``id`` обновляет существующий продукт, без ``id`` — создаёт новый.
+    """
+
+    upsert = staticmethod(bulk_upsert_products)
+    entity = "продукты"
+
+
 # -- LIST с фильтрацией по стране
-class NodeListAPIView(generics.ListAPIView):
+class NodeListAPIView(ResponseCacheMixin, ValuesQuerysetMixin, generics.ListAPIView):
     """
     Представление для получения списка объектов сети (Node).
 
     Обрабатывает GET-запросы для получения списка экземпляров :class:`supply.models.Node`.
     Наследуется от :class:`rest_framework.generics.ListAPIView`.
 
-    Поддерживает фильтрацию по полю ``country``.
+    Поддерживает фильтрацию по полям ``country`` и ``level``, а также по сводным показателям
+    поддерева: ``?subtree_debt__gte=``, ``?subtree_node_count__lte=``, ``?subtree_product_count__gte=`` и т.п.
     Клиент отправляет GET-запрос на эндпоинт ``/supply/nodes/?country=KZ``,
     получает в ответ список узлов сети в Казахстане.
+    Уровень и сводные показатели хранятся в таблице, поэтому список не делает
+    дополнительных запросов на каждую строку.
+
+    Список разбит на страницы курсорами (keyset): ``?ordering=name`` (по умолчанию),
+    ``created_at``, ``subtree_debt``, ``subtree_node_count`` или ``subtree_product_count``
+    (с префиксом ``-`` — по убыванию), размер страницы — ``?page_size=``.
+
+    Параметр ``?expand=products,supplier,clients`` встраивает в каждое звено карточку поставщика,
+    продукты и клиентов; связи подгружаются фиксированным числом запросов независимо от размера страницы.
+
+    Ответ кэшируется по URL с параметрами и сбрасывается при любом изменении звеньев или продуктов.
 
     Требует аутентификации пользователя.
     """
 
-    queryset = Node.objects.all()
     serializer_class = NodeSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NodeCursorPagination
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ["country"]
+    filterset_fields = {
+        "country": ["exact"],
+        "level": ["exact"],
+        "subtree_debt": ["gte", "lte"],
+        "subtree_node_count": ["gte", "lte"],
+        "subtree_product_count": ["gte", "lte"],
+    }
+    cache_scopes = (NODES,)
+
+    def get_queryset(self):
+        return Node.objects.with_expansions(parse_field_names(self.request.query_params.get("expand")))
 
 
 # -- RETRIEVE
-class NodeRetrieveAPIView(generics.RetrieveAPIView):
+class NodeRetrieveAPIView(AsyncResponseCacheMixin, SparseQuerysetMixin, AsyncRetrieveAPIView):
     """
     Представление для получения одного объекта сети (Node).
 
     Обрабатывает GET-запросы для получения одного экземпляра :class:`supply.models.Node` по его ``pk``.
-    Наследуется от :class:`rest_framework.generics.RetrieveAPIView`.
+    Наследуется от :class:`supply.generics.AsyncRetrieveAPIView`: звено читается через async ORM.
+
+    Параметр ``?expand=products,supplier,clients`` встраивает карточку поставщика, продукты
+    и клиентов звена: экран звена загружается одним запросом к API.
+
+    Ответ кэшируется и сбрасывается при изменении звена, его поддерева или цепочки поставщиков
+    (со встроенным поставщиком — при любом изменении звеньев).
 
     Требует аутентификации пользователя.
     """
 
-    queryset = Node.objects.all()
     serializer_class = NodeSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_expand_names(self) -> list[str]:
+        return parse_field_names(self.request.query_params.get("expand"))
+
+    def get_queryset(self):
+        return Node.objects.with_expansions(self.get_expand_names())
+
+    def get_cache_scopes(self):
+        # Изменение поставщика сбрасывает карточки его предков, но не клиентов
+        return [node_scope(self.kwargs["pk"]), *([NODES] if "supplier" in self.get_expand_names() else [])]
+
 
 # -- UPDATE (с запретом на обновление поля 'debt_to_supplier')
 class NodeUpdateAPIView(generics.UpdateAPIView):
@@ -133,6 +243,74 @@ class NodeDestroyAPIView(generics.DestroyAPIView):
         super().perform_destroy(instance)
 
 
+# -- HIERARCHY (по таблице замыканий)
+class NodeDescendantListAPIView(ValuesQuerysetMixin, generics.ListAPIView):
+    """
+    Представление для получения всех звеньев ниже по цепочке поставок.
+
+    Обрабатывает GET-запросы по адресу ``/supply/nodes/{id}/descendants/``.
+    Возвращает всех прямых и косвенных клиентов звена одним запросом к
+    таблице замыканий :class:`supply.models.NodeClosure`, независимо от
+    глубины и ширины поддерева. Параметр ``?max_depth=N`` ограничивает глубину.
+
+    Требует аутентификации пользователя.
+
+    :raises NotFound: Если узел с переданным ``pk`` не найден.
+    """
+
+    serializer_class = NodeSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = NodeCursorPagination
+
+    def get_queryset(self):
+        """
+        Получает поддерево звена без самого звена.
+
+        :return: Потомки звена.
+        """
+        node_id = self.kwargs.get("pk")
+        if not Node.objects.filter(pk=node_id).exists():
+            raise NotFound(f"Узел с id={node_id} не найден.")
+        links = {"ancestor_links__ancestor_id": node_id, "ancestor_links__depth__gt": 0}
+        max_depth = self.request.query_params.get("max_depth")
+        if max_depth is not None:
+            if not max_depth.isdigit():
+                raise ValidationError({"max_depth": "Ожидается неотрицательное целое число."})
+            links["ancestor_links__depth__lte"] = int(max_depth)
+        return Node.objects.filter(**links)
+
+
+class NodeAncestorListAPIView(ValuesQuerysetMixin, generics.ListAPIView):
+    """
+    Представление для получения цепочки поставщиков звена.
+
+    Обрабатывает GET-запросы по адресу ``/supply/nodes/{id}/ancestors/``.
+    Возвращает всех поставщиков звена от завода (уровень 0) до ближайшего
+    поставщика одним запросом к таблице замыканий :class:`supply.models.NodeClosure`.
+
+    Требует аутентификации пользователя.
+
+    :raises NotFound: Если узел с переданным ``pk`` не найден.
+    """
+
+    serializer_class = NodeSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = None  # цепочка ограничена глубиной иерархии и упорядочена по уровню
+
+    def get_queryset(self):
+        """
+        Получает цепочку поставщиков звена, начиная с завода.
+
+        :return: Предки звена, упорядоченные по уровню.
+        """
+        node_id = self.kwargs.get("pk")
+        if not Node.objects.filter(pk=node_id).exists():
+            raise NotFound(f"Узел с id={node_id} не найден.")
+        return Node.objects.filter(descendant_links__descendant_id=node_id, descendant_links__depth__gt=0).order_by(
+            "level"
+        )
+
+
 class ProductCreateAPI(generics.CreateAPIView):
     """
     Представление для создания нового продукта.
@@ -152,14 +330,16 @@ class ProductCreateAPI(generics.CreateAPIView):
         logger.info("Продукт создан: id=%s name='%s'", instance.id, instance.name)
 
 
-class ProductListAPI(generics.ListAPIView):
+class ProductListAPI(AsyncResponseCacheMixin, ValuesQuerysetMixin, AsyncListAPIView):
     """
     Представление для получения списка всех продуктов.
 
     Обрабатывает GET-запросы для получения списка экземпляров :class:`supply.models.Product`.
     Поддерживает фильтрацию по полю ``owner`` (узел-владелец).
+    Список разбит на страницы курсорами (keyset) по ключу ``(name, id)``.
+    Ответ кэшируется и сбрасывается при любом изменении продуктов.
 
-    Наследуется от :class:`rest_framework.generics.ListAPIView`.
+    Наследуется от :class:`supply.generics.AsyncListAPIView`: страница читается через async ORM.
 
     Требует аутентификации пользователя.
     """
@@ -167,11 +347,13 @@ class ProductListAPI(generics.ListAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ProductCursorPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["owner"]
+    cache_scopes = (PRODUCTS,)
 
 
-class ProductRetrieveAPIView(generics.RetrieveAPIView):
+class ProductRetrieveAPIView(SparseQuerysetMixin, generics.RetrieveAPIView):
     """
     Представление для получения одного продукта.
 
@@ -224,14 +406,15 @@ class ProductDestroyAPIView(generics.DestroyAPIView):
         super().perform_destroy(instance)
 
 
-class NodeProductListAPIView(generics.ListAPIView):
+class NodeProductListAPIView(AsyncResponseCacheMixin, ValuesQuerysetMixin, AsyncListAPIView):
     """
     Представление для получения списка продуктов, принадлежащих конкретному объекту сети сети.
 
     Обрабатывает GET-запросы по адресу ``/supply/nodes/{node_id}/products/``.
     Возвращает список всех продуктов, у которых поле ``owner`` соответствует переданному ``node_id``.
+    Ответ кэшируется и сбрасывается при изменении продуктов этого звена.
 
-    Наследуется от :class:`rest_framework.generics.ListAPIView`.
+    Наследуется от :class:`supply.generics.AsyncListAPIView`: страница читается через async ORM.
 
     Требует аутентификации пользователя.
 
@@ -242,16 +425,23 @@ class NodeProductListAPIView(generics.ListAPIView):
 
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ProductCursorPagination
+
+    def get_cache_scopes(self):
+        return [node_products_scope(self.kwargs.get("node_id"))]
 
     def get_queryset(self):
+        return Product.objects.filter(owner_id=self.kwargs.get("node_id"))
+
+    async def aget_queryset(self):
         """
         Получает список продуктов, принадлежащих указанному объекту сети.
         :return: Список продуктов.
         """
         node_id = self.kwargs.get("node_id")
-        if not Node.objects.filter(pk=node_id).exists():
+        if not await Node.objects.filter(pk=node_id).aexists():
             raise NotFound(f"Узел с id={node_id} не найден.")
-        return Product.objects.filter(owner_id=node_id)
+        return self.get_queryset()
 
 
 class NodeProductRetrieveAPIView(generics.RetrieveAPIView):
@@ -290,3 +480,117 @@ class NodeProductRetrieveAPIView(generics.RetrieveAPIView):
             return Product.objects.get(pk=product_id, owner_id=node_id)
         except Product.DoesNotExist:
             raise NotFound(f"Продукт с id={product_id} у узла id={node_id} не найден.")
+
+
+# -- EXPORT (потоковая выгрузка)
+class SupplyExportAPIView(APIView):
+    """
+    Базовое представление потоковой выгрузки таблицы.
+
+    Отдаёт :class:`django.http.StreamingHttpResponse`, который читает таблицу серверным
+    курсором пакетами по ``SUPPLY_EXPORT_CHUNK_SIZE`` строк, поэтому память воркера
+    не растёт вместе с таблицей. Под ASGI ответ строится из асинхронного генератора:
+    синхронный Django собрал бы в памяти целиком до отправки первого байта. Формат
+    выбирается параметром ``?output=ndjson`` (по умолчанию) или ``?output=json``.
+
+    Требует аутентификации пользователя.
+    """
+
+    permission_classes = [IsAuthenticated]
+    exporter = None
+    filename = "export"
+
+    def get(self, request, *args, **kwargs):
+        """
+        Возвращает потоковый ответ с выгрузкой.
+
+        :raises ValidationError: Если запрошен неизвестный формат.
+        """
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({"output": f"Допустимые форматы: {', '.join(EXPORT_FORMATS)}."})
+        asynchronous = isinstance(request._request, ASGIRequest)
+        response = StreamingHttpResponse(
+            self.exporter(output, asynchronous=asynchronous), content_type=EXPORT_FORMATS[output]
+        )
+        response["Content-Disposition"] = f'attachment; filename="{self.filename}.{output}"'
+        logger.info("Выгрузка %s (%s) запрошена пользователем %s", self.filename, output, request.user)
+        return response
+
+
+class NodeExportAPIView(SupplyExportAPIView):
+    """
+    Потоковая выгрузка всех звеньев сети по адресу ``/supply/export/nodes/``.
+
+    Каждая запись содержит поля звена, уровень (``level``), путь предков (``path``)
+    и идентификатор поставщика (``supplier``).
+    """
+
+    exporter = staticmethod(export_nodes)
+    filename = "nodes"
+
+
+class ProductExportAPIView(SupplyExportAPIView):
+    """
+    Потоковая выгрузка всех продуктов по адресу ``/supply/export/products/``.
+
+    Каждая запись содержит поля продукта и идентификатор владельца (``owner``).
+    """
+
+    exporter = staticmethod(export_products)
+    filename = "products"
+
+
+# -- SEARCH
+class SupplySearchAPIView(APIView):
+    """
+    Поиск звеньев и продуктов по адресу ``/supply/search/?q=``.
+
+    Ищет звенья по названию, городу и стране, продукты — по модели и названию; каждое слово
+    запроса ищется как префикс, опечатки в названии звена и модели продукта находит триграммное
+    сходство (PostgreSQL). Возвращает общий список по убыванию ранга с подсветкой совпадений
+    (``<mark>...</mark>``)::
+
+        {"query": "алм", "results": [{"type": "node", "id": 3, "name": "...", "city": "Алматы",
+          "rank": 0.61, "highlights": {"name": "...", "city": "<mark>Алм</mark>аты"}}, ...]}
+
+    Параметры: ``?limit=`` — количество результатов, ``?type=node`` или ``?type=product`` —
+    только один тип результатов.
+
+    Требует аутентификации пользователя.
+
+    :raises ValidationError: Если запрос пуст или параметры некорректны.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "Укажите строку поиска."})
+        try:
+            limit = search_limit(request.query_params.get("limit"))
+        except ValueError:
+            raise ValidationError({"limit": f"Ожидается целое число от 1 до {settings.SUPPLY_SEARCH_MAX_LIMIT}."})
+        kind = request.query_params.get("type")
+        if kind is not None and kind not in SEARCH_SPECS:
+            raise ValidationError({"type": f"Допустимые типы: {', '.join(SEARCH_SPECS)}."})
+        return Response({"query": query, "results": search(query, limit, types=[kind] if kind else None)})
+
+
+# -- HEALTH (соединения с БД)
+class DatabaseHealthAPIView(APIView):
+    """
+    Состояние соединения с БД по адресу ``/supply/health/db/``.
+
+    Возвращает стратегию соединений (``CONN_MAX_AGE``, проверки соединений), время ответа
+    на ``SELECT 1`` и метрики пула psycopg 3 процесса, обработавшего запрос: размер,
+    занятые и ожидающие соединения, насыщение (``pool`` равен ``null``, если пул не настроен).
+
+    Доступно только администраторам.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(database_status())
@@ -0,0 +1,120 @@
+# user/authentication.py
+"""
+Аутентификация по JWT без запроса пользователя к БД.
+
+При входе в токен записываются claims ``role``, ``is_active``, ``is_staff``,
+``is_superuser`` и ``stamp`` — «штамп безопасности»: подпись пароля, активности
+и прав пользователя (:func:`security_stamp`). :class:`ClaimsJWTAuthentication`
+доверяет подписанным claims и вместо чтения строки ``User`` сверяет штамп
+токена с текущим штампом пользователя из кэша (``USER_AUTH_CACHE_ALIAS``,
+локальный или общий, например Redis).
+
+Смена пароля, деактивация или изменение прав меняют штамп: сигнал удаляет его
+из кэша, следующий запрос перечитывает штамп из БД, и все ранее выданные токены
+отклоняются. Изменения в обход сигналов (``QuerySet.update``) вступают в силу
+не позже чем через ``USER_AUTH_STAMP_TTL`` секунд.
+
+Включается настройкой ``USER_JWT_STATELESS=True``. Токены без штампа (выданные
+до включения) проверяются обычным запросом к БД.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import salted_hmac
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from user.models import User
+
+STAMP_CLAIM = "stamp"
+
+# Поля пользователя, изменение которых отзывает выданные токены
+STAMP_FIELDS = ("password", "is_active", "role", "is_staff", "is_superuser")
+
+
+def get_auth_cache():
+    return caches[settings.USER_AUTH_CACHE_ALIAS]
+
+
+def _stamp_key(user_id) -> str:
+    return f"user:security-stamp:{user_id}"
+
+
+def security_stamp(user) -> str:
+    """
+    Вычисляет штамп безопасности пользователя по полям :data:`STAMP_FIELDS`.
+
+    :rtype: str
+    """
+    value = "|".join(str(getattr(user, field)) for field in STAMP_FIELDS)
+    return salted_hmac("user.security-stamp", value).hexdigest()[:20]
+
+
+def get_security_stamp(user_id) -> str | None:
+    """
+    Возвращает текущий штамп пользователя: из кэша, при промахе — из БД (с записью в кэш).
+
+    При промахе пользователь читается из основной базы: реплика может отставать и вернуть
+    прежний штамп, который затем закрепился бы в кэше и продлил жизнь отозванным токенам.
+
+    :return: Штамп или ``None``, если пользователя нет.
+    :rtype: str or None
+    """
+    cache = get_auth_cache()
+    stamp = cache.get(_stamp_key(user_id))
+    if stamp is None:
+        user = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).only(*STAMP_FIELDS).first()
+        if user is None:
+            return None
+        stamp = security_stamp(user)
+        cache.set(_stamp_key(user_id), stamp, settings.USER_AUTH_STAMP_TTL)
+    return stamp
+
+
+def forget_security_stamp(user_id) -> None:
+    """
+    Удаляет штамп пользователя из кэша (после изменения пользователя).
+    """
+    get_auth_cache().delete(_stamp_key(user_id))
+
+
+def add_user_claims(token, user) -> None:
+    """
+    Записывает в токен роль, активность, права и штамп пользователя и кэширует штамп.
+
+    :param token: Refresh- или access-токен SimpleJWT.
+    :param user: Пользователь, которому выдаётся токен.
+    """
+    stamp = security_stamp(user)
+    token["role"] = user.role
+    token["is_active"] = user.is_active
+    token["is_staff"] = user.is_staff
+    token["is_superuser"] = user.is_superuser
+    token[STAMP_CLAIM] = stamp
+    get_auth_cache().set(_stamp_key(user.pk), stamp, settings.USER_AUTH_STAMP_TTL)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация, которая берёт пользователя из claims токена (:class:`TokenUser`).
+
+    Вместо запроса ``User`` к БД проверяется штамп токена по кэшу.
+
+    :raises AuthenticationFailed: Если пользователь неактивен, удалён или токен отозван.
+    """
+
+    def get_user(self, validated_token):
+        if STAMP_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Токен не содержит идентификатора пользователя.")
+        if not validated_token.get("is_active", False):
+            raise AuthenticationFailed("Пользователь неактивен.", code="user_inactive")
+        stamp = get_security_stamp(validated_token[api_settings.USER_ID_CLAIM])
+        if stamp != validated_token[STAMP_CLAIM]:
+            raise AuthenticationFailed("Токен отозван.", code="token_revoked")
+        return TokenUser(validated_token)
@@ -0,0 +1,63 @@
+# user/benchmark.py
+"""
+Пропускная способность входа: сколько проверок пароля (входов) в секунду
+выдерживает процесс при заданной параллельности и сколько приходится на одно ядро.
+
+Вход упирается в вычисление хэша пароля, поэтому измеряется ``hasher.verify``
+через пул хэширования (:mod:`user.hashers`) — так же, как при запросе к ``/user/token/``.
+Результат показывает, как параметры ``USER_ARGON2_*``/``USER_PBKDF2_ITERATIONS``
+и ``USER_HASHING_CONCURRENCY`` влияют на запас по пиковым входам.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+
+from user.hashers import PasswordHashingBusy
+
+BENCHMARK_PASSWORD = "benchmark-P4$$w0rd"
+
+
+def measure_logins(algorithm: str = "default", logins: int = 50, threads: int = 1) -> dict:
+    """
+    Измеряет входы в секунду для алгоритма хэширования.
+
+    :param algorithm: Алгоритм из ``PASSWORD_HASHERS`` (``argon2``, ``pbkdf2_sha256``) или ``default``.
+    :param logins: Количество проверок пароля.
+    :param threads: Количество параллельных потоков (одновременных входов).
+    :return: Алгоритм, параметры хэша, время одного входа, входы в секунду всего и на ядро,
+        количество входов, отклонённых переполненным пулом хэширования.
+    :rtype: dict
+    """
+    hasher = get_hasher(algorithm)
+    encoded = hasher.encode(BENCHMARK_PASSWORD, hasher.salt())
+    cores = min(threads, settings.USER_HASHING_CONCURRENCY, os.cpu_count() or 1)
+
+    def login(_):
+        started = time.perf_counter()
+        try:
+            assert hasher.verify(BENCHMARK_PASSWORD, encoded)
+        except PasswordHashingBusy:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    durations = sorted(duration for duration in results if duration is not None)
+    rate = len(durations) / elapsed if elapsed and durations else None
+    return {
+        "algorithm": hasher.algorithm,
+        "params": {key: str(value) for key, value in hasher.decode(encoded).items() if key not in ("hash", "salt")},
+        "logins": logins,
+        "threads": threads,
+        "cores": cores,
+        "rejected": logins - len(durations),
+        "login_ms_p50": round(durations[len(durations) // 2] * 1000, 1) if durations else None,
+        "logins_per_second": round(rate, 2) if rate else None,
+        "logins_per_second_per_core": round(rate / cores, 2) if rate else None,
+    }
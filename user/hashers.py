@@ -0,0 +1,149 @@
+# user/hashers.py
+"""
+Настраиваемое хэширование паролей с ограничением параллельности.
+
+:class:`Argon2PasswordHasher` и :class:`PBKDF2PasswordHasher` берут параметры из
+настроек (``USER_ARGON2_*``, ``USER_PBKDF2_ITERATIONS``). Основной алгоритм выбирается
+настройкой ``USER_PASSWORD_HASHER``; хэши остальных алгоритмов продолжают проверяться.
+Если при входе хэш пароля построен другим алгоритмом или с другими параметрами,
+Django пересчитывает его (``User.check_password`` -> ``set_password``), так что
+смена параметров применяется к пользователям постепенно, по мере входа.
+
+Каждое вычисление хэша занимает слот ограниченного пула (``USER_HASHING_CONCURRENCY``
+одновременных вычислений на процесс): всплеск входов не занимает все ядра и не
+вытесняет остальные запросы API. Если слот не освободился за ``USER_HASHING_TIMEOUT``
+секунд, вход или регистрация получают ``503`` с заголовком ``Retry-After``
+(:class:`PasswordHashingBusy`).
+"""
+
+import math
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingBusy(APIException):
+    """
+    Все слоты пула хэширования заняты дольше ``USER_HASHING_TIMEOUT`` секунд.
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Сервис входа перегружен, повторите попытку позже."
+    default_code = "password_hashing_busy"
+
+    def __init__(self, wait: int, detail=None, code=None):
+        super().__init__(detail, code)
+        # Обработчик исключений DRF выставляет по нему заголовок Retry-After
+        self.wait = wait
+
+
+class HashingPool:
+    """
+    Ограниченный пул слотов для вычисления хэшей паролей.
+
+    Вложенные вычисления в одном потоке занимают один слот.
+
+    :param size: Наибольшее количество одновременных вычислений.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._semaphore = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+
+    @contextmanager
+    def slot(self, timeout: float):
+        """
+        Занимает слот пула на время блока.
+
+        :param timeout: Наибольшее ожидание свободного слота, секунды.
+        :raises PasswordHashingBusy: Если слот не освободился вовремя.
+        """
+        depth = getattr(self._local, "depth", 0)
+        if not depth and not self._semaphore.acquire(timeout=timeout):
+            raise PasswordHashingBusy(wait=max(1, math.ceil(timeout)))
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if not depth:
+                self._semaphore.release()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool() -> HashingPool:
+    """
+    Возвращает пул хэширования процесса (пересоздаётся при изменении ``USER_HASHING_CONCURRENCY``).
+
+    :rtype: HashingPool
+    """
+    global _pool
+    size = settings.USER_HASHING_CONCURRENCY
+    if _pool is None or _pool.size != size:
+        with _pool_lock:
+            if _pool is None or _pool.size != size:
+                _pool = HashingPool(size)
+    return _pool
+
+
+def hashing_slot():
+    """
+    Занимает слот пула хэширования (см. :meth:`HashingPool.slot`).
+    """
+    return get_hashing_pool().slot(settings.USER_HASHING_TIMEOUT)
+
+
+class PooledHasherMixin:
+    """
+    Выполняет вычисление хэша (кодирование, проверку, выравнивание времени) в слоте пула.
+    """
+
+    def encode(self, password, salt, *args, **kwargs):
+        with hashing_slot():
+            return super().encode(password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        with hashing_slot():
+            return super().verify(password, encoded)
+
+    def harden_runtime(self, password, encoded):
+        with hashing_slot():
+            return super().harden_runtime(password, encoded)
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    """
+    Argon2id с параметрами из настроек ``USER_ARGON2_TIME_COST``, ``USER_ARGON2_MEMORY_COST`` (КиБ)
+    и ``USER_ARGON2_PARALLELISM``. Требует пакет ``argon2-cffi``.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.USER_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.USER_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.USER_ARGON2_PARALLELISM
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 с количеством итераций из настройки ``USER_PBKDF2_ITERATIONS``.
+    """
+
+    @property
+    def iterations(self):
+        return settings.USER_PBKDF2_ITERATIONS
@@ -0,0 +1,40 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.benchmark import measure_logins
+
+
+class Command(BaseCommand):
+    help = "Измеряет пропускную способность входа: проверок пароля в секунду всего и на ядро по алгоритмам хэширования"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--algorithms",
+            nargs="+",
+            default=["default"],
+            help="Алгоритмы из PASSWORD_HASHERS (argon2, pbkdf2_sha256) или default — основной",
+        )
+        parser.add_argument("--logins", type=int, default=50, help="Количество проверок пароля на алгоритм")
+        parser.add_argument("--threads", type=int, default=1, help="Количество параллельных потоков")
+        parser.add_argument("--output", help="Файл для сохранения результатов в JSON")
+
+    def handle(self, *args, **options):
+        results = []
+        for algorithm in options["algorithms"]:
+            try:
+                results.append(measure_logins(algorithm, options["logins"], options["threads"]))
+            except ValueError as error:
+                raise CommandError(str(error))
+
+        for stats in results:
+            params = " ".join(f"{key}={value}" for key, value in stats["params"].items() if key != "algorithm")
+            self.stdout.write(
+                f"{stats['algorithm']:<14} {params} p50={stats['login_ms_p50']}ms "
+                f"logins/s={stats['logins_per_second']} per core={stats['logins_per_second_per_core']} "
+                f"rejected={stats['rejected']} (threads={stats['threads']}, cores={stats['cores']})"
+            )
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
@@ -3,6 +3,7 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from user.authentication import add_user_claims
 from user.models import User
 
 
@@ -63,11 +64,18 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
-    Сериализатор для переопределения username на email
+    Сериализатор для переопределения username на email.
+    Добавляет в токены роль, активность, права и штамп безопасности пользователя (см. :mod:`user.authentication`)
     """
 
     username_field = "email"
 
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        add_user_claims(token, user)
+        return token
+
 
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -0,0 +1,25 @@
+"""
+Обработчики сигналов приложения 'user'.
+
+Сбрасывают закэшированный штамп безопасности пользователя (:mod:`user.authentication`)
+при его изменении или удалении, чтобы отозвать выданные токены.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.authentication import forget_security_stamp
+from user.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_stamp(sender, instance, **kwargs):
+    """
+    Удаляет штамп пользователя из кэша: следующий запрос с его токеном перечитает штамп из БД.
+
+    :param sender: Класс модели, отправивший сигнал.
+    :param instance: Изменённый или удалённый пользователь.
+    :type instance: user.models.User
+    """
+    forget_security_stamp(instance.pk)
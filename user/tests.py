@@ -1,9 +1,16 @@
+from django.contrib.auth.hashers import identify_hasher
+from django.test import override_settings
 from django.urls import reverse
 
 import pytest
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
 
+from user.authentication import ClaimsJWTAuthentication, get_auth_cache, get_security_stamp, security_stamp
+from user.benchmark import measure_logins
+from user.hashers import Argon2PasswordHasher, get_hashing_pool
 from user.models import User
 
 
@@ -157,3 +164,168 @@ class TestUserLogin:
         }
         response = self.client.post(self.url, data)
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_login_rate_limited(self, settings):
+        """
+        Вход ограничен лимитом группы ``auth`` по IP-адресу: лишняя попытка получает 429 с Retry-After.
+        """
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"read": None, "write": None, "auth": "2/min"},
+        }
+        data = {"email": "user@example.com", "password": "wrongpassword"}
+        assert [self.client.post(self.url, data).status_code for _ in range(2)] == [401, 401]
+        response = self.client.post(self.url, data)
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response["Retry-After"]) > 0
+
+
+@pytest.mark.django_db
+class TestClaimsJWTAuthentication:
+    """
+    Набор тестов для JWT-аутентификации по claims без запроса пользователя к БД.
+    """
+
+    @pytest.fixture(autouse=True)
+    def claims_authentication(self, monkeypatch):
+        """
+        Включает :class:`ClaimsJWTAuthentication` для всех представлений DRF.
+        """
+        get_auth_cache().clear()
+        monkeypatch.setattr(APIView, "authentication_classes", [ClaimsJWTAuthentication])
+
+    def setup_method(self):
+        """
+        Подготовка пользователя и клиента с access-токеном, полученным при входе.
+        """
+        self.user = User.objects.create_user(
+            email="user@example.com", password="secure1234", first_name="Имя", last_name="Фамилия", phone="70000000000"
+        )
+        self.client = APIClient()
+        self.url = reverse("supply:product-list")
+
+    def login(self):
+        response = self.client.post(
+            reverse("user:token_obtain_pair"), {"email": "user@example.com", "password": "secure1234"}
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return AccessToken(response.data["access"])
+
+    def test_claims_and_no_user_query(self, django_assert_num_queries):
+        """
+        Токен содержит роль и штамп; запрос списка не читает пользователя из БД.
+        """
+        token = self.login()
+        assert (token["role"], token["is_active"], token["is_staff"]) == (User.Roles.USER, True, False)
+        with django_assert_num_queries(1):
+            assert self.client.get(self.url).status_code == status.HTTP_200_OK
+
+    def test_stamp_cache_miss_reads_database_once(self, django_assert_num_queries):
+        self.login()
+        get_auth_cache().clear()
+        with django_assert_num_queries(2):
+            self.client.get(self.url)
+        with django_assert_num_queries(1):
+            self.client.get(self.url, {"page_size": 1})  # другой URL: мимо кэша ответов
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stamp_cache_miss_reads_primary(self, settings):
+        """
+        При промахе кэша штамп читается из основной базы, даже если чтение идёт на реплики
+        (реплика задана только в настройках, запрос к ней завершился бы ошибкой).
+        """
+        settings.SUPPLY_DB_REPLICAS = ["replica"]
+        assert get_security_stamp(self.user.pk) == security_stamp(self.user)
+
+    @pytest.mark.parametrize("change", ["password", "deactivate", "role"])
+    def test_user_change_revokes_token(self, change):
+        """
+        Смена пароля, деактивация или смена роли отзывают выданные токены.
+        """
+        self.login()
+        if change == "password":
+            self.user.set_password("another1234")
+        elif change == "deactivate":
+            self.user.is_active = False
+        else:
+            self.user.role = User.Roles.ADMIN
+        self.user.save()
+        response = self.client.get(self.url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.data["code"] == "token_revoked"
+
+    def test_token_without_stamp_uses_database(self, django_assert_num_queries):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        with django_assert_num_queries(2):
+            assert self.client.get(self.url).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestPasswordHashing:
+    """
+    Набор тестов для настраиваемого хэширования паролей и пула хэширования.
+    """
+
+    @pytest.fixture(autouse=True)
+    def fast_hashing(self, settings):
+        """
+        Быстрый PBKDF2 и пул из одного слота без ожидания.
+        """
+        settings.USER_PBKDF2_ITERATIONS = 1000
+        settings.USER_HASHING_CONCURRENCY = 1
+        settings.USER_HASHING_TIMEOUT = 0
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("user:token_obtain_pair")
+        self.credentials = {"email": "user@example.com", "password": "secure1234"}
+
+    def create_user(self):
+        return User.objects.create_user(**self.credentials, first_name="Имя", last_name="Фамилия", phone="70000000000")
+
+    def test_login_rehashes_with_new_parameters(self, settings):
+        """
+        После увеличения количества итераций хэш пароля пересчитывается при входе.
+        """
+        user = self.create_user()
+        assert identify_hasher(user.password).decode(user.password)["iterations"] == 1000
+        settings.USER_PBKDF2_ITERATIONS = 2000
+        assert self.client.post(self.url, self.credentials).status_code == status.HTTP_200_OK
+        user.refresh_from_db()
+        assert identify_hasher(user.password).decode(user.password)["iterations"] == 2000
+        assert user.check_password("secure1234")
+
+    def test_busy_pool_returns_503(self):
+        """
+        Если все слоты пула заняты, вход получает 503 с Retry-After, а не ждёт бесконечно.
+        """
+        self.create_user()
+        pool = get_hashing_pool()
+        assert pool._semaphore.acquire(blocking=False)
+        try:
+            response = self.client.post(self.url, self.credentials)
+        finally:
+            pool._semaphore.release()
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.data["detail"].code == "password_hashing_busy"
+        assert response["Retry-After"] == "1"
+        assert self.client.post(self.url, self.credentials).status_code == status.HTTP_200_OK
+
+    def test_argon2_parameters_from_settings(self):
+        pytest.importorskip("argon2")
+        hasher = Argon2PasswordHasher()
+        with override_settings(USER_ARGON2_TIME_COST=1, USER_ARGON2_MEMORY_COST=1024, USER_ARGON2_PARALLELISM=1):
+            encoded = hasher.encode("secure1234", hasher.salt())
+            assert hasher.decode(encoded)["memory_cost"] == 1024
+            assert not hasher.must_update(encoded)
+        assert hasher.must_update(encoded)
+
+    def test_measure_logins(self, settings):
+        """
+        Лишние потоки ждут слота пула: все входы выполнены, на одно ядро.
+        """
+        settings.USER_HASHING_TIMEOUT = 5
+        stats = measure_logins("pbkdf2_sha256", logins=4, threads=2)
+        assert (stats["algorithm"], stats["params"]["iterations"], stats["cores"]) == ("pbkdf2_sha256", "1000", 1)
+        assert stats["rejected"] == 0
+        assert stats["logins_per_second"] > 0
@@ -1,8 +1,9 @@
 # user/views.py
 from rest_framework.generics import CreateAPIView
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from supply.throttling import AUTH_SCOPE
 from user.serializers import EmailTokenObtainPairSerializer, RegisterSerializer  # type: ignore[reportUnusedImport]
 
 
@@ -40,6 +41,7 @@ class RegisterAPIView(CreateAPIView):
 
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
+    throttle_scope = AUTH_SCOPE
 
     def perform_create(self, serializer):
         """
@@ -99,3 +101,14 @@ class EmailTokenObtainPairView(TokenObtainPairView):
     """
 
     serializer_class = EmailTokenObtainPairSerializer  # type: ignore[assignment]
+    throttle_scope = AUTH_SCOPE
+
+
+class TokenRefreshAPIView(TokenRefreshView):
+    """
+    Обновление access-токена по refresh-токену (POST /token/refresh/).
+
+    Ограничивается лимитом группы ``auth``, как вход и регистрация.
+    """
+
+    throttle_scope = AUTH_SCOPE